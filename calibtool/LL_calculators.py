@@ -167,4 +167,93 @@ def euclidean_distance_pandas(df):
 def weighted_squares(raw_data, sim_data):
 
     num_obs = len(raw_data)
-    return math.sqrt(sum([(raw_data[x] - sim_data[x])**2/raw_data[x] for x in range(num_obs)])) * -1
\ No newline at end of file
+    return math.sqrt(sum([(raw_data[x] - sim_data[x])**2/raw_data[x] for x in range(num_obs)])) * -1
+
+"""
+Vectorized versions of the functions above scoring a batch of samples against one reference.
+The sim arguments have the shape of the reference arguments with an optional leading samples axis,
+e.g. (n_samples x n_bins) for a reference of n_bins, and one value is returned per sample.
+The terms only depending on the reference are computed once for the whole batch.
+"""
+
+
+def dirichlet_multinomial_batch(raw_data, sim_data):
+    raw_data = np.asarray(raw_data, dtype=float)
+    sim_data = np.asarray(sim_data, dtype=float)
+    num_age_bins, num_cat_bins = raw_data.shape
+    raw_nobs = raw_data.sum(axis=-1)
+    sim_nobs = sim_data.sum(axis=-1)
+
+    LL = gammaln(raw_nobs + 1).sum() - gammaln(raw_data + 1).sum()
+    LL = LL + (gammaln(sim_nobs) - gammaln(raw_nobs + sim_nobs + num_cat_bins)).sum(axis=-1)
+    LL = LL + (gammaln(raw_data + sim_data + 1) - gammaln(sim_data + 1)).sum(axis=(-2, -1))
+
+    return LL / (num_age_bins * num_cat_bins)
+
+
+def dirichlet_single_batch(raw_data, sim_data):
+    raw_data = np.asarray(raw_data, dtype=float)
+    sim_data = np.asarray(sim_data, dtype=float)
+    num_cat_bins = len(raw_data)
+    raw_nobs = raw_data.sum()
+    sim_nobs = sim_data.sum(axis=-1)
+
+    LL = gammaln(raw_nobs + 1) - gammaln(raw_data + 1).sum()
+    LL = LL + gammaln(sim_nobs + num_cat_bins) - gammaln(raw_nobs + sim_nobs + num_cat_bins)
+    LL = LL + (gammaln(raw_data + sim_data + 1) - gammaln(sim_data + 1)).sum(axis=-1)
+
+    return LL / num_cat_bins
+
+
+def beta_binomial_batch(raw_nobs, sim_nobs, raw_data, sim_data, return_mean=True):
+    raw_nobs = np.asarray(raw_nobs, dtype=float)
+    sim_nobs = np.asarray(sim_nobs, dtype=float)
+    raw_data = np.asarray(raw_data, dtype=float)
+    sim_data = np.asarray(sim_data, dtype=float)
+    num_bins = len(raw_data)
+
+    LL = (gammaln(raw_nobs + 1) - gammaln(raw_data + 1) - gammaln(raw_nobs - raw_data + 1)).sum()
+    LL = LL + (gammaln(sim_nobs + 2)
+               - gammaln(raw_nobs + sim_nobs + 2)
+               + gammaln(raw_data + sim_data + 1)
+               + gammaln(raw_nobs - raw_data + sim_nobs - sim_data + 1)
+               - gammaln(sim_data + 1)
+               - gammaln(sim_nobs - sim_data + 1)).sum(axis=-1)
+
+    if num_bins != 0 and return_mean:
+        LL /= num_bins
+    return LL
+
+
+def gamma_poisson_batch(raw_nobs, sim_nobs, raw_data, sim_data, return_mean=True):
+    raw_nobs = np.asarray(raw_nobs, dtype=float)
+    sim_nobs = np.asarray(sim_nobs, dtype=float)
+    raw_data = np.asarray(raw_data, dtype=float)
+    sim_data = np.asarray(sim_data, dtype=float)
+    num_bins = len(raw_data)
+    total_nobs = raw_nobs + sim_nobs
+
+    # The log terms are only added for the bins with observations, log(1) = 0 is used as placeholder elsewhere
+    LL = np.sum(np.where(raw_nobs > 0, (raw_data + 1) * np.log(np.where(raw_nobs > 0, raw_nobs, 1)), 0))
+    LL = LL - gammaln(raw_data + 1).sum()
+    LL = LL + (np.where(sim_nobs > 0, (sim_data + 1) * np.log(np.where(sim_nobs > 0, sim_nobs, 1)), 0)
+               - np.where(total_nobs > 0,
+                          (raw_data + sim_data + 1) * np.log(np.where(total_nobs > 0, total_nobs, 1)), 0)
+               + gammaln(raw_data + sim_data + 1)
+               - gammaln(sim_data + 1)).sum(axis=-1)
+
+    if num_bins != 0 and return_mean:
+        LL /= num_bins
+    return LL
+
+
+def euclidean_distance_batch(raw_data, sim_data):
+    raw_data = np.asarray(raw_data, dtype=float)
+    sim_data = np.asarray(sim_data, dtype=float)
+    return np.sqrt(np.sum((raw_data - sim_data) ** 2, axis=-1)) * -1
+
+
+def weighted_squares_batch(raw_data, sim_data):
+    raw_data = np.asarray(raw_data, dtype=float)
+    sim_data = np.asarray(sim_data, dtype=float)
+    return np.sqrt(np.sum((raw_data - sim_data) ** 2 / raw_data, axis=-1)) * -1
@@ -23,7 +23,7 @@ from simtools.Utilities.LocalOS import LocalOS
 from simtools.Utilities.COMPSUtilities import get_experiments_per_user_and_date, get_experiments_by_name, COMPS_login, \
     get_experiment_ids_for_user
 from simtools.Utilities.DiskSpaceUsage import DiskSpaceUsage
-from simtools.Utilities.Experiments import COMPS_experiment_to_local_db, retrieve_experiment
+from simtools.Utilities.Experiments import COMPS_sync_experiments, retrieve_experiment
 from simtools.Utilities.General import nostdout, get_tools_revision, retrieve_item
 from COMPS.Data.Simulation import SimulationState
 from simtools.Utilities.GitHub.GitHub import GitHub, DTKGitHub
@@ -435,7 +435,6 @@ def sync(args, unknownArgs):
         user = sp.get('user')
         COMPS_login(endpoint)
 
-    exp_to_save = list()
     exp_deleted = 0
 
     # Retrieve all the experiment id from COMPS for the current user
@@ -453,52 +452,32 @@ def sync(args, unknownArgs):
     exp_id = args.exp_id if args.exp_id else None
     exp_name = args.exp_name if args.exp_name else None
     user = args.user if args.user else user
+    verbose = bool(exp_name or exp_id)
 
     if exp_name:
-        experiments = get_experiments_by_name(exp_name, user)
-        for experiment_data in experiments:
-            experiment = COMPS_experiment_to_local_db(exp_id=str(experiment_data.id),
-                                                      endpoint=endpoint,
-                                                      verbose=True,
-                                                      save_new_experiment=False)
-            if experiment:
-                exp_to_save.append(experiment)
-
+        exp_ids_to_sync = [str(experiment_data.id) for experiment_data in get_experiments_by_name(exp_name, user)]
     elif exp_id:
-        # Create a new experiment
-        experiment = COMPS_experiment_to_local_db(exp_id=exp_id,
-                                                  endpoint=endpoint,
-                                                  verbose=True,
-                                                  save_new_experiment=False)
-        # The experiment needs to be saved
-        if experiment:
-            exp_to_save.append(experiment)
+        exp_ids_to_sync = [exp_id]
     else:
         # By default only get experiments created in the last month
-        # day_limit = args.days if args.days else day_limit_default
-        day_limit = 30
+        day_limit = args.days if args.days else 30
         today = datetime.date.today()
         limit_date = today - datetime.timedelta(days=int(day_limit))
-
-        # For each of them, check if they are in the db
-        for exp in get_experiments_per_user_and_date(user, limit_date):
-            # Create a new experiment
-            experiment = COMPS_experiment_to_local_db(exp_id=str(exp.id),
-                                                      endpoint=endpoint,
-                                                      save_new_experiment=False)
-
-            # The experiment needs to be saved
-            if experiment:
-                exp_to_save.append(experiment)
-
-    # Save the experiments if any
-    if len(exp_to_save) > 0 and exp_deleted == 0:
-        DataStore.batch_save_experiments(exp_to_save)
-        logger.info("The following experiments have been added to the database:")
-        logger.info("\n".join(["- "+str(exp) for exp in exp_to_save]))
-        logger.info("%s experiments have been updated in the DB." % len(exp_to_save))
+        exp_ids_to_sync = [str(exp.id) for exp in get_experiments_per_user_and_date(user, limit_date)]
+
+    # Retrieve the changes of the experiments concurrently and save them at once
+    changes = COMPS_sync_experiments(exp_ids_to_sync, endpoint, verbose=verbose)
+
+    if changes:
+        logger.info("The following experiments have been added or updated in the database:")
+        logger.info("\n".join(["- %s: %d new simulation(s), %d status update(s)%s" %
+                               (change['exp_id'], len(change['simulations']), len(change['status']),
+                                " (new experiment '%s')" % change['experiment'].exp_name if change['experiment'] else "")
+                               for change in changes]))
+        logger.info("%s experiments have been updated in the DB." % len(changes))
+    if exp_deleted:
         logger.info("%s experiments have been deleted from the DB." % exp_deleted)
-    else:
+    if not changes and not exp_deleted:
         print("The database was already up to date.")
 
     # Start overseer
@@ -1,29 +1,173 @@
 import json
-import struct
-from collections import OrderedDict
+import os
+from contextlib import contextmanager
 
+import numpy as np
 
-def extract_data_from_climate_bin_for_node(node, binary_file):
+# Climate values are stored as 4 bytes floats
+CLIMATE_DTYPE = np.dtype('f')
+
+
+def parse_node_offsets(offsets):
+    """
+    Parse a NodeOffsets string (8 hexadecimal digits for the node id then 8 for the offset, for each node).
+    :param offsets: The NodeOffsets string
+    :return: Tuple (node_ids, offsets) of uint32 arrays
+    """
+    pairs = np.frombuffer(bytes.fromhex(offsets), dtype='>u4').reshape(-1, 2).astype(np.uint32)
+    return pairs[:, 0], pairs[:, 1]
+
+
+def format_node_offsets(node_ids, offsets, uppercase=False) -> str:
+    """
+    Format a NodeOffsets string: 8 hexadecimal digits for the node id then 8 for the offset, for each node.
+    :param node_ids: Array of node ids
+    :param offsets: Array of offsets
+    :param uppercase: Use uppercase hexadecimal digits
+    :return: The NodeOffsets string
+    """
+    node_ids, offsets = np.asarray(node_ids, dtype=np.int64), np.asarray(offsets, dtype=np.int64)
+    if len(node_ids) and (min(node_ids.min(), offsets.min()) < 0 or max(node_ids.max(), offsets.max()) >= 2 ** 32):
+        # Values not fitting in 8 hexadecimal digits
+        pattern = "{0:08X}{1:08X}" if uppercase else "{0:08x}{1:08x}"
+        return "".join(pattern.format(n, o) for n, o in zip(node_ids.tolist(), offsets.tolist()))
+
+    # Big endian 4 bytes integers give the 8 hexadecimal digits of each value
+    offset_string = np.column_stack((node_ids, offsets)).astype('>u4').tobytes().hex()
+    return offset_string.upper() if uppercase else offset_string
+
+
+class ClimateBinary:
+    """
+    Random-access reader of a climate binary file.
+
+    The metadata and node offsets of the .bin.json are parsed once and the .bin is memory-mapped: the series are
+    float32 arrays read from the file on access instead of being loaded in memory.
+    The file stays mapped until the ClimateBinary is closed (or used as a context manager) and all the views it
+    returned are released. An open mapping prevents overwriting or deleting the file on Windows.
+    """
+
+    def __init__(self, binary_file):
+        """
+        :param binary_file: Path of the .bin file, the metadata being in <binary_file>.json
+        """
+        self.binary_file = binary_file
+        with open(binary_file + '.json', 'rb') as f:
+            meta = json.load(f)
+        self.metadata = meta['Metadata']
+        self.tsteps = self.metadata['DatavalueCount']
+        self.node_ids, offsets = parse_node_offsets(meta['NodeOffsets'])
+
+        if offsets.size and np.any(offsets % CLIMATE_DTYPE.itemsize):
+            raise ValueError("The offsets of %s are not aligned on %d bytes" % (binary_file, CLIMATE_DTYPE.itemsize))
+        self.starts = (offsets // CLIMATE_DTYPE.itemsize).astype(np.int64)
+
+        # Sorted ids to find the positions of nodes
+        self._sorter = np.argsort(self.node_ids, kind='stable')
+        self._sorted_ids = self.node_ids[self._sorter]
+
+        if os.path.getsize(binary_file):
+            self.data = np.memmap(binary_file, dtype=CLIMATE_DTYPE, mode='r')
+        else:
+            self.data = np.empty(0, dtype=CLIMATE_DTYPE)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        """
+        Release the memory-mapped file.
+        """
+        self.data = None
+
+    def __len__(self):
+        return len(self.node_ids)
+
+    def __contains__(self, node_id):
+        return bool(np.isin(node_id, self.node_ids))
+
+    def node_positions(self, node_ids) -> np.ndarray:
+        """
+        Positions of the nodes in the NodeOffsets.
+        :param node_ids: Array of node ids
+        :return: Array of positions
+        """
+        node_ids = np.asarray(node_ids)
+        found = np.searchsorted(self._sorted_ids, node_ids)
+        found[found == len(self._sorted_ids)] = 0
+        missing = (self._sorted_ids[found] != node_ids) if len(self._sorted_ids) else np.ones(node_ids.shape, bool)
+        if np.any(missing):
+            raise KeyError("Nodes %s not found in %s" % (node_ids[missing].tolist(), self.binary_file))
+        return self._sorter[found]
+
+    def node_series(self, node_id) -> np.ndarray:
+        """
+        Series of a node, as a read-only view on the file.
+        :param node_id: The node id
+        :return: Array of tsteps floats
+        """
+        start = self.starts[self.node_positions([node_id])[0]]
+        return self.data[start:start + self.tsteps]
+
+    def nodes_series(self, node_ids=None) -> np.ndarray:
+        """
+        Series of several nodes as a node x time array.
+        When the series of the nodes follow each other in the file (e.g. all the nodes of a file without duplicated
+        series), the array is a view on the file. Otherwise the series are copied.
+        :param node_ids: The node ids, all the nodes of the file by default
+        :return: Array of shape (nodes, tsteps)
+        """
+        starts = self.starts if node_ids is None else self.starts[self.node_positions(node_ids)]
+        if not len(starts):
+            return np.empty((0, self.tsteps), dtype=CLIMATE_DTYPE)
+
+        first = starts[0]
+        if np.array_equal(starts, first + np.arange(len(starts)) * self.tsteps):
+            return self.data[first:first + len(starts) * self.tsteps].reshape(len(starts), self.tsteps)
+        return self.data[starts[:, None] + np.arange(self.tsteps)]
+
+
+@contextmanager
+def open_climate_binaries():
+    """
+    Keep the climate binaries opened by extract_data_from_climate_bin_for_node in the scope, instead of parsing
+    them for each node. They are all closed when leaving the scope.
+
+    Example::
+
+        with open_climate_binaries() as climate_binaries:
+            for node in nodes:
+                node.data_from_files(rainfall=rainfall_file, climate_binaries=climate_binaries)
+
+    :return: Dictionary associating path -> ClimateBinary
+    """
+    climate_binaries = {}
+    try:
+        yield climate_binaries
+    finally:
+        for climate_binary in climate_binaries.values():
+            climate_binary.close()
+        climate_binaries.clear()
+
+
+def extract_data_from_climate_bin_for_node(node, binary_file, climate_binaries=None):
     """
     This function returns the data for a particular node in the provided binary_file.
     Works for climate binaries
+    :param node: The node
+    :param binary_file: Path of the .bin file
+    :param climate_binaries: Optional dictionary (see open_climate_binaries) keeping the files open between calls.
+    If not provided, the file is opened and closed for this call.
+    :return: List of the values
     """
-    meta = json.load(open(binary_file+'.json','rb'))
-    tsteps = meta['Metadata']['DatavalueCount']
-    offsets = meta['NodeOffsets']
-    offsets_nodes = OrderedDict()
-    i=0
-    while i <len(offsets):
-        nodeid = int(offsets[i:i+8],16)
-        offset = int(offsets[i+9:i+16], 16)
-        offsets_nodes[nodeid] = offset
-        i+=16
-
-    series = []
-    with open(binary_file, 'rb') as bin_file:
-        bin_file.seek(offsets_nodes[node.id])
-
-        # Read the data
-        for i in range(tsteps):
-            series.append(struct.unpack('f', bin_file.read(4))[0])
-    return series
\ No newline at end of file
+    if climate_binaries is None:
+        with ClimateBinary(binary_file) as climate_binary:
+            return climate_binary.node_series(node.id).tolist()
+
+    path = os.path.abspath(binary_file)
+    if path not in climate_binaries:
+        climate_binaries[path] = ClimateBinary(path)
+    return climate_binaries[path].node_series(node.id).tolist()
@@ -1,11 +1,11 @@
 import json
 import os
-import struct
 import time
 import logging
-from collections import OrderedDict
 
-import itertools
+import numpy as np
+
+from dtk.tools.climate.BinaryFilesHelpers import CLIMATE_DTYPE, format_node_offsets
 
 logger = logging.getLogger(__name__)
 logging.basicConfig(filename='ClimateFileCreator_Log.log', level=logging.DEBUG)
@@ -89,28 +89,50 @@ class ClimateFileCreator:
 
         return ret
 
-    def generate_climate_files(self, output_path):
-        for data_set in ('air_temperature', 'land_temperature', 'humidity', 'rainfall'):
-            data = OrderedDict()
-            offset = 0
-            offset_string = ""
-
-            for node in self.nodes:
-                key = tuple(getattr(node, data_set))
+    def stack_series(self, data_set):
+        """
+        Stack the series of the nodes for a data set.
+        :param data_set: The data set (rainfall, air_temperature, ...)
+        :return: Array of shape (nodes, values)
+        """
+        series = [getattr(node, data_set) for node in self.nodes]
+        lengths = {len(values) for values in series}
+        if len(lengths) > 1:
+            raise ValueError("The %s series of the nodes have different lengths: %s" % (data_set, sorted(lengths)))
+        return np.array(series, dtype=np.float64).reshape(len(series), lengths.pop() if lengths else 0)
 
-                if not key in data:
-                    data[key] = offset
-                    offset += len(key)*4
+    @staticmethod
+    def deduplicate_series(series):
+        """
+        Find the distinct series, in order of first appearance.
+        :param series: Array of shape (nodes, values)
+        :return: Tuple (unique_rows, node_rows): the rows of the distinct series and the index of each node series in
+        the distinct series
+        """
+        unique = {}
+        node_rows = np.fromiter((unique.setdefault(row.tobytes(), len(unique)) for row in series),
+                                dtype=np.int64, count=len(series))
+        unique_rows = np.zeros(len(unique), dtype=np.int64)
+        unique_rows[node_rows[::-1]] = np.arange(len(series))[::-1]
+        return unique_rows, node_rows
 
-                offset_string = "%s%08x%08x" % (offset_string, node.id, data[key])
+    def generate_climate_files(self, output_path):
+        if not self.nodes:
+            return
 
-            if len(data) > 0:
-                self.write_files(output_path=output_path,
-                                 count=len(list(data)[0]),
-                                 offset_string=offset_string,
-                                 available_nodes_count=len(data),
-                                 data_to_save=list(itertools.chain.from_iterable(list(data))),
-                                 data_name=data_set)
+        node_ids = np.array([node.id for node in self.nodes], dtype=np.int64)
+        for data_set in ('air_temperature', 'land_temperature', 'humidity', 'rainfall'):
+            # Each distinct series is written once
+            series = self.stack_series(data_set)
+            unique_rows, node_rows = self.deduplicate_series(series)
+            offsets = node_rows * series.shape[1] * CLIMATE_DTYPE.itemsize
+
+            self.write_files(output_path=output_path,
+                             count=series.shape[1],
+                             offset_string=format_node_offsets(node_ids, offsets),
+                             available_nodes_count=len(unique_rows),
+                             data_to_save=series[unique_rows],
+                             data_name=data_set)
 
     def write_files(self, output_path, count, offset_string, available_nodes_count, data_to_save, data_name):
         dump = lambda content: json.dumps(content, sort_keys=True, indent=4).strip('"')
@@ -136,9 +158,7 @@ class ClimateFileCreator:
         json_file_name = file_name + ".bin.json"
 
         with open(os.path.join(output_path, '%s' % bin_file_name), 'wb') as handle:
-            a = struct.pack('f' * len(data_to_save), *data_to_save)
-            # Write it to the file
-            handle.write(a)
+            np.asarray(data_to_save, dtype=CLIMATE_DTYPE).tofile(handle)
 
         with open(os.path.join(output_path, '%s' % json_file_name), 'w') as f:
             f.write(dump(metadata))
@@ -10,16 +10,17 @@ class WeatherNode(Node):
         self.rainfall = []
         self.humidity = []
 
-    def data_from_files(self, air_temperature=None, land_temperature=None, humidity=None, rainfall=None):
+    def data_from_files(self, air_temperature=None, land_temperature=None, humidity=None, rainfall=None,
+                        climate_binaries=None):
         if air_temperature:
-            self.air_temperature = extract_data_from_climate_bin_for_node(self, air_temperature)
+            self.air_temperature = extract_data_from_climate_bin_for_node(self, air_temperature, climate_binaries)
 
         if land_temperature:
-            self.air_temperature = extract_data_from_climate_bin_for_node(self, land_temperature)
+            self.air_temperature = extract_data_from_climate_bin_for_node(self, land_temperature, climate_binaries)
 
         if humidity:
-            self.humidity = extract_data_from_climate_bin_for_node(self, humidity)
+            self.humidity = extract_data_from_climate_bin_for_node(self, humidity, climate_binaries)
 
         if rainfall:
-            self.rainfall = extract_data_from_climate_bin_for_node(self, rainfall)
+            self.rainfall = extract_data_from_climate_bin_for_node(self, rainfall, climate_binaries)
 
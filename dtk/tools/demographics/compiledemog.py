@@ -3,9 +3,13 @@ import json
 import os
 import re
 import sys
+import tempfile
+from array import array
+from multiprocessing import Pool
 
-stringdict = collections.OrderedDict([])
-nextstring = 'aa'
+CHUNK_SIZE = 1024 * 1024  # Characters read at once from the source file
+SEPARATORS = (',', ':')
+EMPTY_NODES = '","Nodes":[]}'  # End of the compiled header before the NodeOffsets are filled
 
 def ShowUsage():
     print ('\nUsage: %s <infile> [--forceoverwrite]' % os.path.basename(sys.argv[0]))
@@ -45,24 +49,6 @@ def OrderedJsonLoad(in_dict):
 
     return out_dict
 
-def CompressKeyStrings(datachunk):
-    global nextstring
-    newdatachunk = collections.OrderedDict([])
-
-    for item in datachunk.items():
-        if item[0] not in stringdict:
-            stringdict[item[0]] = nextstring
-            nextstring = GetNextString(nextstring)
-
-        if type(item[1]) is collections.OrderedDict:
-            newdatachunk[stringdict[item[0]]] = CompressKeyStrings(item[1])
-        elif type(item[1]) is list:
-            newdatachunk[stringdict[item[0]]] = list((CompressKeyStrings(x) if type(x) is collections.OrderedDict else x) for x in item[1])
-        else:
-            newdatachunk[stringdict[item[0]]] = item[1]
-
-    return newdatachunk
-
 def GetNextString(currentstring):
     for i in range(len(currentstring))[::-1]:
         if currentstring[i] != 'z':
@@ -73,55 +59,258 @@ def GetNextString(currentstring):
     print('ERROR! Ran out of string values for StringTable!')
     exit(-1)
 
+def CompiledFileName(infilename):
+    return re.sub(r'\.json$', '.compiled.json', infilename)
+
+
+class JsonStream:
+    """
+    Incremental reader of a JSON text, decoding one value at a time from a buffer refilled on demand.
+    """
+    WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+    def __init__(self, file, chunk_size=CHUNK_SIZE):
+        self.file = file
+        self.chunk_size = chunk_size
+        self.buffer = ''
+        self.position = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder(object_pairs_hook=OrderedJsonLoad)
+
+    def _read(self):
+        # Keep the unread part of the buffer and at least double it so large values are not decoded too many times
+        chunk = self.file.read(max(self.chunk_size, len(self.buffer) - self.position))
+        if not chunk:
+            self.eof = True
+        self.buffer = self.buffer[self.position:] + chunk
+        self.position = 0
+
+    def peek(self):
+        """
+        Skip the whitespaces and return the next character.
+        """
+        while True:
+            self.position = self.WHITESPACE.match(self.buffer, self.position).end()
+            if self.position < len(self.buffer):
+                return self.buffer[self.position]
+            if self.eof:
+                raise ValueError('Unexpected end of the JSON file')
+            self._read()
+
+    def next_char(self):
+        char = self.peek()
+        self.position += 1
+        return char
+
+    def expect(self, char):
+        found = self.next_char()
+        if found != char:
+            raise ValueError("Expected '%s' but found '%s' in the JSON file" % (char, found))
+
+    def value(self):
+        """
+        Decode the next value.
+
+        Returns:
+            Tuple (value, text): The decoded value and its JSON text.
+        """
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.position)
+                # A value ending the buffer may be truncated (e.g. a number)
+                if end < len(self.buffer) or self.eof:
+                    text = self.buffer[self.position:end]
+                    self.position = end
+                    return value, text
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self._read()
+
+    def items(self, stream_key):
+        """
+        Iterate over the items of the top-level object. The value of stream_key is an array whose elements are
+        yielded one by one.
+
+        Returns:
+            Tuples (key, value, text) where value and text are the element and its JSON text for stream_key.
+        """
+        self.expect('{')
+        if self.peek() == '}':
+            return
+
+        while True:
+            key, _ = self.value()
+            self.expect(':')
+            if key == stream_key:
+                self.expect('[')
+                if self.peek() == ']':
+                    self.position += 1
+                else:
+                    while True:
+                        element, text = self.value()
+                        yield key, element, text
+                        separator = self.next_char()
+                        if separator == ']':
+                            break
+                        if separator != ',':
+                            raise ValueError("Expected ',' or ']' but found '%s' in the JSON file" % separator)
+            else:
+                value, text = self.value()
+                yield key, value, text
+
+            separator = self.next_char()
+            if separator == '}':
+                return
+            if separator != ',':
+                raise ValueError("Expected ',' or '}' but found '%s' in the JSON file" % separator)
+
+
+class DemographicsCompiler:
+    """
+    Compile a demographics file: the keys are replaced by short strings of the StringTable and the position of each
+    node is recorded in the NodeOffsets.
+
+    The nodes are streamed from the source file to temporary files and then to the compiled file, so the memory
+    used is proportional to one node (plus a few numbers per node for the offsets).
+    Each compiler has its own StringTable, several files can be compiled in the same process.
+    """
+
+    def __init__(self, chunk_size=CHUNK_SIZE):
+        """
+        Args:
+            chunk_size: Size of the chunks read from the source file.
+        """
+        self.chunk_size = chunk_size
+        self.string_table = collections.OrderedDict([])
+        self.next_string = 'aa'
+
+    def compress_keys(self, datachunk):
+        """
+        Replace the keys of a section by their short string, adding new keys to the StringTable.
+        """
+        newdatachunk = collections.OrderedDict([])
+
+        for key, value in datachunk.items():
+            if key not in self.string_table:
+                self.string_table[key] = self.next_string
+                self.next_string = GetNextString(self.next_string)
+
+            if type(value) is collections.OrderedDict:
+                newdatachunk[self.string_table[key]] = self.compress_keys(value)
+            elif type(value) is list:
+                newdatachunk[self.string_table[key]] = list(
+                    (self.compress_keys(x) if type(x) is collections.OrderedDict else x) for x in value)
+            else:
+                newdatachunk[self.string_table[key]] = value
+
+        return newdatachunk
+
+    def _copy_nodes(self, infile, source_nodes):
+        # Copy the text of the nodes to source_nodes and return the other sections and the index of the nodes
+        sections = {}
+        index = []
+        offset = 0
+        for key, value, text in JsonStream(infile, self.chunk_size).items('Nodes'):
+            if key != 'Nodes':
+                sections[key] = value
+                continue
+
+            text = text.encode('utf-8')
+            source_nodes.write(text)
+            index.append((value['NodeID'], offset, len(text)))
+            offset += len(text)
+
+        return sections, index
+
+    def compile(self, infilename, outfilename):
+        """
+        Compile a demographics file.
+
+        Args:
+            infilename: The demographics file.
+            outfilename: The compiled demographics file.
+
+        Returns:
+            The number of nodes.
+        """
+        # The temporary files are as large as the nodes, keep them next to the compiled file
+        temp_directory = os.path.dirname(os.path.abspath(outfilename))
+        with open(infilename, 'r') as infile, tempfile.TemporaryFile(dir=temp_directory) as source_nodes, \
+                tempfile.TemporaryFile(dir=temp_directory) as compressed_nodes:
+            sections, index = self._copy_nodes(infile, source_nodes)
+            index.sort(key=lambda entry: entry[0])
+
+            # Compress the nodes by increasing NodeID, building the StringTable
+            lengths = array('q')
+            for _, offset, length in index:
+                source_nodes.seek(offset)
+                node = json.loads(source_nodes.read(length).decode('utf-8'), object_pairs_hook=OrderedJsonLoad)
+                record = json.dumps(self.compress_keys(node), separators=SEPARATORS).encode('ascii')
+                compressed_nodes.write(record)
+                lengths.append(len(record))
+
+            compiledjson = collections.OrderedDict([])
+            compiledjson['Metadata'] = sections['Metadata']
+            compiledjson['StringTable'] = self.string_table
+            if 'Defaults' in sections:
+                compiledjson['Defaults'] = self.compress_keys(sections['Defaults'])
+            compiledjson['NodeOffsets'] = ''
+            compiledjson['Nodes'] = []
+            header = json.dumps(compiledjson, separators=SEPARATORS)
+
+            # Remove the ']}' at the end of the header, and add padding for node-offsets
+            offset = len(header) - 2 + (16 * len(index))
+
+            with open(outfilename, 'wb') as outfile:
+                outfile.write(header[:-len(EMPTY_NODES)].encode('ascii'))
+                for (node_id, _, _), length in zip(index, lengths):
+                    outfile.write(('%0.8X' % node_id + '%0.8X' % offset).encode('ascii'))
+                    offset += length + 1
+
+                outfile.write(b'","Nodes":[')
+                compressed_nodes.seek(0)
+                for i, length in enumerate(lengths):
+                    if i:
+                        outfile.write(b',')
+                    outfile.write(compressed_nodes.read(length))
+                outfile.write(b']}')
+
+        return len(index)
+
+
 def CompileDemographics(infilename, forceoverwrite = False):
 
-    outfilename = re.sub('\.json$', '.compiled.json', infilename)
+    outfilename = CompiledFileName(infilename)
 
     if not CheckFiles(infilename, outfilename, forceoverwrite):
         exit(-1)
 
-    with open(infilename, 'r') as file:
-        try:
-            fulljson = json.load(file, object_pairs_hook=OrderedJsonLoad)
-        except ValueError as ex:
-            print ('ERROR! An error has been encountered while loading the source demographics file. %s' % ex.message)
-            exit(-1)
-
-    compiledjson = collections.OrderedDict([])
-    compiledjson['Metadata'] = fulljson['Metadata']
-
-    newnodes = []
-    offsets = []
-    offset = 0
-
-    for node in sorted(fulljson['Nodes'], key=lambda k: k['NodeID']):
-        newnode = CompressKeyStrings(node)
-        newnodes.append(newnode)
-        offsets.append(offset)
-        offset += len(json.dumps(newnode, separators=(',',':'))) + 1
-
-    compiledjson['StringTable'] = stringdict
-
-    if 'Defaults' in fulljson:
-        compiledjson['Defaults'] = CompressKeyStrings(fulljson['Defaults'])
-
-    compiledjson['NodeOffsets'] = ''
-    compiledjson['Nodes'] = []
-
-    startoffset = len(json.dumps(compiledjson, separators=(',',':'))) - 2 + (16 * len(newnodes)) # remove the ']}' at the end of the file, and add padding for node-offsets
-    offsets = [x + startoffset for x in offsets]
+    try:
+        DemographicsCompiler().compile(infilename, outfilename)
+    except ValueError as ex:
+        print ('ERROR! An error has been encountered while loading the source demographics file. %s' % ex)
+        exit(-1)
 
-    offsetstr = ''
-    for node in newnodes:
-        offsetstr = offsetstr + '%0.8X' % node[stringdict['NodeID']] + '%0.8X' % offsets.pop(0)
+def _compile_file(infilename):
+    outfilename = CompiledFileName(infilename)
+    DemographicsCompiler().compile(infilename, outfilename)
+    return outfilename
 
-    compiledjson['NodeOffsets'] = offsetstr
-    compiledjson['Nodes'] = newnodes
+def CompileDemographicsFiles(infilenames, processes=None):
+    """
+    Compile several demographics files concurrently, overwriting the existing compiled files.
 
-    compiledjsonstr = json.dumps(compiledjson, separators=(',',':'))
+    Args:
+        infilenames: The demographics files.
+        processes: The number of processes, os.cpu_count() by default.
 
-    with open(outfilename, 'w') as file:
-        file.write(compiledjsonstr)
+    Returns:
+        The compiled files.
+    """
+    with Pool(processes) as pool:
+        return pool.map(_compile_file, infilenames)
 
 def main(demographics_file):
     
@@ -0,0 +1,130 @@
+import json
+
+import matplotlib.pyplot as plt
+import matplotlib.cm as cm
+import numpy
+
+# Resolution of the grid on which the nodes are ordered along the Hilbert curve (2^HILBERT_ORDER cells per side)
+HILBERT_ORDER = 16
+
+
+def hilbert_index(x, y, order=HILBERT_ORDER):
+    """
+    Position of grid cells along a Hilbert curve.
+
+    Args:
+        x: Array of cell columns in [0, 2^order)
+        y: Array of cell rows in [0, 2^order)
+        order: The curve covers a 2^order x 2^order grid
+
+    Returns:
+        Array of positions along the curve.
+    """
+    x, y = numpy.array(x, dtype=numpy.int64), numpy.array(y, dtype=numpy.int64)
+    d = numpy.zeros_like(x)
+    n = 1 << order
+    s = n >> 1
+    while s > 0:
+        rx = (x & s) > 0
+        ry = (y & s) > 0
+        d += s * s * ((3 * rx) ^ ry)
+
+        # Rotate the quadrant so the curve is continuous
+        flip = ~ry & rx
+        x = numpy.where(flip, n - 1 - x, x)
+        y = numpy.where(flip, n - 1 - y, y)
+        swap = ~ry
+        x, y = numpy.where(swap, y, x), numpy.where(swap, x, y)
+        s >>= 1
+    return d
+
+
+def max_over_avg_load(node_loads, node_ranks, nranks):
+    """
+    Load of the most loaded rank over the average load.
+    """
+    loads = numpy.bincount(node_ranks, weights=node_loads, minlength=nranks)
+    return float(nranks * loads.max() / loads.sum())
+
+
+class HilbertLoadBalancer(object):
+
+    '''
+    Population-weighted load balancing: the nodes are ordered along a Hilbert space-filling curve, which keeps
+    neighboring nodes together, and the curve is split in segments of equal population.
+    Same interface as KMeansLoadBalancer; it does not iterate and scales to very large node counts.
+    '''
+
+    def __init__(self, demographics_file_path, nclusters=32):
+
+        self.nclusters = nclusters
+        self.demographics_file_path = demographics_file_path
+
+        # plotting related attributes
+        self.max_marker_size = 500
+
+    def read_nodes(self):
+        """
+        Read the node ids, coordinates and populations of the demographics file.
+
+        Returns:
+            Tuple of arrays (node_ids, lats, longs, pops).
+        """
+        with open(self.demographics_file_path, 'r') as file:
+            demogjson = json.load(file)
+
+        default_population = demogjson.get('Defaults', {}).get('NodeAttributes', {}).get('InitialPopulation', 0)
+        nodes = demogjson['Nodes']
+        node_ids = numpy.fromiter((node['NodeID'] for node in nodes), dtype=numpy.int64, count=len(nodes))
+        lats = numpy.fromiter((node['NodeAttributes']['Latitude'] for node in nodes), dtype=float, count=len(nodes))
+        longs = numpy.fromiter((node['NodeAttributes']['Longitude'] for node in nodes), dtype=float, count=len(nodes))
+        pops = numpy.fromiter((node['NodeAttributes'].get('InitialPopulation', default_population) for node in nodes),
+                              dtype=float, count=len(nodes))
+        return node_ids, lats, longs, pops
+
+    def partition(self, lats, longs, pops):
+        """
+        Order the nodes along the Hilbert curve and split them in nclusters segments of equal population.
+
+        Returns:
+            Tuple (order, cum_loads, ranks): the node indices in curve order, the cumulative fraction of the total
+            population at the middle of each node in that order and the rank of each node in that order.
+        """
+        cells = (1 << HILBERT_ORDER) - 1
+
+        def to_grid(values):
+            span = values.max() - values.min() if len(values) else 0
+            return numpy.zeros(len(values), dtype=numpy.int64) if span == 0 else \
+                numpy.round((values - values.min()) / span * cells).astype(numpy.int64)
+
+        order = numpy.argsort(hilbert_index(to_grid(longs), to_grid(lats)), kind='stable')
+
+        # Prefix sums of the population along the curve: each rank gets an equal share of the total.
+        # The load of a node is taken at its middle so a large node goes to the rank holding most of it.
+        sorted_pops = pops[order]
+        total = sorted_pops.sum()
+        cum_loads = (numpy.cumsum(sorted_pops) - sorted_pops / 2) / total if total > 0 else \
+            numpy.arange(len(order)) / float(max(len(order), 1))
+        ranks = numpy.minimum((cum_loads * self.nclusters).astype(numpy.int64), self.nclusters - 1)
+        return order, cum_loads, ranks
+
+    def balance_load(self):
+
+        print(' Generating load balancing using HilbertLoadBalancer')
+
+        node_ids, lats, longs, pops = self.read_nodes()
+        numnodes = len(node_ids)
+        print('There are ' + str(numnodes) + ' nodes in this demographics file')
+
+        order, cum_loads, ranks = self.partition(lats, longs, pops)
+        max_over_avg = max_over_avg_load(pops[order], ranks, self.nclusters)
+        print(' Population of the largest partition over average: %.3f' % max_over_avg)
+
+        max_node_pop = pops.max() if numnodes and pops.max() > 0 else 1.0
+        plt.scatter(longs[order], lats[order], s=self.max_marker_size * pops[order] / max_node_pop,
+                    c=cm.jet(ranks * 256 // self.nclusters))
+        plt.title('Lat/Long scatter of nodes')
+        plt.axis('equal')
+
+        return {'num_nodes': numnodes, 'node_ids': node_ids[order].tolist(), 'cum_loads': cum_loads.tolist(),
+                'lb_fig': plt, 'max_over_avg': max_over_avg}
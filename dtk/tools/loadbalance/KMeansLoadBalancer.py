@@ -125,4 +125,5 @@ class KMeansLoadBalancer(object):
         plt.axis('equal')
                  
         # may need to break that function up in a refactor so that the return is not bag of apples, oranges and potatoes  
-        return {'num_nodes':numnodes, 'node_ids':sorted_node_ids, 'cum_loads':cum_load_list, 'lb_fig': plt}
\ No newline at end of file
+        return {'num_nodes':numnodes, 'node_ids':sorted_node_ids, 'cum_loads':cum_load_list, 'lb_fig': plt,
+                'max_over_avg': biggest_over_avg}
\ No newline at end of file
@@ -1,6 +1,7 @@
 import struct, array
 
 from . KMeansLoadBalancer import KMeansLoadBalancer
+from . HilbertLoadBalancer import HilbertLoadBalancer
 
 
 class LoadBalanceGenerator(object):
@@ -18,6 +19,7 @@ class LoadBalanceGenerator(object):
         self.load_balance_nodes_list = None # output of load balance algo 
         self.load_balance_cum_loads_list = None # output of load balance algo
         self.num_nodes = 0 # number of nodes to load balance, output of load balance algo
+        self.load_balance_max_over_avg = None # population of the largest partition over average, output of load balance algo
         
         # load balance visualization figure; returned by algo
         self.load_balance_fig = None
@@ -46,6 +48,9 @@ class LoadBalanceGenerator(object):
                                          max_equal_clusters_iterations, 
                                          cluster_max_over_avg_threshold
                                          )
+        elif self.load_balanace_algo == 'hilbert':
+            # population-weighted partitions along a space-filling curve, for large numbers of nodes
+            self.lb = HilbertLoadBalancer(self.demographics_file_path, self.num_cores)
         else:
             raise ValueError("The " + str(self.load_balanace_algo) + " is not implemented yet.")
         
@@ -55,6 +60,9 @@ class LoadBalanceGenerator(object):
         self.load_balance_nodes_list = load_balance['node_ids']
         self.load_balance_cum_loads_list = load_balance['cum_loads']
         self.load_balance_fig = load_balance['lb_fig']
+        self.load_balance_max_over_avg = load_balance['max_over_avg']
+        print(' Load balance (%s): largest partition is %.3f times the average' % (self.load_balanace_algo,
+                                                                                  self.load_balance_max_over_avg))
         
         
     # save loadbalance binary for DTK input
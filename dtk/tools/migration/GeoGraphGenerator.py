@@ -3,8 +3,10 @@ from math import radians, cos, sin, asin, sqrt
 import warnings
 
 import networkx as nx
+import numpy as np
 
 from dtk.tools.migration.GraphGenerator import GraphGenerator
+from dtk.tools.migration.distances import haversine_distance, neighbor_pairs
 
 
 class GeoGraphGenerator(GraphGenerator):
@@ -47,11 +49,19 @@ class GeoGraphGenerator(GraphGenerator):
             G.position[node_id] = (properties[0], properties[1])  # (x,y) for matplotlib
 
         # add an edge between any two nodes distanced less than max_kms away
-
-        for n in itertools.combinations(G.nodes(), 2):
-            distance = self.get_haversine_distance(G.position[n[0]][0], G.position[n[0]][1], G.position[n[1]][0],
-                                                   G.position[n[1]][1])
-            if not self.migration_radius or distance < self.migration_radius:
+        if self.migration_radius:
+            # Only look for the nodes within the radius with a spatial index
+            nodes = list(G.nodes())
+            lon, lat = np.array([G.position[node_id] for node_id in nodes]).T
+            sources, destinations, distances = neighbor_pairs(lat, lon, max_distance=self.migration_radius,
+                                                              distance_function=haversine_distance)
+            G.add_weighted_edges_from((nodes[src], nodes[dest], distance)
+                                      for src, dest, distance in zip(sources.tolist(), destinations.tolist(),
+                                                                     distances.tolist()) if src < dest)
+        else:
+            for n in itertools.combinations(G.nodes(), 2):
+                distance = self.get_haversine_distance(G.position[n[0]][0], G.position[n[0]][1], G.position[n[1]][0],
+                                                       G.position[n[1]][1])
                 G.add_edge(n[0], n[1], weight=distance)
 
         # add edge based on adjacency matrix
@@ -66,16 +76,6 @@ class GeoGraphGenerator(GraphGenerator):
 
         return G
 
-    def get_shortest_paths(self):
-        """
-        Get the shortest paths based on link weights.
-
-        Returns:
-            Float value of shortest path.
-        """
-
-        return nx.shortest_path_length(self.graph, weight='weight')
-
     @staticmethod
     def get_haversine_distance(lon1, lat1, lon2, lat2) -> float:
         """
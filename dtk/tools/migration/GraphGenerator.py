@@ -2,10 +2,13 @@ import abc
 import csv
 import json
 import os
+from multiprocessing import Pool
 from typing import Union, TextIO, Tuple
 import networkx as nx
 import matplotlib.pyplot as plt
 
+SOURCES_PER_TASK = 100  # Number of sources for which each process computes the shortest paths at once
+
 
 def generate_node_properties(demographics_file_path: str) -> Tuple[dict, dict]:
     """
@@ -71,6 +74,64 @@ def read_csv_migration_network_file(migration_network_file: TextIO) -> dict:
     return adjacency_list
 
 
+def pool_worker_initializer(graph, cutoff) -> None:
+    """
+    Initializer function for the process pool computing the shortest paths.
+    Send the graph once to each process instead of with every task.
+
+    Args:
+        graph: The networkx graph
+        cutoff: The maximum path length
+    """
+    sources_shortest_path_lengths.graph = graph
+    sources_shortest_path_lengths.cutoff = cutoff
+
+
+def sources_shortest_path_lengths(sources) -> list:
+    """
+    Compute the shortest path lengths from each of the sources, stopping at the cutoff length.
+
+    Args:
+        sources: The list of source nodes
+
+    Returns:
+        List of (source, {destination: path length}) tuples.
+    """
+    graph = sources_shortest_path_lengths.graph
+    cutoff = sources_shortest_path_lengths.cutoff
+    return [(src, nx.single_source_dijkstra_path_length(graph, src, cutoff=cutoff, weight='weight'))
+            for src in sources]
+
+
+def bounded_shortest_path_lengths(graph: nx.Graph, cutoff: float, processes: Union[int, None] = 1):
+    """
+    Shortest path lengths between all the nodes closer than the cutoff length.
+    Runs a Dijkstra search limited to the cutoff from each source, the sources are distributed between processes.
+
+    Args:
+        graph: The networkx graph
+        cutoff: The maximum path length
+        processes: The number of processes to use (default: compute in this process). None to use all the CPUs.
+            The graph is sent to each process, and scripts using processes need an
+            ``if __name__ == '__main__':`` guard on platforms spawning them (Windows, macOS).
+
+    Returns:
+        Generator of (source, {destination: path length}) tuples like networkx `shortest_path_length`.
+    """
+    nodes = list(graph.nodes())
+    batches = [nodes[i:i + SOURCES_PER_TASK] for i in range(0, len(nodes), SOURCES_PER_TASK)]
+
+    if processes == 1 or len(batches) <= 1:
+        pool_worker_initializer(graph, cutoff)
+        for batch in batches:
+            yield from sources_shortest_path_lengths(batch)
+        return
+
+    with Pool(processes, initializer=pool_worker_initializer, initargs=(graph, cutoff)) as pool:
+        for result in pool.imap(sources_shortest_path_lengths, batches):
+            yield from result
+
+
 class GraphGenerator(object):
     def __init__(self, migration_network_file_path: str, demographics_file_path: Union[str, None] = None,
                  node_label_2_id: Union[dict, None] = None,
@@ -114,10 +175,10 @@ class GraphGenerator(object):
                              "demographics file ")
 
         if demographics_file_path:
-            self.node_properties, self.node_label_2_id = generate_node_properties(demographics_file_path)
+            self.node_label_2_id, self.node_properties = generate_node_properties(demographics_file_path)
         else:
-            self.node_properties = node_label_2_id
-            self.node_label_2_id = node_properties
+            self.node_properties = node_properties
+            self.node_label_2_id = node_label_2_id
         self.adjacency_list = self.load_migration_network_file()
         self.graph = None
 
@@ -210,9 +271,23 @@ class GraphGenerator(object):
         """
         return self.graph
 
-    @abc.abstractmethod
-    def get_shortest_paths(self):
-        pass
+    def get_shortest_paths(self, cutoff: Union[float, None] = None, processes: Union[int, None] = 1):
+        """
+        Get the shortest paths based on link weights.
+
+        Args:
+            cutoff: Only compute the paths shorter than the cutoff, from each source independently.
+                None to compute all the paths.
+            processes: Number of processes computing the paths when a cutoff is given (default: this process only).
+                None to use all the CPUs, see :py:func:`bounded_shortest_path_lengths`.
+
+        Returns:
+            Iterator of (source, {destination: path length}) tuples.
+        """
+        if cutoff is None:
+            return nx.shortest_path_length(self.graph, weight='weight')
+
+        return bounded_shortest_path_lengths(self.graph, cutoff, processes)
 
     def save_migration_graph_topo_visualization(self, output_dir):
         self.get_topology()
@@ -1,5 +1,6 @@
 import heapq
 import warnings
+from typing import Union
 
 import networkx as nx
 
@@ -13,13 +14,15 @@ class GravityModelRatesGenerator(GraphGeneratedLinkRatesModelGenerator):
     see :py:class:`~dtk.tools.migration.MigrationGenerator` for path lengths/weights and graph topology generation.
     """
 
-    def __init__(self, graph_generator: GraphGenerator, coeff: float = 1e-4):
+    def __init__(self, graph_generator: GraphGenerator, coeff: float = 1e-4, processes: Union[int, None] = 1):
         """
         Create a rates matrix based on the graph provided.
 
         Args:
             graph_generator: A :py:class:`~dtk.tools.migration.GraphGenerator` object.
             coeff: A gravity model coefficient for calculating the **mig_rate**.
+            processes: Number of processes computing the shortest paths (default: this process only).
+                None to use all the CPUs, see :py:func:`~dtk.tools.migration.GraphGenerator.bounded_shortest_path_lengths`.
         """
         super().__init__(graph_generator)
         warnings.warn("GravityModelRatesGenerator is deprecated.", DeprecationWarning)
@@ -28,6 +31,7 @@ class GravityModelRatesGenerator(GraphGeneratedLinkRatesModelGenerator):
             raise ValueError("A Graph Generator is required for the GravityModelRatesGenerator")
 
         self.coeff = coeff
+        self.processes = processes
         self.link_rates = None # output of gravity model based migration links generation
         self.path_lengths = None
 
@@ -38,8 +42,13 @@ class GravityModelRatesGenerator(GraphGeneratedLinkRatesModelGenerator):
         Returns:
             A weighted adjacency list calculated via gravity model.
         """
+        mindist = 1  # 1km minimum distance in gravity model for improved short-distance asymptotic behavior
+        dist_cutoff = 20  # beyond 20km effective distance not reached in 1 day.
+        max_migration_dests = 100  # limit of DTK local migration
+
         self.graph_generator.generate_graph()
-        self.path_lengths = self.graph_generator.get_shortest_paths()
+        # The paths beyond the cutoff are not used: stop the search from each source at the cutoff
+        self.path_lengths = self.graph_generator.get_shortest_paths(cutoff=dist_cutoff, processes=self.processes)
 
         paths = {}
 
@@ -47,10 +56,6 @@ class GravityModelRatesGenerator(GraphGeneratedLinkRatesModelGenerator):
 
         max_migs = []
 
-        mindist = 1  # 1km minimum distance in gravity model for improved short-distance asymptotic behavior
-        dist_cutoff = 20  # beyond 20km effective distance not reached in 1 day.
-        max_migration_dests = 100  # limit of DTK local migration
-
         for src, v in self.path_lengths:
             paths[src] = {}
 
@@ -1,10 +1,15 @@
+import itertools
 import json
 import logging
 import os
 from enum import Enum
-from struct import pack
+from struct import calcsize
 from typing import Union, Tuple, List
+
+import numpy as np
+
 from dtk.tools.climate.BaseInputFile import BaseInputFile
+from dtk.tools.climate.BinaryFilesHelpers import format_node_offsets
 
 
 class MigrationTypes(Enum):
@@ -29,9 +34,118 @@ MAX_DESTINATIONS_BY_ROUTE = {
     MigrationTypes.air: 100
 }
 
+# The destination ids are written as native unsigned longs (struct format 'L') and the rates as doubles
+DESTINATION_ID_DTYPE = np.dtype('u%d' % calcsize('L'))
+RATE_DTYPE = np.dtype('d')
+
+# The NodeOffsets are computed with 4 bytes ids + 8 bytes rates per destination
+OFFSET_BYTES_PER_DESTINATION = 12
+
+# Maximum number of destinations converted at once when writing the binary file
+WRITE_CHUNK_DESTINATIONS = 2 ** 20
+
 logger = logging.getLogger(__name__)
 
 
+class MigrationRates:
+    """
+    Migration rates matrix stored as CSR-style arrays: the destinations and rates of all the sources are concatenated,
+    the destinations of node_ids[i] being destinations[indptr[i]:indptr[i + 1]].
+    """
+
+    def __init__(self, node_ids, indptr, destinations, rates):
+        self.node_ids = np.asarray(node_ids, dtype=np.int64)
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.destinations = np.asarray(destinations, dtype=np.int64)
+        self.rates = np.ascontiguousarray(rates, dtype=RATE_DTYPE)
+
+    @classmethod
+    def from_rows(cls, sources, destinations, rates):
+        """
+        Create the matrix from (source, destination, rate) rows. The rows of a source do not need to be contiguous,
+        the sources are ordered by first appearance.
+        """
+        sources = np.asarray(sources, dtype=np.int64)
+        node_ids, first_index, inverse = np.unique(sources, return_index=True, return_inverse=True)
+
+        # Number the sources by first appearance and group the rows by source keeping their order
+        appearance = np.argsort(first_index, kind='stable')
+        rank = np.empty_like(appearance)
+        rank[appearance] = np.arange(len(appearance))
+        order = np.argsort(rank[inverse], kind='stable')
+
+        counts = np.bincount(rank[inverse], minlength=len(node_ids))
+        indptr = np.concatenate(([0], np.cumsum(counts)))
+        return cls(node_ids[appearance], indptr, np.asarray(destinations)[order], np.asarray(rates)[order])
+
+    @classmethod
+    def from_matrix(cls, matrix):
+        """
+        Create the arrays from a ``{source: {destination: rate}}`` matrix.
+        """
+        counts = np.fromiter((len(dests) for dests in matrix.values()), dtype=np.int64, count=len(matrix))
+        total = int(counts.sum())
+        destinations = np.fromiter(itertools.chain.from_iterable(d.keys() for d in matrix.values()),
+                                   dtype=np.int64, count=total)
+        rates = np.fromiter(itertools.chain.from_iterable(d.values() for d in matrix.values()),
+                            dtype=RATE_DTYPE, count=total)
+        return cls(list(matrix.keys()), np.concatenate(([0], np.cumsum(counts))), destinations, rates)
+
+    @property
+    def counts(self) -> np.ndarray:
+        return np.diff(self.indptr)
+
+    def to_matrix(self) -> dict:
+        return {int(node_id): dict(zip(self.destinations[start:end].tolist(), self.rates[start:end].tolist()))
+                for node_id, start, end in zip(self.node_ids, self.indptr[:-1], self.indptr[1:])}
+
+    def truncate(self, max_destinations):
+        """
+        Keep the first max_destinations destinations of each source.
+        """
+        counts = self.counts
+        rank = np.arange(len(self.destinations)) - np.repeat(self.indptr[:-1], counts)
+        keep = rank < max_destinations
+        new_counts = np.minimum(counts, max_destinations)
+        return MigrationRates(self.node_ids, np.concatenate(([0], np.cumsum(new_counts))),
+                              self.destinations[keep], self.rates[keep])
+
+    def to_file(self, migration_bin_file_path: str):
+        """
+        Write the binary content of the migration file: for each source, the destination ids then the rates.
+        The consecutive sources having the same number of destinations are written together as a structured array,
+        by chunks of at most WRITE_CHUNK_DESTINATIONS destinations.
+        """
+        counts = self.counts
+        # Runs of consecutive sources with the same number of destinations
+        boundaries = np.flatnonzero(np.diff(counts)) + 1
+        run_starts = np.concatenate(([0], boundaries)).astype(np.int64)
+        run_ends = np.concatenate((boundaries, [len(counts)])).astype(np.int64)
+
+        with open(migration_bin_file_path, 'wb') as f:
+            for run_start, run_end in zip(run_starts.tolist(), run_ends.tolist()):
+                count = int(counts[run_start])
+                if count == 0:
+                    continue
+
+                node_dtype = np.dtype([('ids', DESTINATION_ID_DTYPE, count), ('rates', RATE_DTYPE, count)])
+                step = max(1, WRITE_CHUNK_DESTINATIONS // count)
+                for chunk_start in range(run_start, run_end, step):
+                    chunk_end = min(chunk_start + step, run_end)
+                    first, last = self.indptr[chunk_start], self.indptr[chunk_end]
+                    block = np.empty(chunk_end - chunk_start, dtype=node_dtype)
+                    block['ids'] = self.destinations[first:last].reshape(-1, count)
+                    block['rates'] = self.rates[first:last].reshape(-1, count)
+                    block.tofile(f)
+
+    def node_offsets(self) -> str:
+        """
+        NodeOffsets string of the migration header: 8 hexadecimal digits for the node id then 8 for the offset.
+        """
+        offsets = np.concatenate(([0], np.cumsum(self.counts * OFFSET_BYTES_PER_DESTINATION)[:-1]))
+        return format_node_offsets(self.node_ids, offsets, uppercase=True)
+
+
 class MigrationFile(BaseInputFile):
     """
     Methods to create migration files for use with EMOD.
@@ -51,11 +165,27 @@ class MigrationFile(BaseInputFile):
                       node_destination_2: rate
                     }
                 }
+
+                or a :py:class:`MigrationRates` object (see :py:meth:`from_arrays`).
         """
         super(MigrationFile, self).__init__(idref)
         self.idref = idref
         self.matrix = matrix
 
+    @classmethod
+    def from_arrays(cls, idref, sources, destinations, rates):
+        """
+        Create a MigrationFile from arrays of (source, destination, rate) rows, without building the matrix
+        dictionary.
+
+        Args:
+            idref: The ID reference.
+            sources: The source node ids.
+            destinations: The destination node ids.
+            rates: The migration rates.
+        """
+        return cls(idref, MigrationRates.from_rows(sources, destinations, rates))
+
     @staticmethod
     def flatten_matrix(matrix) -> List[Tuple[int, int, float]]:
         """
@@ -97,7 +227,8 @@ class MigrationFile(BaseInputFile):
             None
         """
         with open(rates_txt_file_path, 'w') as fout:
-            items = self.flatten_matrix(self.matrix)
+            matrix = self.matrix.to_matrix() if isinstance(self.matrix, MigrationRates) else self.matrix
+            items = self.flatten_matrix(matrix)
             for src, dest, mig in items:
                 fout.write('%d %d %0.1g\n' % (int(src), int(dest), mig))
 
@@ -135,46 +266,38 @@ class MigrationFile(BaseInputFile):
             None
         """
 
-        # Before generating, transform the matrix
-        matrix_id = self.nodes_to_id()
-
-        offset = 0
-        offset_str = ""
-
-        # Make sure we have the same destinations size everywhere
-        # First find the max size
-        max_size = max([len(dest) for dest in matrix_id.values()])
-
-        # Add a fake node destinations in nodes to make sure the destinations are all same size
-        for source, dests in self.matrix.items():
-            self.get_filler_nodes(source, dests, max_size, matrix_id.keys())
+        if isinstance(self.matrix, MigrationRates):
+            rates = self.matrix
+        else:
+            # Before generating, transform the matrix
+            matrix_id = self.nodes_to_id()
 
-        with open(migration_bin_file_path, 'wb') as migration_file:
-            max_destinations = 0
-            for nodeid, destinations in matrix_id.items():
-                if route is not None:
-                    if len(destinations) > MAX_DESTINATIONS_BY_ROUTE[route]:
-                        logger.warning(f'There are {len(destinations)} destinations from ID={nodeid}.  Trimming '
-                                       f'to {MAX_DESTINATIONS_BY_ROUTE[route]} {route.value} migration max) with '
-                                       f'largest rates.')
+            # Make sure we have the same destinations size everywhere
+            # First find the max size
+            max_size = max([len(dest) for dest in matrix_id.values()])
 
-                        # trim destinations to max size of route
-                        destinations = {k: destinations[k] for k in
-                                        destinations.keys()[:MAX_DESTINATIONS_BY_ROUTE[route]]}
-                    max_destinations = max(len(destinations), max_destinations)
+            # Add a fake node destinations in nodes to make sure the destinations are all same size
+            for source, dests in self.matrix.items():
+                self.get_filler_nodes(source, dests, max_size, matrix_id.keys())
 
-                destinations_id = pack('L' * len(destinations.keys()), *destinations.keys())
-                destinations_rate = pack('d' * len(destinations.values()), *destinations.values())
+            rates = MigrationRates.from_matrix(matrix_id)
 
-                # Write
-                migration_file.write(destinations_id)
-                migration_file.write(destinations_rate)
+        max_destinations = 0
+        if route is not None:
+            counts = rates.counts
+            for nodeid, count in zip(rates.node_ids[counts > MAX_DESTINATIONS_BY_ROUTE[route]],
+                                     counts[counts > MAX_DESTINATIONS_BY_ROUTE[route]]):
+                logger.warning(f'There are {count} destinations from ID={nodeid}.  Trimming '
+                               f'to {MAX_DESTINATIONS_BY_ROUTE[route]} {route.value} migration max) with '
+                               f'largest rates.')
 
-                # Write offset
-                offset_str = "%s%s%s" % (offset_str, "{0:08X}".format(nodeid), "{0:08X}".format(offset))
+            # trim destinations to max size of route
+            rates = rates.truncate(MAX_DESTINATIONS_BY_ROUTE[route])
+            max_destinations = int(rates.counts.max(initial=0))
 
-                # Increment offset
-                offset += 12 * len(destinations)
+        # Write the sources by blocks
+        rates.to_file(migration_bin_file_path)
+        offset_str = rates.node_offsets()
 
         # TODO, we should move migration header generation outside to its own class so it can be called by both the
         # createmigrationheader script and here
@@ -188,7 +311,7 @@ class MigrationFile(BaseInputFile):
             # TODO Test that this is sufficient
             # Write the headers
             meta = self.generate_headers({
-                "NodeCount": len(matrix_id),
+                "NodeCount": len(rates.node_ids),
                 "DatavalueCount": max_destinations
             })
             migration_headers = {
@@ -207,10 +330,14 @@ class MigrationFile(BaseInputFile):
         Fill the destinations with n filler nodes.
         Verifies that the node IDs chosen are not the source, not the destinations, and come from the **available_nodes**.
         """
-        while len(dests) < n:
-            for node in available_nodes:
-                if node not in dests and node != source:
-                    dests[node] = 0
+        if len(dests) >= n:
+            return
+
+        for node in available_nodes:
+            if node not in dests and node != source:
+                dests[node] = 0
+                if len(dests) == n:
+                    break
 
     def nodes_to_id(self):
         """
@@ -75,13 +75,3 @@ class SmallWorldGridGraphGenerator(GraphGenerator):
         self.graph = G
 
         return G
-
-    def get_shortest_paths(self):
-        """
-        Get shortest paths based on link weights.
-        
-        Returns:
-            The shortest paths.
-        """
-        return nx.shortest_path_length(self.graph, weight='weight')
-
@@ -2,10 +2,12 @@ import json
 from typing import Union, Tuple, List
 import numpy as np
 import pandas as pd
-from geopy.distance import distance
 from dtk.tools.migration.LinkRatesModelGenerator import LinkRatesModelGenerator
+from dtk.tools.migration.distances import DISTANCE_FUNCTIONS, neighbor_pairs
 import os
 
+CHUNK_SIZE = 1000  # Number of source nodes for which the distances are computed at once
+
 
 class StaticGravityModelRatesGenerator(LinkRatesModelGenerator):
     """
@@ -13,7 +15,8 @@ class StaticGravityModelRatesGenerator(LinkRatesModelGenerator):
     """
 
     def __init__(self, demographics_file_path: str, gravity_params: np.array,
-                 exclude_nodes: Union[List, None]=None):
+                 exclude_nodes: Union[List, None]=None, max_neighbors: Union[int, None]=None,
+                 max_distance: Union[float, None]=None, distance_method: str='geodesic'):
         """
 
         Args:
@@ -21,6 +24,9 @@ class StaticGravityModelRatesGenerator(LinkRatesModelGenerator):
             gravity_params: A list/array of gravity parameters used to calculated migration rate. Expects three
             positive values and one negative value.
             exclude_nodes: A list of nodes to exclude from link rate generation.
+            max_neighbors: Only create links to the **max_neighbors** nearest nodes of each node.
+            max_distance: Only create links between nodes closer than **max_distance** km.
+            distance_method: 'geodesic' (WGS-84 ellipsoid, as geopy) or 'haversine' (sphere).
         """
         super().__init__()  # This Model has no graph
 
@@ -43,6 +49,13 @@ class StaticGravityModelRatesGenerator(LinkRatesModelGenerator):
 
         self.exclude_nodes = exclude_nodes
 
+        if distance_method not in DISTANCE_FUNCTIONS:
+            raise ValueError("distance_method must be one of: {}".format(", ".join(DISTANCE_FUNCTIONS)))
+
+        self.max_neighbors = max_neighbors
+        self.max_distance = max_distance
+        self.distance_function = DISTANCE_FUNCTIONS[distance_method]
+
     @staticmethod
     def load_demographics_file(demo_file):
         with open(demo_file, 'r') as f:
@@ -95,6 +108,24 @@ class StaticGravityModelRatesGenerator(LinkRatesModelGenerator):
             prob_trip = np.min([1., num_trips / ph])
             return prob_trip
 
+    def compute_migration_probabilities(self, ph: np.ndarray, pd: np.ndarray, d: np.ndarray) -> np.ndarray:
+        """
+        Vectorized :py:meth:`compute_migration_probability` for arrays of populations and distances.
+
+        Args:
+            ph: Populations of the home nodes.
+            pd: Populations of the destination nodes.
+            d: The distances between the nodes.
+
+        Returns:
+            The array of probabilities of migration.
+        """
+        with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+            num_trips = self.gravity_params[0] * ph ** self.gravity_params[1] * pd ** self.gravity_params[2] * d ** \
+                        self.gravity_params[3]
+            prob_trip = np.minimum(1., num_trips / ph)
+        return np.where((ph == 0) | (pd == 0), 0., prob_trip)
+
     def compute_migration(self, df: pd.DataFrame, return_prob_sums: bool=False) -> Union[dict, Tuple[dict, np.ndarray]]:
         """
         Calculate the migration based on the demographics data and the gravity parameters.
@@ -108,37 +139,59 @@ class StaticGravityModelRatesGenerator(LinkRatesModelGenerator):
             total migration probabilities for each node.
             If **return_prob_sums** is False, it returns the link rates dictionary.
         """
-        migr = {}
+        node_ids = df['node_id'].values
+        lat, long, pop = (df[column].values.astype(float) for column in ('lat', 'long', 'pop'))
+        excluded = np.isin(node_ids, self.exclude_nodes) if self.exclude_nodes else np.zeros(len(df), dtype=bool)
 
-        p_sum = np.zeros(len(df))
-        jj = 0
-        for i1, r1 in df.iterrows():
-            migr[r1['node_id']] = {}
-
-            for i2, r2 in df.iterrows():
-                if r2['node_id'] == r1['node_id']:
-                    pass
-                elif self.exclude_nodes and (r1['node_id'] in self.exclude_nodes or
-                                             r2['node_id'] in self.exclude_nodes):
-                    migr[r1['node_id']][r2['node_id']] = 0.0
-                else:
-                    d = distance((r1['lat'], r1['long']), (r2['lat'], r2['long'])).km
-                    migr[r1['node_id']][r2['node_id']] = self.compute_migration_probability(r1['pop'], r2['pop'],
-                                                                                            d)
-
-            p_sum[jj] = np.sum(list(migr[r1['node_id']].values()))
-            jj += 1
+        if self.max_neighbors is not None or self.max_distance is not None:
+            migr, p_sum = self._compute_neighbors_migration(node_ids, lat, long, pop, excluded)
+        else:
+            migr, p_sum = self._compute_all_pairs_migration(node_ids, lat, long, pop, excluded)
 
         if return_prob_sums:
             return migr, p_sum
         else:
             return migr
 
+    def _compute_all_pairs_migration(self, node_ids, lat, long, pop, excluded):
+        # Process the source nodes by chunks to bound the size of the distance matrix
+        migr = {}
+        p_sum = np.zeros(len(node_ids))
+        keys = node_ids.tolist()
+        for start in range(0, len(node_ids), CHUNK_SIZE):
+            rows = slice(start, start + CHUNK_SIZE)
+            d = self.distance_function(lat[rows, None], long[rows, None], lat[None, :], long[None, :])
+            prob = self.compute_migration_probabilities(pop[rows, None], pop[None, :], d)
+            prob[excluded[rows], :] = 0.
+            prob[:, excluded] = 0.
+
+            for i, row in enumerate(prob.tolist(), start):
+                del row[i]  # No link from a node to itself
+                destinations = keys[:i] + keys[i + 1:]
+                migr[keys[i]] = dict(zip(destinations, row))
+                p_sum[i] = np.sum(row)
+
+        return migr, p_sum
+
+    def _compute_neighbors_migration(self, node_ids, lat, long, pop, excluded):
+        sources, destinations, d = neighbor_pairs(lat, long, self.max_neighbors, self.max_distance,
+                                                  self.distance_function)
+        prob = self.compute_migration_probabilities(pop[sources], pop[destinations], d)
+        prob[excluded[sources] | excluded[destinations]] = 0.
+
+        keys = node_ids.tolist()
+        migr = {node_id: {} for node_id in keys}
+        for source, destination, p in zip(sources.tolist(), destinations.tolist(), prob.tolist()):
+            migr[keys[source]][keys[destination]] = p
+        p_sum = np.bincount(sources, weights=prob, minlength=len(keys))
+
+        return migr, p_sum
+
     def generate(self, outf='grav_migr_rates.json') -> dict:
         df = self.load_demographics_file(self.demographics_file_path)
 
         if self.exclude_nodes:
-            df = df[np.logical_not(np.in1d(df['node_id'], self.exclude_nodes))]
+            df = df[np.logical_not(np.isin(df['node_id'], self.exclude_nodes))]
 
         migr_dict = self.compute_migration(df, return_prob_sums=False)
 
@@ -0,0 +1,154 @@
+"""
+Vectorized distances between geographic coordinates (in decimal degrees).
+
+All the functions broadcast their arguments like NumPy ufuncs: pass arrays of the same shape for element-wise
+distances or use `lat[:, None]` / `lat[None, :]` to get a distance matrix.
+"""
+import numpy as np
+from geopy.distance import distance as geopy_distance
+from scipy.spatial import cKDTree
+
+EARTH_RADIUS_KM = 6367  # Same radius as GeoGraphGenerator.get_haversine_distance
+
+# WGS-84 ellipsoid used by geopy
+WGS84_A = 6378.137
+WGS84_F = 1 / 298.257223563
+WGS84_B = (1 - WGS84_F) * WGS84_A
+
+VINCENTY_MAX_ITERATIONS = 200
+VINCENTY_TOLERANCE = 1e-12
+
+
+def haversine_distance(lat1, lon1, lat2, lon2, radius=EARTH_RADIUS_KM) -> np.ndarray:
+    """
+    Great circle distance in km.
+    """
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * radius * np.arcsin(np.sqrt(a))
+
+
+def _vincenty_lambda(lambda_, L, sin_U1, cos_U1, sin_U2, cos_U2):
+    # One iteration of the Vincenty inverse formula
+    sin_lambda, cos_lambda = np.sin(lambda_), np.cos(lambda_)
+    sin_sigma = np.sqrt((cos_U2 * sin_lambda) ** 2 + (cos_U1 * sin_U2 - sin_U1 * cos_U2 * cos_lambda) ** 2)
+    cos_sigma = sin_U1 * sin_U2 + cos_U1 * cos_U2 * cos_lambda
+    sigma = np.arctan2(sin_sigma, cos_sigma)
+    sin_alpha = np.where(sin_sigma == 0, 0, cos_U1 * cos_U2 * sin_lambda / sin_sigma)
+    cos_sq_alpha = 1 - sin_alpha ** 2
+    # Equatorial lines have cos_sq_alpha = 0
+    cos_2sigma_m = np.where(cos_sq_alpha == 0, 0, cos_sigma - 2 * sin_U1 * sin_U2 / cos_sq_alpha)
+    C = WGS84_F / 16 * cos_sq_alpha * (4 + WGS84_F * (4 - 3 * cos_sq_alpha))
+    new_lambda = L + (1 - C) * WGS84_F * sin_alpha * (
+        sigma + C * sin_sigma * (cos_2sigma_m + C * cos_sigma * (-1 + 2 * cos_2sigma_m ** 2)))
+    return sin_sigma, cos_sigma, sigma, cos_sq_alpha, cos_2sigma_m, new_lambda
+
+
+def geodesic_distance(lat1, lon1, lat2, lon2) -> np.ndarray:
+    """
+    Distance in km on the WGS-84 ellipsoid, matching `geopy.distance.distance`.
+    Uses the Vincenty inverse formula on all the pairs at once. The few nearly antipodal pairs for which it does not
+    converge are computed by geopy.
+    """
+    lat1, lon1, lat2, lon2 = np.broadcast_arrays(*(np.asarray(x, dtype=float) for x in (lat1, lon1, lat2, lon2)))
+    shape = lat1.shape
+    lat1, lon1, lat2, lon2 = (x.reshape(-1) for x in (lat1, lon1, lat2, lon2))
+
+    L = np.radians(lon2 - lon1)
+    U1 = np.arctan((1 - WGS84_F) * np.tan(np.radians(lat1)))
+    U2 = np.arctan((1 - WGS84_F) * np.tan(np.radians(lat2)))
+    sin_U1, cos_U1 = np.sin(U1), np.cos(U1)
+    sin_U2, cos_U2 = np.sin(U2), np.cos(U2)
+
+    # Iterate on the pairs not converged yet only
+    lambda_ = L.copy()
+    active = np.arange(L.size)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        for _ in range(VINCENTY_MAX_ITERATIONS):
+            new_lambda = _vincenty_lambda(lambda_[active], L[active], sin_U1[active], cos_U1[active],
+                                          sin_U2[active], cos_U2[active])[-1]
+            converged = np.abs(new_lambda - lambda_[active]) <= VINCENTY_TOLERANCE
+            lambda_[active] = new_lambda
+            active = active[~converged]
+            if not active.size:
+                break
+
+        sin_sigma, cos_sigma, sigma, cos_sq_alpha, cos_2sigma_m, _ = _vincenty_lambda(lambda_, L, sin_U1, cos_U1,
+                                                                                      sin_U2, cos_U2)
+        u_sq = cos_sq_alpha * (WGS84_A ** 2 - WGS84_B ** 2) / WGS84_B ** 2
+        A = 1 + u_sq / 16384 * (4096 + u_sq * (-768 + u_sq * (320 - 175 * u_sq)))
+        B = u_sq / 1024 * (256 + u_sq * (-128 + u_sq * (74 - 47 * u_sq)))
+        delta_sigma = B * sin_sigma * (cos_2sigma_m + B / 4 * (
+            cos_sigma * (-1 + 2 * cos_2sigma_m ** 2)
+            - B / 6 * cos_2sigma_m * (-3 + 4 * sin_sigma ** 2) * (-3 + 4 * cos_2sigma_m ** 2)))
+        km = WGS84_B * A * (sigma - delta_sigma)
+
+    # Nearly antipodal pairs
+    km[active] = np.nan
+    for i in np.nonzero(np.isnan(km))[0]:
+        km[i] = geopy_distance((lat1[i], lon1[i]), (lat2[i], lon2[i])).km
+
+    return km.reshape(shape)
+
+
+DISTANCE_FUNCTIONS = {'geodesic': geodesic_distance, 'haversine': haversine_distance}
+
+
+def unit_vectors(lat, lon) -> np.ndarray:
+    """
+    Cartesian coordinates on the unit sphere, allowing to index the points with a KD-tree.
+    """
+    lat, lon = np.radians(lat), np.radians(lon)
+    return np.column_stack((np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)))
+
+
+def neighbor_pairs(lat, lon, max_neighbors=None, max_distance=None, distance_function=geodesic_distance):
+    """
+    Find the pairs of distinct points close to each other with a spatial index instead of computing all the distances.
+
+    Args:
+        lat: Array of latitudes
+        lon: Array of longitudes
+        max_neighbors: Only keep the `max_neighbors` nearest points of each point
+        max_distance: Only keep the points closer than `max_distance` km
+
+    Returns:
+        Tuple (sources, destinations, distances) of arrays sorted by source index then distance.
+    """
+    lat, lon = np.asarray(lat, dtype=float), np.asarray(lon, dtype=float)
+    points = unit_vectors(lat, lon)
+    tree = cKDTree(points)
+
+    # The index works with chord lengths on the unit sphere, the search radius has a 1% margin as the spherical
+    # distance differs slightly from the ellipsoid one. The exact distance is checked below.
+    if max_distance is not None:
+        angle = min(np.pi, max_distance * 1.01 / min(EARTH_RADIUS_KM, WGS84_B))
+        chord = 2 * np.sin(angle / 2)
+    else:
+        chord = np.inf
+
+    if max_neighbors is not None:
+        k = min(max_neighbors + 1, len(points))
+        chords, destinations = tree.query(points, k=k, distance_upper_bound=chord)
+        sources = np.repeat(np.arange(len(points)), k)
+        destinations = destinations.reshape(-1)
+        valid = (destinations < len(points)) & (destinations != sources)
+        sources, destinations = sources[valid], destinations[valid]
+    else:
+        pairs = tree.query_pairs(chord, output_type='ndarray')
+        sources = np.concatenate((pairs[:, 0], pairs[:, 1]))
+        destinations = np.concatenate((pairs[:, 1], pairs[:, 0]))
+
+    distances = distance_function(lat[sources], lon[sources], lat[destinations], lon[destinations])
+
+    keep = np.ones(len(sources), dtype=bool) if max_distance is None else distances < max_distance
+    order = np.lexsort((distances[keep], sources[keep]))
+    sources, destinations, distances = sources[keep][order], destinations[keep][order], distances[keep][order]
+
+    # The nearest neighbors were chosen on the sphere, keep the max_neighbors nearest on the ellipsoid
+    if max_neighbors is not None:
+        rank = np.arange(len(sources)) - np.searchsorted(sources, sources)
+        keep = rank < max_neighbors
+        sources, destinations, distances = sources[keep], destinations[keep], distances[keep]
+
+    return sources, destinations, distances
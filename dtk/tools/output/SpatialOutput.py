@@ -1,9 +1,14 @@
-import struct
-
 import numpy as np
 
 
 class SpatialOutput:
+    """
+    Reader for the SpatialReport_*.bin files.
+
+    By default ``data`` is a writable (n_tstep, n_nodes) float64 array. With ``copy=False``, the data is not copied:
+    ``data`` is a read-only float32 view on the bytes (or on the memory mapped file when using :meth:`from_file`) and
+    :meth:`select` only materializes a subset of nodes and/or timesteps.
+    """
 
     def __init__(self):
         self.n_nodes  = 0
@@ -13,41 +18,110 @@ class SpatialOutput:
         self.start    = 0
         self.interval = 1
 
-    @classmethod
-    def from_bytes(cls, bytes, filtered=False):
+    @staticmethod
+    def _header_size(filtered):
         # The header size changes if the file is a filtered one
-        headersize = 16 if filtered else 8
+        return 16 if filtered else 8
+
+    @classmethod
+    def from_bytes(cls, bytes, filtered=False, copy=True):
+        """
+        Create a SpatialOutput from the content of a file.
+        :param bytes: Any object supporting the buffer protocol (bytes, bytearray, memoryview, mmap...)
+        :param filtered: Is it a SpatialReportMalariaFiltered file?
+        :param copy: If False, the arrays are read-only float32 views of the given buffer
+        :return: The SpatialOutput
+        """
+        return cls._from_buffer(np.frombuffer(bytes, dtype=np.uint8), filtered, copy)
+
+    @classmethod
+    def from_file(cls, path, filtered=None, copy=True):
+        """
+        Create a SpatialOutput by memory mapping a file.
+        :param path: Path to the SpatialReport_*.bin file
+        :param filtered: Is it a filtered file? If not specified, deduced from the file name
+        :param copy: If False, the arrays are read-only float32 views of the memory mapped file and only the pages
+        actually accessed will be read from the disk
+        :return: The SpatialOutput
+        """
+        if filtered is None:
+            filtered = 'Filtered' in path
+        return cls._from_buffer(np.memmap(path, dtype=np.uint8, mode='r'), filtered, copy)
+
+    @classmethod
+    def _from_buffer(cls, buffer, filtered, copy=True):
+        headersize = cls._header_size(filtered)
 
         # Create the class
         so = cls()
 
-        # Retrive the number of nodes and number of timesteps
-        so.n_nodes, = struct.unpack('i', bytes[0:4])
-        so.n_tstep, = struct.unpack('i', bytes[4:8])
+        # Retrieve the number of nodes and number of timesteps
+        so.n_nodes, so.n_tstep = (int(v) for v in buffer[0:8].view(np.int32))
 
         # If filtered, retrieve the start and interval
         if filtered:
-            start, = struct.unpack('f', bytes[8:12])
-            interval, = struct.unpack('f', bytes[12:16])
+            start, interval = buffer[8:16].view(np.float32)
             so.start = int(start)
             so.interval = int(interval)
 
         # Get the nodeids
-        so.nodeids = struct.unpack(str(so.n_nodes) + 'I', bytes[headersize:headersize + so.n_nodes * 4])
-        so.nodeids = np.asarray(so.nodeids)
+        nodes_end = headersize + so.n_nodes * 4
+        so.nodeids = buffer[headersize:nodes_end].view(np.uint32)
 
         # Retrieve the data
-        so.data = struct.unpack(str(so.n_nodes * so.n_tstep) + 'f',
-                                     bytes[headersize + so.n_nodes * 4:headersize + so.n_nodes * 4 + so.n_nodes * so.n_tstep * 4])
-        so.data = np.asarray(so.data)
-        so.data = so.data.reshape(so.n_tstep, so.n_nodes)
+        data_end = nodes_end + so.n_nodes * so.n_tstep * 4
+        so.data = buffer[nodes_end:data_end].view(np.float32).reshape(so.n_tstep, so.n_nodes)
+
+        if copy:
+            so.nodeids = so.nodeids.astype(np.int64)
+            so.data = so.data.astype(np.float64)
 
         return so
 
-    def to_dict(self):
-        return {'n_nodes' : self.n_nodes,
-                'n_tstep' : self.n_tstep,
-                'nodeids' : self.nodeids,
-                'start'   : self.start,
+    def node_indices(self, node_ids):
+        """
+        Find the columns corresponding to the given node ids.
+        :param node_ids: Iterable of node ids
+        :return: Array of column indices in the same order as node_ids
+        """
+        node_ids = np.asarray(node_ids, dtype=self.nodeids.dtype)
+        order = np.argsort(self.nodeids)
+        positions = np.searchsorted(self.nodeids, node_ids, sorter=order)
+        positions[positions == len(order)] = 0
+        indices = order[positions]
+
+        missing = self.nodeids[indices] != node_ids
+        if missing.any():
+            raise KeyError("Node ids not found in the spatial output: {}".format(node_ids[missing].tolist()))
+
+        return indices
+
+    def select(self, node_ids=None, tstep_start=None, tstep_end=None):
+        """
+        Retrieve a block of the data. Only the requested values are read and copied.
+        :param node_ids: Node ids to retrieve (all nodes if None)
+        :param tstep_start: First timestep index to retrieve (included)
+        :param tstep_end: Last timestep index to retrieve (excluded)
+        :return: A (timesteps, nodes) array
+        """
+        data = self.data[tstep_start:tstep_end]
+        if node_ids is None:
+            return data
+        return data[:, self.node_indices(node_ids)]
+
+    def node_series(self, node_id):
+        """
+        :param node_id: The node id
+        :return: The timeseries of the given node (view on the data)
+        """
+        return self.data[:, self.node_indices([node_id])[0]]
+
+    def to_dict(self, node_ids=None, tstep_start=None, tstep_end=None):
+        nodeids = self.nodeids if node_ids is None else self.nodeids[self.node_indices(node_ids)]
+        data = self.select(node_ids, tstep_start, tstep_end)
+        return {'n_nodes' : len(nodeids),
+                'n_tstep' : data.shape[0],
+                'nodeids' : nodeids,
+                'start'   : self.start + slice(tstep_start, tstep_end).indices(self.n_tstep)[0] * self.interval,
                 'interval': self.interval,
-                'data'    : self.data}
+                'data'    : data}
@@ -1,8 +1,10 @@
 import argparse
-import gc
+import itertools
 import json
+import os
+import time
 
-from dtk.tools.serialization.idtkFileTools import read_idtk_file
+from dtk.tools.serialization import dtkFileTools as dft
 
 """
 This script will take serialization files dumped from a multi-core job
@@ -10,47 +12,125 @@ and merge them into a valid file for single-core initialization
 """
 
 
-def serialized_dtk_to_json(filename_format, core_idx=0):
-    filename = filename_format % core_idx
-    print('\n%s\nReading: %s\n%s\n' % ('-' * 30, filename, '-' * 30))
-    header, payload, contents, data = read_idtk_file(filename)
-    # print(header)
-    # TODO: memory cleanup?
-    del payload
-    del contents
-    suid_keys = [k for k in data['simulation'].keys() if 'SuidGenerator' in k]
-    for suid_key in suid_keys:
-        print('\n%s' % suid_key)
-        print('  Setting %s.numtasks to 1' % suid_key)
-        data['simulation'][suid_key]['numtasks'] = 1
-    print('\n%d nodes on rank %d' % (len(data['simulation']['nodes']), core_idx))
-    # Merge other files into rank-0
-    for core_idx in range(1, 24):
+def suid_generator_keys(simulation):
+    return [k for k in simulation.keys() if 'SuidGenerator' in k]
+
 
-        filename = 'state-00365-%03d.dtk' % core_idx
-        print('\n%s\nReading: %s\n%s\n' % ('-' * 30, filename, '-' * 30))
-        next_header, payload, contents, next_data = read_idtk_file(filename)
-        del payload
-        del contents
+def merged_simulation(ranks):
+    """
+    Merge the simulation objects of the ranks: metadata-only pass, only the simulation chunk of each rank is parsed.
 
-        print(gc.get_count())
-        gc.collect()
+    Args:
+        ranks: The serialized files of the ranks, read lazily.
+
+    Returns:
+        The simulation of the first rank with the SuidGenerators valid for a single core.
+    """
+    simulation = ranks[0].simulation
+    suid_keys = suid_generator_keys(simulation)
+    for suid_key in suid_keys:
+        print('  Setting %s.numtasks to 1' % suid_key)
+        simulation[suid_key]['numtasks'] = 1
 
+    for core_idx, rank in enumerate(ranks[1:], start=1):
+        next_simulation = rank.simulation
         for suid_key in suid_keys:
-            print('\n%s' % suid_key)
-            next_suid_value = next_data['simulation'][suid_key]['next_suid']['id']
-            max_suid_value = data['simulation'][suid_key]['next_suid']['id']
+            next_suid_value = next_simulation[suid_key]['next_suid']['id']
+            max_suid_value = simulation[suid_key]['next_suid']['id']
             if next_suid_value > max_suid_value:
-                print('  Overwriting: %d > %d' % (next_suid_value, max_suid_value))
-                data['simulation'][suid_key]['next_suid']['id'] = next_suid_value
-            else:
-                print('  Keeping:  %d <= %d' % (next_suid_value, max_suid_value))
+                print('  %s: overwriting with rank %d: %d > %d' % (suid_key, core_idx, next_suid_value,
+                                                                  max_suid_value))
+                simulation[suid_key]['next_suid']['id'] = next_suid_value
+
+    simulation['nodes'] = []
+    return simulation
+
+
+def node_chunks(rank, engine):
+    """
+    The node chunks of a rank compressed with engine. The chunks of version 3 and 4 files are copied without parsing
+    the nodes (and without decompressing them if the rank uses the same engine).
+    """
+    if rank.version < 3:
+        # The nodes are not root objects of their own chunks
+        for node in rank.nodes:
+            yield compress(json.dumps(node, separators=(',', ':')), engine)
+        return
+
+    for chunk in itertools.islice(iter(rank.chunks), 1, None):
+        if rank.compression == engine:
+            yield chunk
+        else:
+            yield compress(dft.uncompress(chunk, rank.compression).decode('utf-8'), engine)
+
+
+def compress(contents, engine):
+    data = dft.compress(contents, engine)
+    return data.encode() if isinstance(data, str) else data
+
+
+def merge_serialized_files(filenames, output_filename):
+    """
+    Merge the serialized files of a multi-core simulation into a version 4 file for single-core initialization.
+
+    The files are read lazily: a first pass only reads the simulation of each rank to reconcile the SuidGenerators,
+    then the node chunks are streamed to the merged file, so only one chunk is in memory at once.
+
+    Args:
+        filenames: The serialized files, ordered by rank.
+        output_filename: The merged file.
+
+    Returns:
+        The number of nodes in the merged file.
+    """
+    ranks = []
+    for filename in filenames:
+        print('Reading: %s' % filename)
+        ranks.append(dft.read(filename, lazy=True))
+
+    engine = ranks[0].compression
+    simulation = merged_simulation(ranks)
+
+    header = dft.DtkHeader({
+        'author': ranks[0].author or 'unknown',
+        'bytecount': 0,
+        'chunkcount': 0,
+        'chunksizes': [],
+        'compressed': engine != dft.NONE,
+        'date': time.strftime('%a %b %d %H:%M:%S %Y'),
+        'engine': engine,
+        'tool': os.path.basename(__file__),
+        'version': 4})
+    merged = dft.DtkFileV4(header)
+
+    node_count = 0
+
+    def chunks():
+        nonlocal node_count
+        yield compress(json.dumps(simulation, separators=(',', ':')), engine)
+        for core_idx, rank in enumerate(ranks):
+            for chunk in node_chunks(rank, engine):
+                node_count += 1
+                yield chunk
+            print('Appended %d nodes from rank %d --> Total = %d' % (len(rank.nodes), core_idx, node_count))
+
+    print('Writing: %s' % output_filename)
+    dft.write_chunks(merged, chunks(), output_filename)
+    return node_count
 
-        data['simulation']['nodes'] += next_data['simulation']['nodes']
-        print('\nAppended %d nodes from rank %d --> Total = %d' %
-              (len(next_data['simulation']['nodes']), core_idx, len(data['simulation']['nodes'])))
 
-    return data
+def rank_filenames(filename_format, start_index=0, cores=None):
+    """
+    The files of the ranks, from start_index to start_index + cores - 1 or until a file does not exist.
+    """
+    indices = range(start_index, start_index + cores) if cores else itertools.count(start_index)
+    filenames = []
+    for core_idx in indices:
+        filename = filename_format % core_idx
+        if not cores and not os.path.exists(filename):
+            break
+        filenames.append(filename)
+    return filenames
 
 
 if __name__ == '__main__':
@@ -58,14 +138,14 @@ if __name__ == '__main__':
                                                  "job and merge them into a valid file for single-core initialization")
     parser.add_argument('--start-index', type=int, help="Which core index file to start with. Defaults to 0",
                         default=0)
-    parser.add_argument('core_filename_format_string', dest='str', default='state-00365-%03d.dtk',
-                        help='File format string. For example: "state-00365-%03d.dtk". The "%03d" would be '
+    parser.add_argument('--cores', type=int, default=None,
+                        help="Number of core files. Defaults to all the consecutive files found")
+    parser.add_argument('core_filename_format_string', default='state-00365-%03d.dtk',
+                        help='File format string. For example: "state-00365-%%03d.dtk". The "%%03d" would be '
                              'replaced with the core_index during reading')
 
-    parser.add_argument('output-name', type=str, help="Output file name. For example: state-00365-merged.dtk")
+    parser.add_argument('output_name', type=str, help="Output file name. For example: state-00365-merged.dtk")
     args = parser.parse_args()
 
-    data = serialized_dtk_to_json(args.core_filename_format_string, args.start_index)
-    with open(args.output_name, 'w') as fp:
-        print('\n%s\nWriting: %s\n%s\n' % ('-' * 30, args.output_name, '-' * 30))
-        json.dump(data, fp, indent=None, separators=(',', ':'))
+    merge_serialized_files(rank_filenames(args.core_filename_format_string, args.start_index, args.cores),
+                           args.output_name)
@@ -3,6 +3,7 @@
 from __future__ import print_function
 import dtkFileTools as dft
 import dtkFileSupport as support
+import serialization_tools as st
 import os
 import tempfile
 import unittest
@@ -441,6 +442,123 @@ class TestReadingSadPath(unittest.TestCase):
         return
 
 
+class TestLazyReading(unittest.TestCase):
+
+    def test_reading_file(self):
+        dtk = dft.read('test-data/version4.dtk', lazy=True)
+        self.assertIsInstance(dtk.chunks, dft.LazyChunks)
+        self.assertEqual(dft.LZ4, dtk.compression)
+        self.assertEqual(625105, dtk.byte_count)
+        self.assertEqual(164210, dtk.chunk_sizes[1])
+        self.assertEqual(1, dtk.simulation.Run_Number)
+        self.assertTrue('nodes' not in dtk.simulation)
+        self.assertEqual(4, len(dtk.nodes))
+        self.assertEqual([node.externalId for node in dft.read('test-data/version4.dtk').nodes],
+                         [node.externalId for node in dtk.nodes])
+        self.assertEqual(9598.48, dtk.nodes[0].individualHumans[0].m_age)
+        return
+
+    def test_cache_size(self):
+        dtk = dft.read('test-data/version4.dtk', lazy=True, cache_size=2)
+        first = dtk.nodes[0]
+        self.assertIs(first, dtk.nodes[0])
+        dtk.nodes[1]
+        dtk.nodes[2]
+        self.assertIsNot(first, dtk.nodes[0])
+        self.assertEqual(2, len(dtk.objects._cache))
+        return
+
+    def test_round_trip(self):
+        source = dft.read('test-data/version4.dtk', lazy=True)
+        node = source.nodes[2]
+        node.externalId = 314159265
+        source.nodes[2] = node
+        handle, filename = tempfile.mkstemp()
+        os.close(handle)    # Do not need this, just the filename
+        dft.write(source, filename)
+
+        with self.assertRaises(UserWarning):
+            dft.write(dft.read(filename, lazy=True), filename)
+
+        original = dft.read('test-data/version4.dtk')
+        dest = dft.read(filename)
+        self.assertEqual(5, dest.chunk_count)
+        # The chunks not modified are copied as they are
+        for index in (0, 1, 2, 4):
+            self.assertEqual(original.chunks[index], dest.chunks[index])
+        self.assertEqual(314159265, dest.nodes[2].externalId)
+        self.assertEqual(len(original.nodes[2].individualHumans), len(dest.nodes[2].individualHumans))
+        self.assertEqual(original.nodes[3], dest.nodes[3])
+        os.remove(filename)
+
+        return
+
+    def test_reading_truncated_file(self):
+        with self.assertRaises(UserWarning):
+            dft.read('test-data/truncated.dtk', lazy=True)
+        return
+
+
+def _remove_first_human(node):
+    node.individualHumans = node.individualHumans[1:]
+    return node
+
+
+def _skip_odd_nodes(node):
+    return None if node.externalId % 2 else _remove_first_human(node)
+
+
+class TestMapNodes(unittest.TestCase):
+
+    def setUp(self):
+        handle, self.filename = tempfile.mkstemp()
+        os.close(handle)    # Do not need this, just the filename
+        return
+
+    def tearDown(self):
+        os.remove(self.filename)
+        return
+
+    def test_map_nodes(self):
+        for workers in (1, 2):
+            self.assertEqual(4, st.map_nodes('test-data/version4.dtk', self.filename, _skip_odd_nodes, workers))
+            source = dft.read('test-data/version4.dtk')
+            dest = dft.read(self.filename)
+            self.assertEqual(source.chunks[0], dest.chunks[0])
+            for index in range(4):
+                source_node, dest_node = source.nodes[index], dest.nodes[index]
+                self.assertEqual(source_node.externalId, dest_node.externalId)
+                if source_node.externalId % 2:
+                    # Nodes not transformed are copied as they are
+                    self.assertEqual(source.chunks[index + 1], dest.chunks[index + 1])
+                else:
+                    self.assertEqual(source_node.individualHumans[1:], dest_node.individualHumans)
+        return
+
+    def test_map_nodes_version_two(self):
+        st.map_nodes('test-data/version2.dtk', self.filename, _remove_first_human, workers=2)
+        source = dft.read('test-data/version2.dtk')
+        dest = dft.read(self.filename)
+        self.assertEqual(len(source.nodes), len(dest.nodes))
+        self.assertEqual(source.nodes[0].individualHumans[1:], dest.nodes[0].individualHumans)
+        self.assertEqual(source.nodes[0].suid, dest.objects[1].suid)
+        return
+
+    def test_remove_humans_by_nodeid(self):
+        source = dft.read('test-data/version4.dtk')
+        removed = source.nodes[1].externalId
+        st.remove_humans_by_nodeid('test-data/version4.dtk', self.filename, [removed], workers=2)
+        dest = dft.read(self.filename)
+        for index in range(4):
+            source_node, humans = source.nodes[index], dest.nodes[index].individualHumans
+            if index == 1:
+                self.assertEqual([person for person in source_node.individualHumans
+                                  if person.home_node_id.id != source_node.suid.id], humans)
+            else:
+                self.assertEqual(source_node.individualHumans, humans)
+        return
+
+
 class TestRegressions(unittest.TestCase):
 
     # https://github.com/InstituteforDiseaseModeling/DtkTrunk/issues/1268
@@ -9,10 +9,13 @@ Support for three formats of serialized population files:
 """
 
 from . import dtkFileSupport as support
+from collections import OrderedDict
 import copy
+import itertools
 import json
 import os
 import snappy
+import tempfile
 import time
 
 IDTK = 'IDTK'
@@ -20,6 +23,7 @@ NONE = 'NONE'
 LZ4 = 'LZ4'
 SNAPPY = 'SNAPPY'
 MAX_VERSION = 4
+CACHE_SIZE = 8      # Number of parsed objects kept in memory when reading lazily
 
 
 __engines__ = {LZ4: support.EllZeeFour, SNAPPY: snappy, NONE: support.Uncompressed}
@@ -63,6 +67,59 @@ class DtkHeader(support.SerialObject):
         return length
 
 
+class LazyChunks(object):
+    """
+    Chunks of a serialized population file read from the file on access. Only the modified chunks are kept in memory.
+    """
+
+    def __init__(self, filename, offset, sizes):
+        self.filename = filename
+        self._sizes = list(sizes)
+        # Position of each chunk in the file
+        self._offsets = list(itertools.accumulate([offset] + self._sizes[:-1]))[:len(self._sizes)]
+        self._modified = {}
+
+        expected = offset + sum(self._sizes)
+        actual = os.path.getsize(filename)
+        if actual < expected:
+            raise UserWarning("Only found {0} bytes of {1} in file '{2}'".format(actual, expected, filename))
+        return
+
+    def __len__(self):
+        return len(self._sizes)
+
+    def __iter__(self):
+        with open(self.filename, 'rb') as handle:
+            for index in range(len(self)):
+                yield self._read(index, handle)
+
+    def __getitem__(self, index):
+        with open(self.filename, 'rb') as handle:
+            return self._read(range(len(self))[index], handle)
+
+    def __setitem__(self, index, chunk):
+        index = range(len(self))[index]
+        self._modified[index] = chunk
+        self._sizes[index] = len(chunk)
+        return
+
+    def append(self, chunk):
+        self._modified[len(self)] = chunk
+        self._sizes.append(len(chunk))
+        self._offsets.append(None)
+        return
+
+    def _read(self, index, handle):
+        if index in self._modified:
+            return self._modified[index]
+        handle.seek(self._offsets[index])
+        return handle.read(self._sizes[index])
+
+    @property
+    def sizes(self):
+        return list(self._sizes)
+
+
 class DtkFile(object):
 
     class Contents(object):
@@ -126,6 +183,35 @@ class DtkFile(object):
             length = len(self.__parent__.chunks)
             return length
 
+    class CachedObjects(Objects):
+        """
+        Objects parsed on access and kept in a LRU cache of cache_size objects.
+        Assign a modified object back (e.g. nodes[index] = node) to save it in the file.
+        """
+        def __init__(self, parent, cache_size=CACHE_SIZE):
+            super(DtkFile.CachedObjects, self).__init__(parent)
+            self.cache_size = cache_size
+            self._cache = OrderedDict()
+            return
+
+        def __getitem__(self, index):
+            index = range(len(self))[index]
+            if index in self._cache:
+                self._cache.move_to_end(index)
+                return self._cache[index]
+
+            item = super(DtkFile.CachedObjects, self).__getitem__(index)
+            self._cache[index] = item
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+            return item
+
+        def __setitem__(self, index, value):
+            super(DtkFile.CachedObjects, self).__setitem__(index, value)
+            # Parsed again from the new contents on the next access
+            self._cache.pop(range(len(self))[index], None)
+            return
+
     def __init__(self, header):
         self.__header__ = header
         self._chunks = [None for index in range(header.chunkcount)]
@@ -169,6 +255,8 @@ class DtkFile(object):
 
     @property
     def chunk_sizes(self):
+        if isinstance(self.chunks, LazyChunks):
+            return self.chunks.sizes
         sizes = [len(chunk) for chunk in self.chunks]
         return sizes
 
@@ -215,11 +303,16 @@ class DtkFile(object):
 
         self.__header__.date = time.strftime('%a %b %d %H:%M:%S %Y')
         self.__header__.chunkcount = len(self.chunks)
-        self.__header__.chunksizes = [len(chunk) for chunk in self.chunks]
+        self.__header__.chunksizes = self.chunk_sizes
         self.__header__.bytecount = sum(self.__header__.chunksizes)
 
         return
 
+    def _read_lazily(self, filename, offset, cache_size):
+        self._chunks = LazyChunks(filename, offset, self.__header__.chunksizes)
+        self.objects = self.CachedObjects(self, cache_size)
+        return
+
     def __set_compression__(self, engine):
         if engine != self.compression:
             for index in range(self.chunk_count):
@@ -240,6 +333,11 @@ class DtkFileV1(DtkFile):
             self._nodes = [entry.node for entry in self.simulation.nodes]
         return
 
+    def _read_lazily(self, filename, offset, cache_size):
+        super(DtkFileV1, self)._read_lazily(filename, offset, cache_size)
+        self._nodes = [entry.node for entry in self.simulation.nodes]
+        return
+
     @property
     def simulation(self):
         return self.objects[0].simulation
@@ -280,20 +378,22 @@ class DtkFileV2(DtkFile):
     def __init__(self, header=DtkHeader(), filename='', handle=None):
         header.version = 2
         super(DtkFileV2, self).__init__(header)
-        for index, size in enumerate(header.chunksizes):
-            self.chunks[index] = handle.read(size)
-            if len(self.chunks[index]) != size:
-                raise UserWarning(
-                    "Only read {0} bytes of {1} for chunk {2} of file '{3}'".format(len(self.chunks[index]),
-                                                                                    size, index, filename))
+        if handle is not None:
+            for index, size in enumerate(header.chunksizes):
+                self.chunks[index] = handle.read(size)
+                if len(self.chunks[index]) != size:
+                    raise UserWarning(
+                        "Only read {0} bytes of {1} for chunk {2} of file '{3}'".format(len(self.chunks[index]),
+                                                                                        size, index, filename))
         # Version 2 looks like this: {'simulation':{...}} so we dereference the simulation here for simplicity.
         self._nodes = self.NodesV2(self)
         return
 
     @property
     def simulation(self):
-        sim = self.objects[0]['simulation']
-        del sim['nodes']
+        # Copy without the nodes, the parsed object may be cached
+        sim = support.SerialObject({key: value for key, value in self.objects[0]['simulation'].items()
+                                    if key != 'nodes'})
         return sim
 
     @simulation.setter
@@ -332,18 +432,19 @@ class DtkFileV3(DtkFile):
     def __init__(self, header=DtkHeader(), filename='', handle=None):
         header.version = 3
         super(DtkFileV3, self).__init__(header)
-        for index, size in enumerate(header.chunksizes):
-            self.chunks[index] = handle.read(size)
-            if len(self.chunks[index]) != size:
-                raise UserWarning("Only read {0} bytes of {1} for chunk {2} of file '{3}'".format(len(self.chunks[index]), size, index, filename))
+        if handle is not None:
+            for index, size in enumerate(header.chunksizes):
+                self.chunks[index] = handle.read(size)
+                if len(self.chunks[index]) != size:
+                    raise UserWarning("Only read {0} bytes of {1} for chunk {2} of file '{3}'".format(len(self.chunks[index]), size, index, filename))
         self._nodes = self.NodesV3(self)
         return
 
     @property
     def simulation(self):
         if len(self.objects) > 0:
-            sim = self.objects[0]
-            del sim['nodes']
+            # Copy without the nodes, the parsed object may be cached
+            sim = support.SerialObject({key: value for key, value in self.objects[0].items() if key != 'nodes'})
         else:
             sim = {}
         return sim
@@ -366,23 +467,35 @@ class DtkFileV4(DtkFileV3):
         return
 
 
-def read(filename):
+def read(filename, lazy=False, cache_size=CACHE_SIZE):
+    """
+    Read a serialized population file.
+    With lazy=True, only the header is read: each chunk is read and decompressed when accessed and at most cache_size
+    parsed objects are kept in memory. Writing the file to a new file copies the unmodified chunks as they are.
+    """
 
     new_file = None
     with open(filename, 'rb') as handle:
         __check_magic_number__(handle)
         header = __read_header__(handle)
         if header.version == 1:
-            new_file = DtkFileV1(header, filename=filename, handle=handle)
+            file_class = DtkFileV1
         elif header.version == 2:
-            new_file = DtkFileV2(header, filename=filename, handle=handle)
+            file_class = DtkFileV2
         elif header.version == 3:
-            new_file = DtkFileV3(header, filename=filename, handle=handle)
+            file_class = DtkFileV3
         elif header.version == 4:
-            new_file = DtkFileV4(header, filename=filename, handle=handle)
+            file_class = DtkFileV4
         else:
             raise UserWarning('Unknown serialized population file version: {0}'.format(header.version))
 
+        if lazy:
+            new_file = file_class(header, filename=filename)
+            # noinspection PyProtectedMember
+            new_file._read_lazily(filename, handle.tell(), cache_size)
+        else:
+            new_file = file_class(header, filename=filename, handle=handle)
+
     return new_file
 
 
@@ -450,6 +563,10 @@ def __check_chunk_sizes__(chunk_sizes):
 
 def write(dtk_file, filename):
 
+    chunks = dtk_file.chunks
+    if isinstance(chunks, LazyChunks) and os.path.exists(filename) and os.path.samefile(filename, chunks.filename):
+        raise UserWarning("Cannot overwrite '{0}' while reading it lazily, write to a new file".format(filename))
+
     # noinspection PyProtectedMember
     dtk_file._sync_header()
 
@@ -467,6 +584,29 @@ def write(dtk_file, filename):
     return
 
 
+def write_chunks(dtk_file, chunks, filename):
+    """
+    Write dtk_file with the chunks of an iterable (e.g. a generator) instead of its own chunks, so that only one chunk
+    is in memory at once. The chunks are staged in a temporary file next to filename as the header needs their sizes.
+    """
+    previous_chunks = dtk_file.chunks
+    handle, chunks_filename = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(filename)))
+    try:
+        sizes = []
+        with os.fdopen(handle, 'wb') as chunks_file:
+            for chunk in chunks:
+                chunks_file.write(chunk)
+                sizes.append(len(chunk))
+
+        dtk_file._chunks = LazyChunks(chunks_filename, 0, sizes)
+        write(dtk_file, filename)
+    finally:
+        dtk_file._chunks = previous_chunks
+        os.remove(chunks_filename)
+
+    return
+
+
 def __write_magic_number__(handle):
     handle.write('IDTK'.encode())
     return
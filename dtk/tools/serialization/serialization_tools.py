@@ -1,38 +1,114 @@
+from . import dtkFileSupport as support
 from . import dtkFileTools as dtk
+from collections import deque
+from functools import partial
+from multiprocessing import Pool
+import json
+import os
 
 STATE_ADULT = 1         # implies female, I believe
 STATE_INFECTED = 2
 STATE_INFECTIOUS = 3
 
-_endings = [ 'th', 'st', 'nd', 'rd', 'th', 'th', 'th', 'th', 'th', 'th' ]
+CHUNKS_PER_WORKER = 2   # Chunks submitted to the pool ahead of the one being written, per worker
 
 # functions need comments and/or cleaning.
 
 
-def zero_infections(source_filename, dest_filename, ignore_nodes=[], keep_individuals=[]):
-    print('Ignoring nodes {0}'.format(ignore_nodes))
-    print('Keeping infections in humans {0}'.format(keep_individuals))
-
+def _transform_chunk(chunk, engine, version, fn):
+    # Apply fn to the node of a chunk, returns the new chunk or the same one if fn returned None
+    item = json.loads(dtk.uncompress(chunk, engine), object_hook=support.SerialObject)
+    node = fn(item.node if version == 2 else item)
+    if node is None:
+        return chunk
+
+    if version == 2:
+        # Version 2 chunks contain the entry from simulation.nodes: {'suid':{'id':id},'node':{...}}
+        item['node'] = node
+        node = item
+    data = dtk.compress(json.dumps(node, separators=(',', ':')), engine)
+    return data.encode() if isinstance(data, str) else data
+
+
+def map_nodes(source_filename, dest_filename, fn, workers=1):
+    """
+    Apply a transform to each node of a serialized population file and write the result to another file.
+
+    The nodes can be transformed in a process pool, each worker decompressing, parsing and serializing its own chunks.
+    The source is read lazily and the chunks are written in order as they are transformed, so only a few chunks per
+    worker are in memory at once. The destination can be the source file.
+
+    Args:
+        source_filename: The serialized population file (version 2 or later, one chunk per node).
+        dest_filename: The file to write.
+        fn: Function called with each node. Returns the modified node, or None to keep the node unchanged.
+            It must be picklable (e.g. a module level function or a functools.partial of one).
+        workers: Number of processes. With 1 (default) the nodes are transformed in this process, None uses
+            os.cpu_count() processes. Scripts using processes need an ``if __name__ == '__main__':`` guard on
+            platforms spawning them (Windows, macOS).
+
+    Returns:
+        The number of nodes.
+    """
     print("Reading file: '{0}'".format(source_filename))
-    source = dtk.read(source_filename)
-
-    for index in range(0, len(source.nodes)):
-        print('Reading {0}{1} node'.format(index, _endings[index%10]), end='')
-        node = source.nodes[index]
-        print(', externalId = {0}'.format(node.externalId))
-        if node.externalId not in ignore_nodes:
-            print('Zeroing vector infections')
-            zero_vector_infections(node.m_vectorpopulations)
-            print('Zeroing human infections')
-            zero_human_infections(node.individualHumans, keep_individuals)
-            print('Saving updated node')
-            source.nodes[index] = node
-        else:
-            print('Ignoring node {0}'.format(index))
+    source = dtk.read(source_filename, lazy=True)
+    if source.version < 2:
+        raise UserWarning("Cannot map the nodes of '{0}': version {1} files do not store nodes in chunks".format(
+            source_filename, source.version))
+
+    workers = workers or os.cpu_count()
+    engine, version = source.compression, source.version
+
+    def transformed_chunks():
+        chunks = iter(source.chunks)
+        yield next(chunks)  # simulation
+        if workers == 1:
+            for chunk in chunks:
+                yield _transform_chunk(chunk, engine, version, fn)
+            return
+
+        with Pool(workers) as pool:
+            # Bounded number of chunks in flight, the results are written in order
+            pending = deque()
+            for chunk in chunks:
+                pending.append(pool.apply_async(_transform_chunk, (chunk, engine, version, fn)))
+                if len(pending) >= CHUNKS_PER_WORKER * workers:
+                    yield pending.popleft().get()
+            while pending:
+                yield pending.popleft().get()
 
     print("Writing file: '{0}'".format(dest_filename))
-    dtk.write(source, dest_filename)
+    dtk.write_chunks(source, transformed_chunks(), dest_filename)
+
+    return len(source.nodes)
+
+
+def _zero_node_infections(ignore_nodes, keep_individuals, node):
+    if node.externalId in ignore_nodes:
+        return None
+    zero_vector_infections(node.m_vectorpopulations)
+    zero_human_infections(node.individualHumans, keep_individuals)
+    return node
 
+
+def _remove_node_vectors(removal_nodes, node):
+    if node.externalId not in removal_nodes:
+        return None
+    node.m_vectorpopulations = []
+    return node
+
+
+def _remove_node_humans(removal_nodes, node):
+    if node.externalId not in removal_nodes:
+        return None
+    node.individualHumans = [person for person in node.individualHumans if person.home_node_id.id != node.suid.id]
+    return node
+
+
+def zero_infections(source_filename, dest_filename, ignore_nodes=[], keep_individuals=[], workers=1):
+    print('Ignoring nodes {0}'.format(ignore_nodes))
+    print('Keeping infections in humans {0}'.format(keep_individuals))
+    map_nodes(source_filename, dest_filename, partial(_zero_node_infections, ignore_nodes, keep_individuals), workers)
     return
 
 
@@ -90,45 +166,13 @@ def zero_human_infections(humans, keep_ids=[]):
     return
 
 
-def remove_vectors_by_nodeid(source_filename, dest_filename, removal_nodes):
-
-    print("Reading file: '{0}'".format(source_filename))
-    source = dtk.read(source_filename)
-
-    for index in range(0, len(source.nodes)):
-        print('Reading {0}{1} node'.format(index, _endings[index%10]))
-        node = source.nodes[index]
-        if node.externalId in removal_nodes:
-            node.m_vectorpopulations = []
-            source.nodes[index] = node
-        else:
-            print('Ignoring node {0}'.format(index))
-
-    print("Writing file: '{0}'".format(dest_filename))
-    dtk.write(source, dest_filename)
-
+def remove_vectors_by_nodeid(source_filename, dest_filename, removal_nodes, workers=1):
+    map_nodes(source_filename, dest_filename, partial(_remove_node_vectors, removal_nodes), workers)
     return
 
 
-def remove_humans_by_nodeid(source_filename, dest_filename, removal_nodes):
-
-    print("Reading file: '{0}'".format(source_filename))
-    source = dtk.read(source_filename)
-
-    for index in range(0, len(source.nodes)):
-        print('Reading {0}{1} node'.format(index, _endings[index%10]))
-        node = source.nodes[index]
-        if node.externalId in removal_nodes:
-            for person in node.individualHumans:
-                if person.home_node_id.id == node.suid.id:
-                    node.individualHumans.remove(person)
-                    source.nodes[index] = node
-        else:
-            print('Ignoring node {0}'.format(index))
-
-    print("Writing file: '{0}'".format(dest_filename))
-    dtk.write(source, dest_filename)
-
+def remove_humans_by_nodeid(source_filename, dest_filename, removal_nodes, workers=1):
+    map_nodes(source_filename, dest_filename, partial(_remove_node_humans, removal_nodes), workers)
     return
 
 
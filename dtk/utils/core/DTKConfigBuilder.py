@@ -80,6 +80,8 @@ class DTKConfigBuilder(SimConfigBuilder):
         ``Simulation_Duration`` in the config.
 
     """
+    shared_attributes = ('campaign', 'custom_reports', 'demog_overlays', 'input_files')
+
     def __init__(self, config=None, campaign=empty_campaign, **kwargs):
         super(DTKConfigBuilder, self).__init__(config, **kwargs)
         self.config = config or {'parameters': {}}
@@ -528,18 +530,21 @@ class DTKConfigBuilder(SimConfigBuilder):
         else:
             dump = lambda content: json.dumps(content, sort_keys=True, cls=NumpyEncoder).strip('"')
 
-        write_fn(self.config['parameters']['Campaign_Filename'], self.campaign.to_json(self.campaign.Use_Defaults, self.human_readability))
+        write_fn(self.config['parameters']['Campaign_Filename'],
+                 self.serialize_section('campaign', lambda: self.campaign.to_json(self.campaign.Use_Defaults,
+                                                                                   self.human_readability)))
 
         if self.custom_reports:
             self.set_param('Custom_Reports_Filename', 'custom_reports.json')
-            write_fn('custom_reports.json', dump(format_reports(self.custom_reports)))
+            write_fn('custom_reports.json',
+                     self.serialize_section('custom_reports', lambda: dump(format_reports(self.custom_reports))))
 
         for name, content in self.demog_overlays.items():
             self.append_overlay('%s' % name)
-            write_fn('%s' % name, dump(content))
+            write_fn('%s' % name, self.serialize_section(('demog_overlays', name), lambda: dump(content)))
 
         for name, content in self.input_files.items():
-            write_fn(name, dump(content))
+            write_fn(name, self.serialize_section(('input_files', name), lambda: dump(content)))
 
         # Add missing item from campaign individual events into Listed_Events
         self.config['parameters']['Listed_Events'] = self.check_custom_events()
@@ -558,12 +563,23 @@ class DTKConfigBuilder(SimConfigBuilder):
             self.emodules_map[module_type] =list(set([os.path.join(root, dll) for dll in self.emodules_map[module_type]]))
         write_fn('emodules_map.json', dump(self.emodules_map))
 
-    def dump_files(self, working_directory):
+    def dump_files(self, working_directory, content_store=None):
+        """
+        Write the simulation files in the working directory.
+
+        Args:
+            working_directory: The simulation directory
+            content_store: Optional :py:class:`ContentStore`. If given, the files shared between simulations are
+                written once in the store and linked in the working directory.
+        """
         if not os.path.exists(working_directory):
             os.makedirs(working_directory)
 
         def write_file(name, content):
             filename = os.path.join(working_directory, '%s' % name)
+            if content_store and name not in self.unique_files:
+                content_store.write(filename, content)
+                return
             with open(filename, 'w') as f:
                 f.write(content)
 
@@ -572,5 +588,8 @@ class DTKConfigBuilder(SimConfigBuilder):
         from simtools.SetupParser import SetupParser
         if SetupParser.get('type') == "LOCAL":
             for file in self.experiment_files:
-                shutil.copy(file.absolute_path, working_directory)
+                if content_store:
+                    content_store.copy(file.absolute_path, working_directory)
+                else:
+                    shutil.copy(file.absolute_path, working_directory)
 
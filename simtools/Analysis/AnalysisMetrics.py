@@ -0,0 +1,55 @@
+import time
+from contextlib import contextmanager
+
+from simtools.Utilities.General import file_size
+
+
+class AnalysisMetrics:
+    """
+    Counters collected while analyzing simulations.
+    Each task of the pool returns its own metrics which are merged by the AnalyzeManager as the tasks complete.
+
+    - simulations: number of simulations processed
+    - bytes: number of bytes retrieved
+    - times: cumulated seconds spent in each stage (download, parse, select, reduce)
+    - exception: message of the first exception encountered (None if everything went fine)
+    """
+    STAGES = ("download", "parse", "select", "reduce")
+
+    def __init__(self):
+        self.simulations = 0
+        self.bytes = 0
+        self.times = dict.fromkeys(self.STAGES, 0.0)
+        self.exception = None
+
+    @contextmanager
+    def stage(self, name):
+        """
+        Time the enclosed code as part of the given stage.
+        """
+        start = time.time()
+        try:
+            yield
+        finally:
+            self.times[name] += time.time() - start
+
+    def merge(self, other) -> None:
+        """
+        Add the counters of another metrics object.
+        """
+        self.simulations += other.simulations
+        self.bytes += other.bytes
+        for name, value in other.times.items():
+            self.times[name] = self.times.get(name, 0.0) + value
+        self.exception = self.exception or other.exception
+
+    def throughput(self, elapsed) -> float:
+        """
+        Bytes retrieved per second of wall clock time.
+        """
+        return self.bytes / elapsed if elapsed > 0 else 0
+
+    def summary(self, elapsed) -> str:
+        stages = " / ".join("{}: {:.1f}s".format(name, self.times[name]) for name in self.STAGES)
+        return "{} retrieved ({}/s) - Time per stage (all processes) {}"\
+            .format(file_size(self.bytes), file_size(self.throughput(elapsed)), stages)
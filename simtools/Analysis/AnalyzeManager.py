@@ -1,29 +1,34 @@
 import collections
+import math
 import os
 import re
 import sys
 import time
+from multiprocessing import TimeoutError
 from multiprocessing.pool import Pool
 
 from COMPS.Data.Simulation import SimulationState
 
-from simtools.Analysis.DataRetrievalProcess import retrieve_data
+from simtools.Analysis.AnalysisMetrics import AnalysisMetrics
+from simtools.Analysis.DataRetrievalProcess import retrieve_data, process_data
+from simtools.Analysis.OutputCache import OutputCache
+from simtools.Analysis.RetrievalPipeline import RetrievalPipeline, DEFAULT_MAX_DOWNLOADS
 from simtools.DataAccess.DataStore import DataStore
 from simtools.SetupParser import SetupParser
 from simtools.Utilities import on_off, pluralize, verbose_timedelta
 from simtools.Utilities.COMPSCache import COMPSCache
 from simtools.Utilities.CacheEnabled import CacheEnabled
 from simtools.Utilities.Experiments import retrieve_experiment, retrieve_simulation
-from simtools.Utilities.General import init_logging, animation
+from simtools.Utilities.General import init_logging, animation, file_size
 
 logger = init_logging('AnalyzeManager')
 
 ANALYZE_TIMEOUT = 3600 * 8  # Maximum seconds before timing out - set to 1h
-WAIT_TIME = 1.15  # How much time to wait between check if the analysis is done
-EXCEPTION_KEY = "__EXCEPTION__"
+WAIT_TIME = 1.15  # How long to wait for a result before refreshing the progress display
+BATCHES_PER_PROCESS = 4  # How many batches of simulations each analyzing process will receive
 
 
-def pool_worker_initializer(func, analyzers, cache, path_mapping) -> None:
+def pool_worker_initializer(func, analyzers, cache, path_mapping, output_cache=None) -> None:
     """
     Initializer function for the process poll.
     Allows the pool to associate the analyzers, cache and path_mapping to the function executed to retrieve data.
@@ -34,6 +39,7 @@ def pool_worker_initializer(func, analyzers, cache, path_mapping) -> None:
         analyzers: The list of all analyzers to run
         cache: The cache object
         path_mapping: The mapping for path translation when running on SSMT
+        output_cache: The persistent OutputCache (None if disabled)
 
     Returns:
 
@@ -41,11 +47,19 @@ def pool_worker_initializer(func, analyzers, cache, path_mapping) -> None:
     func.analyzers = analyzers
     func.cache = cache
     func.path_mapping = path_mapping
+    func.output_cache = output_cache
 
 
 class AnalyzeManager(CacheEnabled):
     def __init__(self, exp_list=None, sim_list=None, analyzers=None, working_dir=None, force_analyze=False, max_sims=None,
-                 verbose=True, force_manager_working_directory=False):
+                 verbose=True, force_manager_working_directory=False, output_cache=None,
+                 max_downloads=DEFAULT_MAX_DOWNLOADS):
+        """
+        :param output_cache: Persist the retrieved files and selected data between runs.
+        Can be an OutputCache instance, a directory or True to use the default location.
+        :param max_downloads: How many COMPS simulations to download concurrently while the pool processes the
+        downloaded ones. 0 to download and process in the pool processes.
+        """
         super().__init__()
         self.analyzers = []
         self.experiments = set()
@@ -54,6 +68,13 @@ class AnalyzeManager(CacheEnabled):
         self.max_sims = max_sims
         self.force_wd = force_manager_working_directory
 
+        if output_cache is True:
+            output_cache = OutputCache()
+        elif isinstance(output_cache, str):
+            output_cache = OutputCache(directory=output_cache)
+        self.output_cache = output_cache
+        self.max_downloads = max_downloads
+
         try:
             with SetupParser.TemporarySetup() as sp:
                 self.max_threads = min(os.cpu_count(), int(sp.get('max_threads', 16)))
@@ -84,6 +105,7 @@ class AnalyzeManager(CacheEnabled):
             for a in analyzer_list: self.add_analyzer(a)
 
         self.cache = None
+        self.metrics = None
 
     def filter_simulations(self, simulations):
         if self.max_sims is not None:
@@ -148,13 +170,27 @@ class AnalyzeManager(CacheEnabled):
 
         self.analyzers.append(analyzer)
 
-    def _check_exception(self):
-        exception = self.cache.get(EXCEPTION_KEY, default=None)
-        if exception:
-            sys.stdout.flush()
-            print("")
-            print(exception)
-            return True
+    def _batch_simulations(self, max_threads):
+        """
+        Split the simulations in batches to send to the pool.
+        Incremental analyzers reduce a whole batch in the worker so the batches should not be too small.
+        """
+        simulations = list(self.simulations.values())
+        batch_size = max(1, math.ceil(len(simulations) / (max_threads * BATCHES_PER_PROCESS)))
+        return [simulations[i:i + batch_size] for i in range(0, len(simulations), batch_size)]
+
+    def _combine_partials(self, partials, batch_partials):
+        """
+        Merge the partial states returned by a batch into the running partial state of each incremental analyzer.
+        Only one partial state per analyzer is kept in memory.
+        """
+        for a in self.analyzers:
+            if a.uid not in batch_partials:
+                continue
+            if a.uid in partials:
+                partials[a.uid] = a.combine([partials[a.uid], batch_partials[a.uid]])
+            else:
+                partials[a.uid] = batch_partials[a.uid]
 
     def analyze(self):
         # Start the timer
@@ -167,6 +203,7 @@ class AnalyzeManager(CacheEnabled):
 
         # Clear the cache
         self.cache = self.initialize_cache(shards=self.max_threads)
+        self.metrics = AnalysisMetrics()
 
         # Check if we are on SSMT
         ssmt_path_mapping = os.environ.get("COMPS_DATA_MAPPING", None)
@@ -189,6 +226,10 @@ class AnalyzeManager(CacheEnabled):
         scount = len(self.simulations)
         max_threads = min(self.max_threads, scount if scount != 0 else 1)
 
+        # COMPS downloads are retrieved by a separate I/O stage to keep the pool processes busy
+        pipelined = bool(self.max_downloads) and not ssmt_path_mapping \
+                    and any(e.location == "HPC" for e in self.experiments)
+
         # Display some info
         if self.verbose:
             print("Analyze Manager")
@@ -201,46 +242,80 @@ class AnalyzeManager(CacheEnabled):
             for a in self.analyzers:
                 print(" |  - {} (Directory map: {} / File parsing: {} / Use cache: {})"
                       .format(a.uid, on_off(a.need_dir_map), on_off(a.parse), on_off(hasattr(a, "cache"))))
+            print(" | Output cache: {}".format(self.output_cache.directory if self.output_cache else "Off"))
             print(" | Pool of {} analyzing processes".format(max_threads))
+            if pipelined:
+                print(" | {} concurrent download{}".format(self.max_downloads, pluralize(self.max_downloads)))
 
         if scount == 0 and self.verbose:
             print("No experiments/simulations for analysis.")
             return False
 
+        # Identify the analyzers versions for the persistent cache
+        if self.output_cache:
+            self.output_cache.register_analyzers(self.analyzers)
+
         # Create the pool
         pool = Pool(max_threads,
                     initializer=pool_worker_initializer,
-                    initargs=(retrieve_data, self.analyzers, self.cache, ssmt_path_mapping))
+                    initargs=(process_data if pipelined else retrieve_data, self.analyzers, self.cache,
+                              ssmt_path_mapping, self.output_cache))
 
         # Add the simulations
-        results = pool.map_async(retrieve_data, self.simulations.values())
-
-        # Wait for the results to be ready
-        while not results.ready():
-            # If an exception happen, kill everything and exit
-            if self._check_exception():
-                pool.terminate()
-                return False
+        if pipelined:
+            results = RetrievalPipeline(pool, self.analyzers, self.cache, output_cache=self.output_cache,
+                                        max_downloads=self.max_downloads).start(self.simulations.values())
+        else:
+            results = pool.imap_unordered(retrieve_data, self._batch_simulations(max_threads))
+        partials = {}
+
+        # Process the results as soon as they complete, combining the incremental analyzers partial states.
+        # The timeout only allows to refresh the progress display while nothing completes.
+        while True:
+            try:
+                batch_partials, metrics = results.next(timeout=WAIT_TIME)
+            except StopIteration:
+                break
+            except TimeoutError:
+                batch_partials, metrics = None, None
+
+            if metrics:
+                self.metrics.merge(metrics)
+
+                # If an exception happen, kill everything and exit
+                if metrics.exception:
+                    sys.stdout.flush()
+                    print("")
+                    print(metrics.exception)
+                    if pipelined: results.close()
+                    pool.terminate()
+                    return False
+
+            if batch_partials:
+                self._combine_partials(partials, batch_partials)
 
             time_elapsed = time.time() - start_time
             if self.verbose:
-                sys.stdout.write("\r {} Analyzing {}/{}... {} elapsed"
-                                 .format(next(animation), len(self.cache), scount, verbose_timedelta(time_elapsed)))
+                sys.stdout.write("\r {} Analyzing {}/{}... {} elapsed ({}/s)   "
+                                 .format(next(animation), self.metrics.simulations, scount,
+                                         verbose_timedelta(time_elapsed),
+                                         file_size(self.metrics.throughput(time_elapsed))))
                 sys.stdout.flush()
 
             if time_elapsed > ANALYZE_TIMEOUT:
                 raise Exception("Timeout while waiting the analysis to complete...")
 
-            time.sleep(WAIT_TIME)
-        results.get()
-
         # At this point we have all our results
         # Give to the analyzer
         finalize_results = {}
         for a in self.analyzers:
+            # Incremental analyzers only need their combined partial state
+            if a.incremental:
+                finalize_results[a.uid] = pool.apply_async(a.finalize, (partials.get(a.uid),))
+                continue
+
             analyzer_data = {}
             for key in self.cache:
-                if key == EXCEPTION_KEY: continue
                 # Retrieve the cache content and the simulation object
                 sim_cache = self.cache.get(key)
                 simulation_obj = self.simulations[key]
@@ -258,6 +333,7 @@ class AnalyzeManager(CacheEnabled):
             total_time = time.time() - start_time
             print("\r | Analysis done. Took {} (~ {:.3f} per simulation)"
                   .format(verbose_timedelta(total_time), total_time / scount if scount != 0 else 0))
+            print(" | {}".format(self.metrics.summary(total_time)))
 
         for a in self.analyzers:
             a.destroy()
@@ -5,20 +5,33 @@ class BaseAnalyzer(metaclass=ABCMeta):
     """
     An abstract base class carrying the lowest level analyzer interfaces called by BaseExperimentManager
     """
+    # Identifies the selected data in the persistent OutputCache. None to derive it from the class source and
+    # attributes. Change it when select_simulation_data returns different data.
+    cache_version = None
+
     @abstractmethod
-    def __init__(self, uid=None, working_dir=None, parse=True, need_dir_map=False, filenames=None):
+    def __init__(self, uid=None, working_dir=None, parse=True, need_dir_map=False, filenames=None,
+                 incremental=False, columnar_channels=None, node_ids=None):
         """
         :param uid: The unique id identifying this analyzer
         :param working_dir: A working directory to dump files
         :param parse: Do we want to leverage the OutputParser or just get the raw data in the select_simulation_data()
         :param need_dir_map: Will we need the path of the simulations eventually?
         :param filenames: Which files the analyzer needs to download
+        :param incremental: Fold the selected data with reduce()/combine() as simulations complete instead of
+        gathering every simulation's data for finalize()
+        :param columnar_channels: Opt-in for the InsetChart-style JSON files: only these channels are decoded, as NumPy
+        arrays. An empty collection decodes all the channels as arrays. None (default) uses the regular JSON parsing.
+        :param node_ids: Hint for the SpatialReport files: only these nodes are retrieved. None retrieves all the nodes.
         """
         self.filenames = filenames or []
         self.parse = parse
         self.need_dir_map = need_dir_map
         self.working_dir = working_dir
         self.uid = uid or self.__class__.__name__
+        self.incremental = incremental
+        self.columnar_channels = columnar_channels
+        self.node_ids = node_ids
         self.results = None  # Store what finalize() is returning
 
     def initialize(self):
@@ -52,10 +65,31 @@ class BaseAnalyzer(metaclass=ABCMeta):
         """
         return {}
 
+    def reduce(self, partial, simulation, data):
+        """
+        Only used by incremental analyzers.
+        In parallel, fold the selected data of one simulation into a partial state
+        :param partial: the partial state accumulated so far (None for the first simulation of a batch)
+        :param simulation: object representing the simulation for which the data is passed
+        :param data: the selected data returned by select_simulation_data() for this simulation
+        :return: the updated partial state
+        """
+        raise NotImplementedError("Incremental analyzers need to implement reduce()")
+
+    def combine(self, partials):
+        """
+        Only used by incremental analyzers.
+        On a single process, merge partial states coming from different batches of simulations
+        :param partials: list of partial states returned by reduce() (None entries are already removed)
+        :return: the merged partial state
+        """
+        raise NotImplementedError("Incremental analyzers need to implement combine()")
+
     def finalize(self, all_data):
         """
         On a single process, get all the selected data
         :param all_data: dictionary associating simulation:selected_data
+        For incremental analyzers, the combined partial state instead
         """
         pass
 
@@ -1,44 +1,120 @@
+import copy
 import itertools
 import os
 import traceback
+from collections import Counter
+from io import BytesIO
+from types import MappingProxyType
 
+import numpy as np
+import pandas as pd
+from COMPS.Data.Simulation import SimulationState
+
+from simtools.Analysis.AnalysisMetrics import AnalysisMetrics
 from simtools.Analysis.OutputParser import SimulationOutputParser
 from simtools.Utilities.COMPSCache import COMPSCache
 from simtools.Utilities.COMPSUtilities import COMPS_login, get_asset_files_for_simulation_id
 from simtools.Utilities.RetryDecorator import retry
 
 
-def retrieve_data(simulation) -> None:
+def retrieve_data(simulations) -> tuple:
     """
     Simple wrapper to unpack the data coming from the process pool and pass it to the function actually doing the work.
+    The simulations are received by batch so that incremental analyzers can reduce a whole batch in the worker and
+    only send back one partial state.
 
     Args:
-        simulation: The simulation to process
+        simulations: The batch of simulations to process
 
-    Returns: Nothing
+    Returns: Tuple (dictionary associating incremental analyzer uid -> partial state for the batch, AnalysisMetrics)
 
     """
     # Retrieve the global variables coming from the pool initialization
     analyzers = retrieve_data.analyzers
     cache = retrieve_data.cache
     path_mapping = retrieve_data.path_mapping
+    output_cache = retrieve_data.output_cache
+
+    metrics = AnalysisMetrics()
+    partials = {}
+    for simulation in simulations:
+        reduced_data = retrieve_data_for_simulation(simulation, analyzers, cache, path_mapping, output_cache, metrics)
+        if reduced_data is None or not reduce_simulation_data(partials, simulation, analyzers, reduced_data, metrics):
+            break
+        metrics.simulations += 1
+
+    return partials, metrics
+
+
+def process_data(task) -> tuple:
+    """
+    Entry point of the process pool when the files are retrieved by a RetrievalPipeline.
+    Only the CPU bound part (parsing, selection and reduction) happens in the pool.
+
+    Args:
+        task: Tuple (simulation, uids of the analyzers to run, already selected data, {filename: content})
+
+    Returns: Tuple (dictionary associating incremental analyzer uid -> partial state for the simulation,
+    AnalysisMetrics)
+
+    """
+    # Retrieve the global variables coming from the pool initialization
+    analyzers = process_data.analyzers
+    cache = process_data.cache
+    output_cache = process_data.output_cache
 
-    retrieve_data_for_simulation(simulation, analyzers, cache, path_mapping)
+    simulation, filtered_uids, selected_data, byte_arrays = task
+    metrics = AnalysisMetrics()
+    partials = {}
+    reduced_data = process_simulation_data(simulation, analyzers, filtered_uids, selected_data, byte_arrays, cache,
+                                           output_cache, metrics)
+    if reduced_data is not None and reduce_simulation_data(partials, simulation, analyzers, reduced_data, metrics):
+        metrics.simulations += 1
 
+    return partials, metrics
 
-def set_exception(step: str, info: dict, cache: any) -> None:
+
+def reduce_simulation_data(partials, simulation, analyzers, reduced_data, metrics) -> bool:
     """
-    Helper to quickly set an exception in the cache.
+    Fold the selected data of the incremental analyzers into their partial states.
+
+    Args:
+        partials: Dictionary associating incremental analyzer uid -> partial state, updated in place
+        simulation: The simulation the data comes from
+        analyzers: The list of all analyzers
+        reduced_data: Dictionary associating incremental analyzer uid -> selected data
+        metrics: The AnalysisMetrics of the task (to report exceptions)
+
+    Returns: False if an error happened
+
+    """
+    for analyzer in analyzers:
+        if analyzer.uid not in reduced_data:
+            continue
+        try:
+            with metrics.stage("reduce"):
+                partials[analyzer.uid] = analyzer.reduce(partials.get(analyzer.uid), simulation,
+                                                         reduced_data[analyzer.uid])
+        except:
+            set_exception(step="data reduction", info={"Simulation": simulation, "Analyzer": analyzer.uid},
+                          metrics=metrics)
+            return False
+
+    return True
+
+
+def set_exception(step: str, info: dict, metrics: AnalysisMetrics) -> None:
+    """
+    Helper to quickly set an exception in the metrics returned to the AnalyzeManager.
 
     Args:
         step: Which step encountered an error
         info: Dictionary for additional information to add to the message
-        cache: The cache object in which to set the exception
+        metrics: The AnalysisMetrics of the task in which to set the exception
 
     Returns: Nothing
 
     """
-    from simtools.Analysis.AnalyzeManager import EXCEPTION_KEY
     message = f"\nAn exception has been raised during {step}.\n"
     # Add the info
     for ikey, ivalue in info.items():
@@ -47,7 +123,7 @@ def set_exception(step: str, info: dict, cache: any) -> None:
     # Add the traceback
     message += f'\n{traceback.format_exc()}\n'
 
-    cache.set(EXCEPTION_KEY, message)
+    metrics.exception = metrics.exception or message
 
 
 def retrieve_SSMT_files(simulation, filenames, path_mapping):
@@ -87,67 +163,332 @@ def retrieve_COMPS_AM_files(simulation, filenames):
     return byte_arrays
 
 
-def retrieve_data_for_simulation(simulation, analyzers, cache, path_mapping):
-    # Filter first and get the filenames from filtered analysis
-    filtered_analysis = [a for a in analyzers if a.filter(simulation)]
-    filenames = set(itertools.chain(*(a.filenames for a in filtered_analysis)))
+def retrieve_files(simulation, filenames, path_mapping):
+    """
+    Retrieve the content of the given files for a simulation depending on where it ran.
 
-    # We dont have anything to do :)
-    if not filtered_analysis:
-        cache.set(simulation.id, None)
-        return
+    Args:
+        simulation: The simulation to retrieve the files from
+        filenames: The files to retrieve
+        path_mapping: The mapping for path translation when running on SSMT
 
-    # The byte_arrays will associate filename with content
+    Returns: Dictionary associating filename -> content
+
+    """
+    # Retrieval for SSMT
+    if path_mapping:
+        return retrieve_SSMT_files(simulation, filenames, path_mapping)
+
+    # Retrieval for normal HPC Asset Management
+    if simulation.experiment.location == "HPC":
+        return retrieve_COMPS_AM_files(simulation, filenames)
+
+    # Retrieval for local file
     byte_arrays = {}
+    for filename in filenames:
+        path = os.path.join(simulation.get_path(), filename)
+        with open(path, 'rb') as output_file:
+            byte_arrays[filename] = output_file.read()
+    return byte_arrays
 
-    try:
-        # Retrieval for SSMT
-        if path_mapping:
-            byte_arrays = retrieve_SSMT_files(simulation, filenames, path_mapping)
 
-        # Retrieval for normal HPC Asset Management
-        elif simulation.experiment.location == "HPC":
-            byte_arrays = retrieve_COMPS_AM_files(simulation, filenames)
+def requested_channels(analyzers) -> dict:
+    """
+    Gather the columnar_channels of the analyzers for each file.
 
-        # Retrieval for local file
-        else:
-            for filename in filenames:
-                path = os.path.join(simulation.get_path(), filename)
-                with open(path, 'rb') as output_file:
-                    byte_arrays[filename] = output_file.read()
+    Args:
+        analyzers: The analyzers that will parse the files
+
+    Returns: Dictionary associating filename -> set of channels (empty set meaning all the channels)
+
+    """
+    channels_by_file = {}
+    for analyzer in analyzers:
+        if not analyzer.parse or analyzer.columnar_channels is None:
+            continue
+
+        for filename in analyzer.filenames:
+            # One analyzer needing all the channels means all the channels have to be decoded
+            if not analyzer.columnar_channels or channels_by_file.get(filename) == set():
+                channels_by_file[filename] = set()
+            else:
+                channels_by_file.setdefault(filename, set()).update(analyzer.columnar_channels)
+
+    return channels_by_file
+
+
+def parsed_file_key(analyzer, filename) -> tuple:
+    """
+    Key of a parsed file in the memo: analyzers with columnar_channels receive the columnar version of the JSON files,
+    the other ones the regular version.
+    """
+    return filename, analyzer.columnar_channels is not None and filename.lower().endswith(".json")
+
+
+def copy_content(content):
+    """
+    Copy parsed content so that an analyzer modifying it in place does not change what the other analyzers receive.
+    Dictionaries and lists are copied recursively while their immutable values are shared, which is faster than
+    parsing the file again.
+
+    Args:
+        content: The parsed content
+
+    Returns: An independent copy of the content
+
+    """
+    if isinstance(content, dict):
+        return {key: copy_content(value) for key, value in content.items()}
+    if isinstance(content, list):
+        return [copy_content(value) for value in content]
+    if isinstance(content, (str, bytes, int, float, bool, type(None))):
+        return content
+    if isinstance(content, (np.ndarray, pd.DataFrame, pd.Series)):
+        return content.copy()
+    if isinstance(content, BytesIO):
+        return BytesIO(content.getvalue())
+    return copy.deepcopy(content)
+
+
+def requested_node_ids(analyzers) -> dict:
+    """
+    Gather the nodes hinted by the analyzers for each file.
+
+    Args:
+        analyzers: The analyzers that will parse the files
+
+    Returns: Dictionary associating filename -> sorted list of node ids (None meaning all the nodes)
+
+    """
+    node_ids_by_file = {}
+    for analyzer in analyzers:
+        if not analyzer.parse:
+            continue
+
+        for filename in analyzer.filenames:
+            # One analyzer needing all the nodes means all the nodes have to be retrieved
+            if analyzer.node_ids is None or (filename in node_ids_by_file and node_ids_by_file[filename] is None):
+                node_ids_by_file[filename] = None
+            else:
+                node_ids_by_file.setdefault(filename, set()).update(analyzer.node_ids)
+
+    return {filename: sorted(node_ids) if node_ids is not None else None
+            for filename, node_ids in node_ids_by_file.items()}
+
+
+def parse_files(analyzer, byte_arrays, parsed_files, channels_by_file, consumers, node_ids_by_file=None) -> dict:
+    """
+    Parse the files of an analyzer not already present in the parsed_files memo.
+    The last analyzer consuming a parsed file receives the memo content, the previous ones a copy of it.
+
+    Args:
+        analyzer: The analyzer needing the files
+        byte_arrays: Dictionary associating filename -> content
+        parsed_files: Memo associating (filename, columnar) -> parsed content, updated in place
+        channels_by_file: The channels to decode for each file, as returned by requested_channels()
+        consumers: Counter associating (filename, columnar) -> analyzers still needing it, updated in place
+        node_ids_by_file: The nodes to retrieve for each file, as returned by requested_node_ids()
+
+    Returns: Dictionary associating filename -> parsed content for the analyzer
+
+    """
+    files = {}
+    for filename in analyzer.filenames:
+        key = parsed_file_key(analyzer, filename)
+
+        if key not in parsed_files:
+            channels = channels_by_file.get(filename) if key[1] else None
+            node_ids = (node_ids_by_file or {}).get(filename)
+            parsed_files[key] = SimulationOutputParser.parse(filename, byte_arrays[filename], node_ids=node_ids,
+                                                             channels=channels)
+
+        consumers[key] -= 1
+        files[filename] = parsed_files[key] if consumers[key] <= 0 else copy_content(parsed_files[key])
+
+    return files
+
+
+def analyzer_view(analyzer, files) -> MappingProxyType:
+    """
+    Create a read-only view of the files restricted to the ones requested by the analyzer.
+
+    Args:
+        analyzer: The analyzer receiving the view
+        files: Dictionary associating filename -> content (raw or parsed)
+
+    Returns: The read-only view
+
+    """
+    return MappingProxyType({filename: files[filename] for filename in analyzer.filenames})
+
+
+def retrieve_data_for_simulation(simulation, analyzers, cache, path_mapping, output_cache=None, metrics=None):
+    """
+    Retrieve the files of a simulation and run the select_simulation_data of every analyzer on it.
+    The selected data of the regular analyzers is stored in the cache while the selected data of the incremental
+    analyzers is returned to be reduced by the caller.
+
+    Args:
+        simulation: The simulation to process
+        analyzers: The list of all analyzers to run
+        cache: The cache object
+        path_mapping: The mapping for path translation when running on SSMT
+        output_cache: Optional OutputCache persisting the files and selected data between runs
+        metrics: The AnalysisMetrics collecting the timings and exception of the task
+
+    Returns: Dictionary associating incremental analyzer uid -> selected data or None if an error happened
+
+    """
+    metrics = metrics or AnalysisMetrics()
+    try:
+        filtered_uids, selected_data, byte_arrays = fetch_simulation_data(simulation, analyzers, path_mapping,
+                                                                           output_cache, metrics=metrics)
     except:
         set_exception(step="data retrieval",
                       info={"Simulation": simulation,
                             "Analyzers": ", ".join([a.uid for a in analyzers]),
-                            "Files": ", ".join(filenames)},
-                      cache=cache)
-        return
+                            "Files": ", ".join(set(itertools.chain(*(a.filenames for a in analyzers))))},
+                      metrics=metrics)
+        return None
+
+    return process_simulation_data(simulation, analyzers, filtered_uids, selected_data, byte_arrays, cache,
+                                   output_cache, metrics)
+
+
+def fetch_simulation_data(simulation, analyzers, path_mapping, output_cache=None, retrieve_function=retrieve_files,
+                          metrics=None):
+    """
+    I/O part of the analysis of a simulation: filter the analyzers, reuse the persisted selected data and retrieve
+    the files needed by the remaining analyzers.
+
+    Args:
+        simulation: The simulation to process
+        analyzers: The list of all analyzers to run
+        path_mapping: The mapping for path translation when running on SSMT
+        output_cache: Optional OutputCache persisting the files and selected data between runs
+        retrieve_function: Function (simulation, filenames, path_mapping) -> {filename: content} retrieving the files
+        metrics: The AnalysisMetrics collecting the download time and bytes
+
+    Returns: Tuple (uids of the analyzers to run, already selected data, {filename: content})
+
+    """
+    metrics = metrics or AnalysisMetrics()
+
+    # Filter first
+    filtered_analysis = [a for a in analyzers if a.filter(simulation)]
+    filtered_uids = [a.uid for a in filtered_analysis]
+
+    # Only the outputs of succeeded simulations are final and can be persisted
+    if output_cache and getattr(simulation, "status", None) != SimulationState.Succeeded:
+        output_cache = None
 
     # Selected data will be a dict with analyzer.uid => data
     selected_data = {}
-    for analyzer in filtered_analysis:
+
+    # Reuse the selected data persisted by a previous run
+    if output_cache:
+        for analyzer in filtered_analysis:
+            data = output_cache.get_selected_data(simulation.id, analyzer)
+            if data is not None:
+                selected_data[analyzer.uid] = data
+
+    # Get the filenames from the analysis still needing to run
+    pending_analysis = [a for a in filtered_analysis if a.uid not in selected_data]
+    filenames = set(itertools.chain(*(a.filenames for a in pending_analysis)))
+
+    # The byte_arrays will associate filename with content
+    byte_arrays = {}
+
+    if output_cache:
+        for filename in filenames:
+            content = output_cache.get_file(simulation.id, filename)
+            if content is not None:
+                byte_arrays[filename] = content
+
+    missing_files = filenames.difference(byte_arrays)
+    if missing_files:
+        with metrics.stage("download"):
+            retrieved_files = retrieve_function(simulation, missing_files, path_mapping)
+        metrics.bytes += sum(len(content) for content in retrieved_files.values())
+        byte_arrays.update(retrieved_files)
+
+        if output_cache:
+            for filename, content in retrieved_files.items():
+                output_cache.set_file(simulation.id, filename, content)
+
+    return filtered_uids, selected_data, byte_arrays
+
+
+def process_simulation_data(simulation, analyzers, filtered_uids, selected_data, byte_arrays, cache,
+                            output_cache=None, metrics=None):
+    """
+    CPU part of the analysis of a simulation: parse the files and run select_simulation_data.
+
+    Args:
+        simulation: The simulation to process
+        analyzers: The list of all analyzers to run
+        filtered_uids: The uids of the analyzers accepting the simulation
+        selected_data: The selected data already known (from the persistent cache)
+        byte_arrays: Dictionary associating filename -> content
+        cache: The cache object
+        output_cache: Optional OutputCache persisting the files and selected data between runs
+        metrics: The AnalysisMetrics collecting the timings and exception of the task
+
+    Returns: Dictionary associating incremental analyzer uid -> selected data or None if an error happened
+
+    """
+    metrics = metrics or AnalysisMetrics()
+    filtered_analysis = [a for a in analyzers if a.uid in filtered_uids]
+
+    # We dont have anything to do :)
+    if not filtered_analysis:
+        cache.set(simulation.id, None)
+        return {}
+
+    # Only the outputs of succeeded simulations are final and can be persisted
+    if output_cache and getattr(simulation, "status", None) != SimulationState.Succeeded:
+        output_cache = None
+
+    pending_analysis = [a for a in filtered_analysis if a.uid not in selected_data]
+
+    # Each file is parsed only once and copied for the analyzers requesting it
+    parsed_files = {}
+    channels_by_file = requested_channels(pending_analysis)
+    node_ids_by_file = requested_node_ids(pending_analysis)
+    consumers = Counter(parsed_file_key(a, filename) for a in pending_analysis if a.parse for filename in a.filenames)
+    for analyzer in pending_analysis:
         # If the analyzer needs the parsed data, parse
         if analyzer.parse:
             try:
-                data = {filename: SimulationOutputParser.parse(filename, content)
-                        for filename, content in byte_arrays.items()}
+                with metrics.stage("parse"):
+                    files = parse_files(analyzer, byte_arrays, parsed_files, channels_by_file, consumers,
+                                        node_ids_by_file)
+                    data = analyzer_view(analyzer, files)
             except:
                 set_exception(step="data parsing",
                               info={"Simulation": simulation, "Analyzer": analyzer.uid},
-                              cache=cache)
-                return
+                              metrics=metrics)
+                return None
         else:
             # If the analyzer doesnt wish to parse, give the raw data
-            data = byte_arrays
+            data = analyzer_view(analyzer, byte_arrays)
 
         # Retrieve the selected data for the given analyzer
         try:
-            selected_data[analyzer.uid] = analyzer.select_simulation_data(data, simulation)
+            with metrics.stage("select"):
+                selected_data[analyzer.uid] = analyzer.select_simulation_data(data, simulation)
         except:
             set_exception(step="data processing", info={"Simulation": simulation, "Analyzer": analyzer.uid},
-                          cache=cache)
+                          metrics=metrics)
 
-            return
+            return None
 
-    # Store in the cache
+        # Analyzers only producing side effects (returning None) are not persisted and will run again
+        if output_cache and selected_data[analyzer.uid] is not None:
+            output_cache.set_selected_data(simulation.id, analyzer, selected_data[analyzer.uid])
+
+    # Store in the cache only what the regular analyzers need, the incremental ones get reduced right away
+    reduced_data = {a.uid: selected_data.pop(a.uid) for a in filtered_analysis if a.incremental}
     cache.set(simulation.id, selected_data)
+
+    return reduced_data
@@ -0,0 +1,197 @@
+import functools
+import hashlib
+import inspect
+import json
+import os
+import types
+
+from diskcache import Cache
+
+from simtools.SetupParser import SetupParser
+from simtools.Utilities.General import init_logging
+
+logger = init_logging('OutputCache')
+
+DEFAULT_DIRECTORY = os.path.join(os.path.expanduser("~"), ".dtk-tools", "output_cache")
+DEFAULT_SIZE_LIMIT = 4  # GB
+
+# Attributes of the analyzers that do not influence the selected data
+IGNORED_ATTRIBUTES = ("results", "working_dir", "cache")
+
+# Marks the attribute values that cannot be identified the same way in every process
+_UNSTABLE = object()
+
+
+def output_cache_settings():
+    """
+    Get the default location and size limit of the output cache.
+    The DTK_TOOLS_OUTPUT_CACHE and DTK_TOOLS_OUTPUT_CACHE_SIZE (in GB) environment variables take precedence over the
+    output_cache_directory and output_cache_size options of the simtools.ini.
+
+    Returns: (directory, size limit in bytes)
+    """
+    directory = os.environ.get("DTK_TOOLS_OUTPUT_CACHE")
+    size = os.environ.get("DTK_TOOLS_OUTPUT_CACHE_SIZE")
+    if not directory or not size:
+        try:
+            with SetupParser.TemporarySetup() as sp:
+                directory = directory or sp.get("output_cache_directory")
+                size = size or sp.get("output_cache_size")
+        except Exception:
+            pass
+
+    return os.path.expanduser(directory or DEFAULT_DIRECTORY), int(float(size or DEFAULT_SIZE_LIMIT) * 2 ** 30)
+
+
+def stable_value(value, _seen=None):
+    """
+    Convert a value to a JSON serializable one which is the same in every process.
+    Sets are sorted and functions are identified by their name, bytecode, constants, defaults and closure values.
+    A value which cannot be identified this way (object whose repr contains an address...) makes the whole value
+    unstable.
+
+    Args:
+        value: The value to convert
+        _seen: Ids of the functions being converted, to stop on recursive closures
+
+    Returns: The converted value or _UNSTABLE
+    """
+    _seen = set() if _seen is None else _seen
+    convert = functools.partial(stable_value, _seen=_seen)
+
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if value is Ellipsis:
+        return "..."
+    if isinstance(value, bytes):
+        return hashlib.md5(value).hexdigest()
+    if isinstance(value, dict):
+        items = [[convert(k), convert(v)] for k, v in value.items()]
+        if any(k is _UNSTABLE or v is _UNSTABLE for k, v in items):
+            return _UNSTABLE
+        return sorted(items, key=lambda item: json.dumps(item[0], sort_keys=True))
+    if isinstance(value, (list, tuple, set, frozenset)):
+        items = [convert(v) for v in value]
+        if any(v is _UNSTABLE for v in items):
+            return _UNSTABLE
+        if isinstance(value, (set, frozenset)):
+            items.sort(key=lambda v: json.dumps(v, sort_keys=True))
+        return items
+    if hasattr(value, "tolist"):  # NumPy arrays and scalars
+        return convert(value.tolist())
+    if isinstance(value, types.CodeType):
+        return convert([value.co_name, value.co_code, value.co_consts, value.co_names])
+    if isinstance(value, types.FunctionType):
+        name = "{}.{}".format(value.__module__, value.__qualname__)
+        if id(value) in _seen:
+            return name
+        _seen.add(id(value))
+        closure = []
+        for cell in value.__closure__ or ():
+            try:
+                closure.append(cell.cell_contents)
+            except ValueError:  # Empty cell
+                closure.append(None)
+        return convert([name, value.__code__, value.__defaults__, value.__kwdefaults__, closure])
+    if isinstance(value, types.MethodType):
+        return convert([value.__func__, value.__self__])
+    if isinstance(value, functools.partial):
+        return convert([value.func, value.args, value.keywords])
+    if isinstance(value, (type, types.BuiltinFunctionType)) and hasattr(value, "__qualname__"):
+        return "{}.{}".format(getattr(value, "__module__", ""), value.__qualname__)
+    return _UNSTABLE
+
+
+class OutputCache:
+    """
+    Persistent cache of simulation outputs shared between AnalyzeManager runs.
+
+    Two kinds of entries are stored:
+    - the raw bytes of a simulation file, keyed by (sim id, filename)
+    - the result of select_simulation_data, keyed by (sim id, analyzer uid, analyzer version)
+
+    The analyzer version is a hash of its class source and its attributes so that changing the analyzer code or
+    parameters invalidates the selected data. An analyzer can instead declare an explicit `cache_version`.
+    The selected data of an analyzer whose attributes cannot be identified are not persisted.
+    The cache is bounded by `size_limit` and evicts the least recently used entries.
+    By default, the cache is stored in ~/.dtk-tools/output_cache and limited to 4GB (see output_cache_settings).
+    Only the outputs of succeeded simulations should be stored as they will not change anymore.
+    """
+
+    def __init__(self, directory=None, size_limit=None):
+        """
+        Args:
+            directory: Where to store the cache
+            size_limit: Maximum size of the cache in bytes
+        """
+        default_directory, default_size_limit = output_cache_settings()
+        self.directory = directory or default_directory
+        self.size_limit = size_limit or default_size_limit
+        self.cache = Cache(self.directory, size_limit=self.size_limit, eviction_policy='least-recently-used')
+        self.versions = {}
+
+    @staticmethod
+    def analyzer_version(analyzer):
+        """
+        Compute a hash identifying the code and parameters of an analyzer.
+        The hash only depends on values serialized the same way in every process, so that it can be reused by the
+        next runs. When an attribute cannot be serialized this way, the analyzer cannot be identified: it has to
+        declare a `cache_version` to change when its selected data do.
+
+        Args:
+            analyzer: The analyzer to identify
+
+        Returns: The md5 hex digest or None if the analyzer cannot be identified
+        """
+        cls = type(analyzer)
+        cache_version = getattr(analyzer, "cache_version", None)
+        if cache_version is not None:
+            key = [cls.__module__, cls.__qualname__, stable_value(cache_version)]
+            return hashlib.md5(json.dumps(key, sort_keys=True).encode()).hexdigest()
+
+        try:
+            source = inspect.getsource(cls)
+        except (OSError, TypeError):
+            source = cls.__qualname__
+
+        attributes = {k: v for k, v in vars(analyzer).items() if k not in IGNORED_ATTRIBUTES}
+        unstable = sorted(k for k, v in attributes.items() if stable_value(v) is _UNSTABLE)
+        if unstable:
+            logger.warning("The selected data of the analyzer %s will not be cached: the attributes %s cannot be "
+                           "identified across runs. Set its cache_version to cache them.", analyzer.uid,
+                           ", ".join(unstable))
+            return None
+
+        attributes = stable_value(attributes)
+        md5 = hashlib.md5(source.encode())
+        md5.update(json.dumps(attributes, sort_keys=True).encode())
+        return md5.hexdigest()
+
+    def register_analyzers(self, analyzers) -> None:
+        """
+        Compute once the versions of the analyzers before the analysis starts.
+        """
+        self.versions = {a.uid: self.analyzer_version(a) for a in analyzers}
+
+    def get_file(self, sim_id, filename):
+        return self.cache.get(("file", str(sim_id), filename))
+
+    def set_file(self, sim_id, filename, content) -> None:
+        self.cache.set(("file", str(sim_id), filename), content)
+
+    def get_selected_data(self, sim_id, analyzer, default=None):
+        version = self.versions.get(analyzer.uid)
+        if version is None:
+            return default
+        return self.cache.get(("selected", str(sim_id), analyzer.uid, version), default=default)
+
+    def set_selected_data(self, sim_id, analyzer, data) -> None:
+        version = self.versions.get(analyzer.uid)
+        if version is not None:
+            self.cache.set(("selected", str(sim_id), analyzer.uid, version), data)
+
+    def clear(self) -> None:
+        self.cache.clear()
+
+    def close(self) -> None:
+        self.cache.close()
@@ -2,16 +2,118 @@ import json
 import os
 from io import StringIO, BytesIO
 
+import numpy as np
 import pandas as pd
 
+_decoder = json.JSONDecoder()
+_whitespace = json.decoder.WHITESPACE
+_skipped = object()
+
+
+def _skip_whitespace(text, pos):
+    return _whitespace.match(text, pos).end()
+
+
+def _scan_object(text, pos, scan_value):
+    """
+    Scan a JSON object starting at pos.
+    :param text: The JSON document
+    :param pos: Position of the opening brace
+    :param scan_value: Function (key, text, pos) -> (value, end) used to decode each value.
+    Values returned as _skipped are not added to the object.
+    :return: (dict, position after the closing brace)
+    """
+    if text[pos] != '{':
+        raise ValueError("Expecting an object at position {}".format(pos))
+
+    result = {}
+    pos = _skip_whitespace(text, pos + 1)
+    if text[pos] == '}':
+        return result, pos + 1
+
+    while True:
+        key, pos = _decoder.raw_decode(text, pos)
+        pos = _skip_whitespace(text, pos)
+        if not isinstance(key, str) or text[pos] != ':':
+            raise ValueError("Expecting a key at position {}".format(pos))
+
+        value, pos = scan_value(key, text, _skip_whitespace(text, pos + 1))
+        if value is not _skipped:
+            result[key] = value
+
+        pos = _skip_whitespace(text, pos)
+        if text[pos] == '}':
+            return result, pos + 1
+        if text[pos] != ',':
+            raise ValueError("Expecting a delimiter at position {}".format(pos))
+        pos = _skip_whitespace(text, pos + 1)
+
+
+def _scan_data(text, pos, skip):
+    """
+    Decode a Data array directly into a float array without creating Python floats.
+    Nested arrays (for example per species data) go through the regular decoder.
+    """
+    if text[pos] != '[':
+        return _decoder.raw_decode(text, pos)
+
+    end = text.find(']', pos)
+    if text.find('[', pos + 1, end) != -1:
+        value, end = _decoder.raw_decode(text, pos)
+        return (_skipped, end) if skip else (_to_array(value), end)
+
+    if skip:
+        return _skipped, end + 1
+
+    values = text[pos + 1:end]
+    if not values.strip():
+        return np.array([], dtype=float), end + 1
+
+    array = np.fromstring(values, dtype=float, sep=',')
+    if len(array) != values.count(',') + 1:
+        raise ValueError("Invalid Data array at position {}".format(pos))
+    return array, end + 1
+
+
+def _to_array(value):
+    try:
+        return np.asarray(value, dtype=float)
+    except (TypeError, ValueError):
+        # Ragged or non numeric data stay as they are
+        return value
+
+
+def _channels_from_dict(content, channels):
+    """
+    Convert a fully decoded InsetChart-style dictionary to the columnar representation.
+    """
+    if not isinstance(content, dict) or not isinstance(content.get("Channels"), dict):
+        return content
+
+    content["Channels"] = {name: dict(channel, Data=_to_array(channel["Data"])) if "Data" in channel else channel
+                           for name, channel in content["Channels"].items()
+                           if not channels or name in channels}
+    return content
+
 
 class SimulationOutputParser:
     @classmethod
-    def parse(cls, filename, content=None):
+    def parse(cls, filename, content=None, node_ids=None, channels=None):
+        """
+        Parse the content of an output file depending on its extension.
+        :param filename: Name of the file (used to pick the parser)
+        :param content: Bytes of the file
+        :param node_ids: For spatial reports, only retrieve the given nodes
+        :param channels: For JSON files, decode the InsetChart-style Channels as NumPy arrays and only keep the given
+        channels. An empty collection keeps all the channels. None uses the regular JSON decoding.
+        :return: The parsed content
+        """
         file_extension = os.path.splitext(filename)[1][1:].lower()
         content = BytesIO(content)
 
         if file_extension == 'json':
+            if channels is not None:
+                return cls.load_channels_json_file(filename, content, channels)
             return cls.load_json_file(filename, content)
 
         if file_extension == 'csv':
@@ -24,7 +126,7 @@ class SimulationOutputParser:
             return cls.load_txt_file(filename, content)
 
         if file_extension == 'bin' and 'SpatialReport' in filename:
-            return cls.load_bin_file(filename, content)
+            return cls.load_bin_file(filename, content, node_ids)
 
         return cls.load_raw_file(filename, content)
 
@@ -32,6 +134,39 @@ class SimulationOutputParser:
     def load_json_file(cls, filename, content):
         return json.load(content)
 
+    @classmethod
+    def load_channels_json_file(cls, filename, content, channels=None):
+        """
+        Columnar parser for the InsetChart-style reports (InsetChart, ReportMalariaFilter, BinnedReport...).
+        The Channels[*].Data arrays are decoded directly into NumPy float arrays and the channels not requested are
+        skipped without being decoded.
+        :param filename: Name of the file
+        :param content: BytesIO of the file
+        :param channels: The channels to keep (all if empty or None)
+        :return: Dictionary with the same structure as the JSON file
+        """
+        channels = set(channels) if channels else None
+        text = content.getvalue().decode()
+
+        def scan_channel(name, text, pos):
+            skip = channels is not None and name not in channels
+            channel, end = _scan_object(text, pos, lambda key, t, p: _scan_data(t, p, skip) if key == "Data"
+                                        else _decoder.raw_decode(t, p))
+            return (_skipped, end) if skip else (channel, end)
+
+        def scan_root(key, text, pos):
+            if key == "Channels" and text[pos] == '{':
+                return _scan_object(text, pos, scan_channel)
+            return _decoder.raw_decode(text, pos)
+
+        try:
+            result, _ = _scan_object(text, _skip_whitespace(text, 0), scan_root)
+        except (ValueError, IndexError):
+            # Unexpected layout, fall back to the regular decoding
+            result = _channels_from_dict(json.loads(text), channels)
+
+        return result
+
     @classmethod
     def load_raw_file(self, filename, content):
         return content
@@ -55,7 +190,14 @@ class SimulationOutputParser:
         return str(content.getvalue().decode())
 
     @classmethod
-    def load_bin_file(cls, filename, content):
+    def load_bin_file(cls, filename, content, node_ids=None):
         from dtk.tools.output.SpatialOutput import SpatialOutput
-        so = SpatialOutput.from_bytes(content.read(), 'Filtered' in filename)
-        return so.to_dict()
+        filtered = 'Filtered' in filename
+        if node_ids is None:
+            return SpatialOutput.from_bytes(content.getbuffer(), filtered).to_dict()
+
+        # Work on a view of the buffer to only copy the requested nodes
+        spatial_dict = SpatialOutput.from_bytes(content.getbuffer(), filtered, copy=False).to_dict(node_ids)
+        spatial_dict['nodeids'] = spatial_dict['nodeids'].astype(np.int64)
+        spatial_dict['data'] = spatial_dict['data'].astype(np.float64)
+        return spatial_dict
@@ -0,0 +1,129 @@
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import TimeoutError
+
+from simtools.Analysis.AnalysisMetrics import AnalysisMetrics
+from simtools.Analysis.DataRetrievalProcess import fetch_simulation_data, process_data, retrieve_files, set_exception
+
+DEFAULT_MAX_DOWNLOADS = 16  # Number of simulations downloaded concurrently
+QUEUE_SIZE_PER_DOWNLOAD = 2  # How many retrieved simulations can wait for the CPU stage per download thread
+
+
+class RetrievalPipeline:
+    """
+    Two stages pipeline separating the retrieval of the files from their processing:
+    - I/O stage: a thread pool retrieving the files of many simulations concurrently
+    - CPU stage: the process pool (initialized with `process_data`) parsing the files and running the analyzers
+
+    The stages are connected by a bounded queue: at most `queue_size` simulations can be downloaded and waiting to be
+    processed, the downloads pause when the CPU stage falls behind.
+
+    The results are consumed like a `Pool.imap_unordered` iterator with `next(timeout)`, each result being a tuple
+    (partial states, AnalysisMetrics) for one simulation.
+    """
+
+    def __init__(self, pool, analyzers, cache, path_mapping=None, output_cache=None,
+                 max_downloads=DEFAULT_MAX_DOWNLOADS, queue_size=None, retrieve_function=retrieve_files):
+        """
+        :param pool: The process pool, initialized with `process_data` as function
+        :param analyzers: The list of all analyzers to run
+        :param cache: The cache object
+        :param path_mapping: The mapping for path translation when running on SSMT
+        :param output_cache: Optional OutputCache persisting the files and selected data between runs
+        :param max_downloads: How many simulations to retrieve concurrently
+        :param queue_size: How many simulations can be retrieved and waiting for the CPU stage
+        :param retrieve_function: Function (simulation, filenames, path_mapping) -> {filename: content}.
+        Allows to replace the server by a local stand-in.
+        """
+        self.pool = pool
+        self.analyzers = analyzers
+        self.cache = cache
+        self.path_mapping = path_mapping
+        self.output_cache = output_cache
+        self.max_downloads = max_downloads
+        self.retrieve_function = retrieve_function
+        self.queue_size = queue_size or max_downloads * QUEUE_SIZE_PER_DOWNLOAD
+
+        self.slots = threading.BoundedSemaphore(self.queue_size)
+        self.results = queue.Queue()
+        self.cancelled = threading.Event()
+        self.executor = None
+        self.pending = 0
+
+    def start(self, simulations):
+        """
+        Start retrieving the simulations.
+        :param simulations: The simulations to analyze
+        :return: self, to be used as results iterator
+        """
+        simulations = list(simulations)
+        self.pending = len(simulations)
+        self.executor = ThreadPoolExecutor(max_workers=self.max_downloads)
+        for simulation in simulations:
+            self.executor.submit(self._download, simulation)
+        return self
+
+    def _download(self, simulation):
+        # Wait for a free slot in the queue
+        while not self.slots.acquire(timeout=1):
+            if self.cancelled.is_set():
+                return
+
+        if self.cancelled.is_set():
+            self.slots.release()
+            return
+
+        metrics = AnalysisMetrics()
+        try:
+            filtered_uids, selected_data, byte_arrays = fetch_simulation_data(simulation, self.analyzers,
+                                                                               self.path_mapping, self.output_cache,
+                                                                               self.retrieve_function, metrics)
+        except:
+            set_exception(step="data retrieval", info={"Simulation": simulation}, metrics=metrics)
+            self._done(({}, metrics))
+            return
+
+        # The download metrics are merged with the processing ones when the pool is done
+        self.pool.apply_async(process_data, ((simulation, filtered_uids, selected_data, byte_arrays),),
+                              callback=lambda result: self._done(result, metrics), error_callback=self._done)
+
+    def _done(self, result, download_metrics=None):
+        # Called by the download threads or the pool result handler
+        if download_metrics and not isinstance(result, BaseException):
+            result[1].merge(download_metrics)
+
+        self.slots.release()
+        self.results.put(result)
+
+    def next(self, timeout=None):
+        """
+        Get the partial states of the next processed simulation.
+        :param timeout: How long to wait for a result
+        :return: Tuple (dictionary associating incremental analyzer uid -> partial state, AnalysisMetrics)
+        :raise StopIteration: When all the simulations have been processed
+        :raise TimeoutError: If no simulation finished during timeout
+        """
+        if self.pending == 0:
+            self.close()
+            raise StopIteration
+
+        try:
+            result = self.results.get(timeout=timeout)
+        except queue.Empty:
+            raise TimeoutError
+
+        self.pending -= 1
+        if isinstance(result, BaseException):
+            self.close()
+            raise result
+
+        return result
+
+    def close(self):
+        """
+        Stop the downloads not started yet.
+        """
+        self.cancelled.set()
+        if self.executor:
+            self.executor.shutdown(wait=False)
@@ -1,20 +1,50 @@
 import logging
 import datetime
+import multiprocessing.util
+import os
+import queue
+import threading
 
 from simtools.DataAccess.LoggingDataStore import LoggingDataStore
 
+QUEUE_SIZE = 10000  # Records waiting to be saved, the new records are dropped when it is full
+BATCH_SIZE = 500  # Maximum number of records inserted in one transaction
+FLUSH_INTERVAL = 1  # seconds
+
 
 class SQLiteHandler(logging.Handler):
     """
-    This version sacrifices performance for thread-safety:
-    Instead of using a persistent cursor, we open/close connections for each entry.
+    emit only queues the records: a background thread inserts them in batches, one transaction per batch.
+    If the DB cannot keep up and the queue is full, the new records are dropped and their number is logged with the
+    next batch. The queued records are saved when the handler is closed (by logging.shutdown at exit) or, in a child
+    process which exits without logging.shutdown, when multiprocessing ends it.
     """
-    def __init__(self):
+    def __init__(self, capacity=QUEUE_SIZE, batch_size=BATCH_SIZE, flush_interval=FLUSH_INTERVAL):
         logging.Handler.__init__(self)
+        self.capacity = capacity
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self.dropped_lock = threading.Lock()
+        self.pid = None
+        self.queue = None
+        self.thread = None
+        self.stopped = threading.Event()
 
     def formatDBTime(self, record):
         record.dbtime = datetime.datetime.now()
 
+    def start(self):
+        # Also called in a forked process, which does not have the writer thread of its parent
+        self.pid = os.getpid()
+        self.queue = queue.Queue(self.capacity)
+        self.dropped = 0
+        self.stopped.clear()
+        self.thread = threading.Thread(target=self.run, name="SQLiteHandler", daemon=True)
+        self.thread.start()
+        # The children of multiprocessing exit with os._exit but run their finalizers first
+        multiprocessing.util.Finalize(None, self.stop, exitpriority=0)
+
     def emit(self, record):
         record_info = record.__dict__
 
@@ -32,21 +62,87 @@ class SQLiteHandler(logging.Handler):
         else:
             record.exc_text = ""
 
-        # Insert log record
-        record = LoggingDataStore.create_record(
-            created=record_info['dbtime'],
-            name=record_info['name'],
-            log_level=record_info['levelno'],
-            log_level_name=record_info['levelname'],
-            message=str(record_info['msg']),
-            # args=record_info['args'],
-            module=record_info['module'],
-            func_name=record_info['funcName'],
-            line_no=record_info['lineno'],
-            exception=record_info['exc_text'],
-            #process=record_info['process'],
-            #thread=record_info['thread'],
-            thread_name=record_info['threadName']
-        )
-
-        LoggingDataStore.save_record(record)
+        # Queue the log record
+        if self.pid != os.getpid():
+            self.start()
+        try:
+            self.queue.put_nowait(dict(
+                created=record_info['dbtime'],
+                name=record_info['name'],
+                log_level=record_info['levelno'],
+                log_level_name=record_info['levelname'],
+                message=str(record_info['msg']),
+                # args=record_info['args'],
+                module=record_info['module'],
+                func_name=record_info['funcName'],
+                line_no=record_info['lineno'],
+                exception=record_info['exc_text'],
+                #process=record_info['process'],
+                #thread=record_info['thread'],
+                thread_name=record_info['threadName']
+            ))
+        except queue.Full:
+            with self.dropped_lock:
+                self.dropped += 1
+
+    def run(self):
+        while not self.stopped.is_set():
+            try:
+                record = self.queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            # None is only queued to wake the thread up when the handler is closed
+            if record is not None:
+                self.save([record])
+
+    def save(self, records):
+        """
+        Save the given records and the ones queued (by batches of batch_size).
+        """
+        while True:
+            while len(records) < self.batch_size:
+                try:
+                    record = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                if record is not None:
+                    records.append(record)
+
+            with self.dropped_lock:
+                dropped, self.dropped = self.dropped, 0
+            if dropped:
+                records.append(dict(created=datetime.datetime.now(), name=__name__, log_level=logging.WARNING,
+                                    log_level_name='WARNING', message="%d log records dropped" % dropped,
+                                    module='SQLiteHandler', func_name='save', line_no=0, exception="",
+                                    thread_name=self.thread.name))
+
+            if not records:
+                return
+            self.write(records)
+            records = []
+
+    def write(self, records):
+        LoggingDataStore.save_records(records)
+
+    def flush(self):
+        # Save what is queued from the calling thread
+        if self.pid == os.getpid():
+            self.save([])
+
+    def stop(self):
+        """
+        Stop the writer thread of this process and save the queued records.
+        """
+        if self.pid == os.getpid():
+            self.stopped.set()
+            try:
+                self.queue.put_nowait(None)
+            except queue.Full:
+                pass
+            self.thread.join()
+            self.save([])
+            self.pid = None
+
+    def close(self):
+        self.stop()
+        logging.Handler.close(self)
@@ -1,16 +1,20 @@
 import datetime
 import json
+from collections import Counter
 from operator import or_
 
 from simtools.DataAccess import session_scope
-from simtools.DataAccess.Schema import Experiment, Simulation
+from simtools.DataAccess.Schema import Experiment, Settings, Simulation
+from sqlalchemy import func
 from sqlalchemy.orm import joinedload
 
 from simtools.Utilities.Encoding import GeneralEncoder
-from simtools.Utilities.General import init_logging, remove_null_values
+from simtools.Utilities.General import init_logging, remove_null_values, batch_list
 logger = init_logging('DataAccess')
 from COMPS.Data.Simulation import SimulationState
 
+SYNC_MARK_KEY = 'sync_mark_%s'  # Setting holding the creation date of the last simulation synced for an experiment
+
 
 class ExperimentDataStore:
     @classmethod
@@ -35,6 +39,78 @@ class ExperimentDataStore:
 
         return experiment
 
+    @classmethod
+    def get_simulations_status(cls, exp_id):
+        """
+        Retrieve the status of the simulations of an experiment without loading the simulation objects (and their tags).
+        :param exp_id: The experiment id
+        :return: A list of (simulation id, SimulationState or None, message) tuples
+        """
+        with session_scope() as session:
+            rows = session.query(Simulation.id, Simulation.status_s, Simulation.message) \
+                .filter(Simulation.experiment_id == exp_id) \
+                .order_by(Simulation.date_created).all()
+
+        return [(sim_id, SimulationState[status] if status else None, message) for sim_id, status, message in rows]
+
+    @classmethod
+    def get_simulations_status_counts(cls, exp_id):
+        """
+        Count the simulations of an experiment by status.
+        :param exp_id: The experiment id
+        :return: A Counter of SimulationState (None for the simulations without status)
+        """
+        with session_scope() as session:
+            rows = session.query(Simulation.status_s, func.count(Simulation.id)) \
+                .filter(Simulation.experiment_id == exp_id) \
+                .group_by(Simulation.status_s).all()
+
+        return Counter({SimulationState[status] if status else None: count for status, count in rows})
+
+    @classmethod
+    def get_experiments_sync_state(cls, exp_ids):
+        """
+        Retrieve what a sync needs to know about the experiments already in the local DB, without loading them.
+        :param exp_ids: The experiment ids
+        :return: {experiment id: ({simulation id: SimulationState}, sync mark or None)} for the experiments present
+        """
+        sync_state = {}
+        with session_scope() as session:
+            for exp_ids_batch in batch_list(exp_ids, 500):
+                for (exp_id,) in session.query(Experiment.exp_id).filter(Experiment.exp_id.in_(exp_ids_batch)):
+                    sync_state[exp_id] = ({}, None)
+
+                for exp_id, sim_id, status in session.query(Simulation.experiment_id, Simulation.id, Simulation.status_s)\
+                        .filter(Simulation.experiment_id.in_(exp_ids_batch)):
+                    sync_state[exp_id][0][sim_id] = SimulationState[status] if status else None
+
+                mark_keys = {SYNC_MARK_KEY % exp_id: exp_id for exp_id in exp_ids_batch}
+                for key, value in session.query(Settings.key, Settings.value).filter(Settings.key.in_(mark_keys)):
+                    exp_id = mark_keys[key]
+                    if exp_id in sync_state:
+                        sync_state[exp_id] = (sync_state[exp_id][0], value)
+
+        return sync_state
+
+    @classmethod
+    def save_sync_changes(cls, changes):
+        """
+        Save the changes retrieved by a sync in one transaction.
+        :param changes: List of changes (see COMPS_experiment_changes)
+        """
+        with session_scope() as session:
+            for change in changes:
+                if change['experiment']:
+                    session.add(change['experiment'])
+                session.bulk_save_objects(change['simulations'])
+                session.bulk_update_mappings(Simulation, [{'id': sim_id, 'status_s': status.name}
+                                                          for sim_id, status in change['status'].items()])
+                session.merge(Settings(key=SYNC_MARK_KEY % change['exp_id'], value=change['mark']))
+
+            # Keep the experiments usable once the session is closed
+            session.flush()
+            session.expunge_all()
+
     @classmethod
     def batch_save_experiments(cls, batch):
         logger.debug("Batch save experiments")
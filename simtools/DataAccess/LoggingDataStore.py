@@ -22,6 +22,18 @@ class LoggingDataStore:
         except:
             pass
 
+    @classmethod
+    def save_records(cls, records):
+        """
+        Insert a batch of log records in one transaction.
+        :param records: List of dicts of LogRecord columns
+        """
+        try:
+            with session_scope(Session_logs()) as session:
+                session.bulk_insert_mappings(LogRecord, records)
+        except:
+            pass
+
     @classmethod
     def get_records(cls, level,modules,number):
         records = None
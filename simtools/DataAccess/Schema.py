@@ -4,6 +4,7 @@ import os
 from sqlalchemy import Column
 from sqlalchemy import DateTime
 from sqlalchemy import ForeignKey
+from sqlalchemy import Index
 from sqlalchemy import Integer
 from sqlalchemy import PickleType
 from sqlalchemy import String
@@ -31,6 +32,9 @@ class Simulation(Base):
     date_created = Column(DateTime(timezone=True), default=datetime.datetime.now())
     pid = Column(String)
 
+    # Status queries of an experiment only read the index
+    __table_args__ = (Index('ix_simulations_experiment_status', 'experiment_id', 'status_s'),)
+
     # A pair of accessors to support SumulationState-only status comparison external to DB access.
     @property
     def status(self):
@@ -204,4 +208,10 @@ class BatchSimulation(Base):
     def __repr__(self):
         return "batch_simulation"
 
-Base.metadata.create_all(engine)
\ No newline at end of file
+Base.metadata.create_all(engine)
+
+# create_all only creates the indexes of the new tables.
+# IF NOT EXISTS as several processes may import this module at the same time on an existing database.
+for index in Simulation.__table__.indexes:
+    engine.execute('CREATE INDEX IF NOT EXISTS %s ON %s (%s)' %
+                   (index.name, index.table.name, ', '.join(column.name for column in index.columns)))
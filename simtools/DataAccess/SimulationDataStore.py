@@ -1,10 +1,12 @@
+import atexit
 import datetime
+import threading
+from collections import OrderedDict, defaultdict
 
-from simtools.DataAccess import session_scope
+from simtools.DataAccess import session_scope, WAL_MODE
 from simtools.DataAccess.Schema import Simulation
 from sqlalchemy import and_
 from sqlalchemy import bindparam
-from sqlalchemy import not_
 from sqlalchemy import update
 
 from simtools.Utilities.General import init_logging, batch, batch_list
@@ -13,8 +15,75 @@ from sqlalchemy.orm import joinedload
 from COMPS.Data.Simulation import SimulationState
 logger = init_logging('DataAccess')
 
+# Fields of a batch update -> columns
+BATCH_FIELDS = OrderedDict([('status', 'status_s'), ('message', 'message'), ('pid', 'pid')])
+FINAL_STATES = (SimulationState.Succeeded.name, SimulationState.Failed.name, SimulationState.Canceled.name)
+WRITER_TICK = 0.5  # seconds
+writer_lock = threading.Lock()
+
+
+class SimulationWriter:
+    """
+    Single writer of the simulation updates of a process.
+
+    The updates are queued and coalesced by simulation (the last value of each field wins), then written by a
+    background thread in one transaction per tick. The queued updates are written when the process exits.
+    Only the status updates queued with SimulationDataStore.queue_simulations_update go through the writer. The other
+    writes (save_simulation, bulk_insert_simulations from the creators...) still use their own transactions.
+    """
+    def __init__(self, tick=WRITER_TICK):
+        self.tick = tick
+        self.pending = OrderedDict()
+        self.pending_lock = threading.Lock()
+        self.write_lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.thread = None
+        self.transactions = 0
+
+    def put(self, simulation_batch):
+        with self.pending_lock:
+            for simulation in simulation_batch:
+                self.pending.setdefault(simulation['sid'], {}).update(simulation)
+
+            if not self.thread or not self.thread.is_alive():
+                self.stopped.clear()
+                self.thread = threading.Thread(target=self.run, daemon=True)
+                self.thread.start()
+
+    def run(self):
+        while not self.stopped.wait(self.tick):
+            self.flush()
+
+    def flush(self):
+        """
+        Write the queued updates now.
+        """
+        with self.write_lock:
+            with self.pending_lock:
+                simulation_batch, self.pending = list(self.pending.values()), OrderedDict()
+            if not simulation_batch:
+                return
+
+            try:
+                SimulationDataStore.batch_simulations_update(simulation_batch)
+                self.transactions += 1
+            except Exception as e:
+                logger.error("Could not save %d simulation updates: %s" % (len(simulation_batch), e))
+                # Queue them again, behind the updates received meanwhile
+                with self.pending_lock:
+                    for simulation in simulation_batch:
+                        simulation.update(self.pending.get(simulation['sid'], {}))
+                        self.pending[simulation['sid']] = simulation
+
+    def close(self):
+        self.stopped.set()
+        if self.thread:
+            self.thread.join()
+        self.flush()
+
 
 class SimulationDataStore:
+    writer = None
 
     @classmethod
     def batch_simulations_update(cls, simulation_batch):
@@ -26,22 +95,65 @@ class SimulationDataStore:
         
             [
                 {'sid':'simid', "status": 'simstatus'},
-                {'sid':'simid', "status": 'simstatus'}
+                {'sid':'simid', "status": 'simstatus', "message": 'last status line', "pid": None}
             ]
 
+        Only the fields present are updated ("message" and "pid" are optional, "status" can also be omitted).
+        The simulations already Succeeded, Failed or Canceled are left untouched.
+
         Args:
             batch: Batch of simulations to save
         """
         if len(simulation_batch) == 0: return
 
+        # Group the simulations by updated fields to issue one statement per group
+        groups = defaultdict(list)
+        for simulation in simulation_batch:
+            params = {'sid': simulation['sid']}
+            for field in BATCH_FIELDS:
+                if field in simulation:
+                    value = simulation[field]
+                    if isinstance(value, SimulationState):
+                        value = value.name
+                    elif field == 'pid' and value is not None:
+                        value = str(value)
+                    params['b_%s' % field] = value
+            groups[tuple(field for field in BATCH_FIELDS if field in simulation)].append(params)
+
         with session_scope() as session:
-            stmt = update(Simulation).where(and_(Simulation.id == bindparam("sid"),
-                                                 not_(Simulation.status in (
-                                                 SimulationState.Succeeded, SimulationState.Failed,
-                                                 SimulationState.Canceled)))) \
-                .values(status_s=bindparam("status"))
-            for sim_batch in batch_list(simulation_batch, 2500):
-                session.execute(stmt, sim_batch)
+            for fields, params in groups.items():
+                if not fields: continue
+                stmt = update(Simulation).where(and_(Simulation.id == bindparam("sid"),
+                                                     Simulation.status_s.notin_(FINAL_STATES))) \
+                    .values({BATCH_FIELDS[field]: bindparam('b_%s' % field) for field in fields})
+                for sim_batch in batch_list(params, 2500):
+                    session.execute(stmt, sim_batch)
+
+    @classmethod
+    def queue_simulations_update(cls, simulation_batch):
+        """
+        Same as batch_simulations_update but in WAL mode (DTK_TOOLS_DB_WAL=1) the updates go through the writer of the
+        process: they are coalesced with the other updates and saved in one transaction per tick instead of waiting for
+        the DB lock.
+        """
+        if not WAL_MODE:
+            cls.batch_simulations_update(simulation_batch)
+            return
+
+        with writer_lock:
+            if SimulationDataStore.writer is None:
+                SimulationDataStore.writer = SimulationWriter()
+                atexit.register(SimulationDataStore.writer.close)
+        SimulationDataStore.writer.put(simulation_batch)
+
+    @classmethod
+    def flush_simulations_updates(cls):
+        """
+        Write the updates queued by queue_simulations_update. Needed before a process exits without running the atexit
+        handlers (multiprocessing children).
+        """
+        if SimulationDataStore.writer is not None:
+            SimulationDataStore.writer.flush()
 
     @classmethod
     def bulk_insert_simulations(cls, simulations):
@@ -1,18 +1,65 @@
 import os
 from contextlib import contextmanager
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, exc
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
 
 current_dir = os.path.dirname(os.path.realpath(__file__))
 
+# Datastore mode: by default the databases use the SQLite rollback journal. With DTK_TOOLS_DB_WAL=1 they use
+# write-ahead logging, tuned pragmas and a pool of connections: readers do not block the writer anymore.
+# WAL does not work on network filesystems and creates the db.sqlite-wal/-shm files next to the databases.
+WAL_MODE = os.environ.get('DTK_TOOLS_DB_WAL', '0') == '1'
+DB_TIMEOUT = 90  # seconds
+
+SQLITE_PRAGMAS = (
+    'journal_mode=WAL',
+    'synchronous=NORMAL',  # Durable at each checkpoint, safe from corruption in WAL mode
+    'temp_store=MEMORY',
+    'cache_size=-16000',  # 16 MB
+)
+
+
+def create_sqlite_engine(path, wal=WAL_MODE):
+    """
+    Create the engine of a SQLite database.
+    :param path: The database file
+    :param wal: Use write-ahead logging with tuned pragmas and pooled connections
+    :return: The engine
+    """
+    if not wal:
+        return create_engine('sqlite:///%s' % path, echo=False, connect_args={'timeout': DB_TIMEOUT})
+
+    sqlite_engine = create_engine('sqlite:///%s' % path, echo=False, poolclass=QueuePool, pool_size=5, max_overflow=-1,
+                                  connect_args={'timeout': DB_TIMEOUT, 'check_same_thread': False})
+
+    @event.listens_for(sqlite_engine, 'connect')
+    def set_pragmas(dbapi_connection, connection_record):
+        connection_record.info['pid'] = os.getpid()
+        cursor = dbapi_connection.cursor()
+        for pragma in SQLITE_PRAGMAS:
+            cursor.execute('PRAGMA %s' % pragma)
+        cursor.close()
+
+    @event.listens_for(sqlite_engine, 'checkout')
+    def check_process(dbapi_connection, connection_record, connection_proxy):
+        # A forked process does not reuse the pooled connections of its parent
+        if connection_record.info['pid'] != os.getpid():
+            connection_record.connection = connection_proxy.connection = None
+            raise exc.DisconnectionError("Connection of process %s used by process %s" %
+                                         (connection_record.info['pid'], os.getpid()))
+
+    return sqlite_engine
+
+
 # General Metadata DB
-engine = create_engine('sqlite:///%s/db.sqlite' % current_dir, echo=False, connect_args={'timeout': 90})
+engine = create_sqlite_engine('%s/db.sqlite' % current_dir)
 Session = sessionmaker(bind=engine)
 Base = declarative_base()
 
 # Logs DB
-engine_logs = create_engine('sqlite:///%s/logs.sqlite' % current_dir, echo=False, connect_args={'timeout': 90})
+engine_logs = create_sqlite_engine('%s/logs.sqlite' % current_dir)
 Session_logs = sessionmaker(bind=engine_logs)
 Base_logs = declarative_base()
 
@@ -127,6 +127,14 @@ class BaseExperimentManager(CacheEnabled):
         states, msgs = SimulationMonitor(self.experiment.exp_id).query()
         return states, msgs
 
+    def get_simulation_status_counts(self):
+        """
+        Count the simulations of the currently managed experiment by status, without retrieving each simulation.
+        :return: A Counter of SimulationState
+        """
+        self.check_overseer()
+        return SimulationMonitor(self.experiment.exp_id).query_counts()
+
     def run_simulations(self, config_builder=None, exp_name='test', exp_builder=None,
                         suite_id=None, blocking=False, quiet=False, experiment_tags=None):
         """
@@ -288,37 +296,43 @@ class BaseExperimentManager(CacheEnabled):
         # Refresh the experiment
         self.experiment = DataStore.get_experiment(self.experiment.exp_id)
 
-    def print_status(self, states=None, msgs=None, verbose=True):
+    def print_status(self, states=None, msgs=None, verbose=True, counts=None):
         if not states:
-            states, msgs = self.get_simulation_status()
-
-        long_states = copy.deepcopy(states)
-
-        for jobid, state in states.items():
-            long_states[jobid] = long_states[jobid].name
-            if state is SimulationState.Running:
-                steps_complete = [int(s) for s in msgs[jobid].split() if s.isdigit()]
-                # convert the state value to a human-readable value
-                if len(steps_complete) == 2:
-                    # long_states[jobid] += " (" + str(100 * steps_complete[0] / steps_complete[1]) + "% complete)"
-                    long_states[jobid] += " (" + "{0:.2f}".format(
-                        100 * steps_complete[0] / steps_complete[1]) + "% complete)"
+            if counts is None:
+                counts = self.get_simulation_status_counts()
+            # The simulations details are only retrieved if they are displayed
+            if verbose and sum(counts.values()) < 20:
+                states, msgs = self.get_simulation_status()
+        if states:
+            counts = Counter(states.values())
 
         print("%s ('%s') states:" % (self.experiment.exp_name, self.experiment.exp_id))
 
         # We have less than 20 simulations, display the simulations details
-        if len(long_states) < 20 and verbose:
+        if states and len(states) < 20 and verbose:
+            long_states = copy.deepcopy(states)
+
+            for jobid, state in states.items():
+                long_states[jobid] = long_states[jobid].name
+                if state is SimulationState.Running:
+                    steps_complete = [int(s) for s in msgs[jobid].split() if s.isdigit()]
+                    # convert the state value to a human-readable value
+                    if len(steps_complete) == 2:
+                        # long_states[jobid] += " (" + str(100 * steps_complete[0] / steps_complete[1]) + "% complete)"
+                        long_states[jobid] += " (" + "{0:.2f}".format(
+                            100 * steps_complete[0] / steps_complete[1]) + "% complete)"
+
             print(json.dumps(long_states, sort_keys=True, indent=4))
 
         # Display the counter no matter the number of simulations
-        print(dict(Counter([st.name for st in states.values()])))
+        print({state.name: count for state, count in counts.items()})
 
     def wait_for_finished(self, verbose=False, sleep_time=5):
         timeout = 3600 * 24  # 48 hours timeout
         while True:
             # Get the new status
             try:
-                states, msgs = self.get_simulation_status()
+                counts = self.get_simulation_status_counts()
             except Exception as e:
                 print("Exception occurred while retrieving status")
                 print(e)
@@ -328,11 +342,11 @@ class BaseExperimentManager(CacheEnabled):
                 raise Exception("Timeout exhausted for experiment {}".format(self.experiment.exp_id))
 
             # If we are done, exit the loop
-            if self.status_finished(states): break
+            if self.counts_finished(counts): break
 
             # Display if verbose
             if verbose:
-                self.print_status(states, msgs)
+                self.print_status(counts=counts)
                 print("")
 
             # Wait before going through the loop again
@@ -340,7 +354,7 @@ class BaseExperimentManager(CacheEnabled):
             timeout -= sleep_time
 
         # SHow status one last time
-        if verbose: self.print_status(states, msgs)
+        if verbose: self.print_status(counts=counts)
 
         # Refresh the experiment
         self.refresh_experiment()
@@ -377,15 +391,22 @@ class BaseExperimentManager(CacheEnabled):
     def status_succeeded(states):
         return all(v == SimulationState.Succeeded for v in states.values())
 
+    @staticmethod
+    def counts_finished(counts):
+        return all(state in (SimulationState.Succeeded, SimulationState.Failed, SimulationState.Canceled)
+                   for state, count in counts.items() if count)
+
     def succeeded(self):
-        return self.experiment.is_successful()
+        counts = DataStore.get_simulations_status_counts(self.experiment.exp_id)
+        return all(state == SimulationState.Succeeded for state, count in counts.items() if count)
 
     @staticmethod
     def status_failed(states):
         return all(v  == SimulationState.Failed for v in states.values())
 
     def any_failed_or_cancelled(self):
-        return self.experiment.any_failed_or_cancelled()
+        counts = DataStore.get_simulations_status_counts(self.experiment.exp_id)
+        return counts[SimulationState.Failed] + counts[SimulationState.Canceled] > 0
 
     @staticmethod
     def status_finished(states):
@@ -393,7 +414,7 @@ class BaseExperimentManager(CacheEnabled):
             v in (SimulationState.Succeeded, SimulationState.Failed, SimulationState.Canceled) for v in states.values())
 
     def finished(self):
-        return self.experiment.is_done()
+        return self.counts_finished(DataStore.get_simulations_status_counts(self.experiment.exp_id))
 
     def clean_experiment_name(self, experiment_name):
         """
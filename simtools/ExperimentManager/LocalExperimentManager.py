@@ -1,5 +1,3 @@
-from multiprocessing import Process
-
 from simtools.Utilities.General import init_logging
 
 logger = init_logging("LocalExperimentManager")
@@ -11,7 +9,6 @@ import signal
 from datetime import datetime
 from simtools.ExperimentManager.BaseExperimentManager import BaseExperimentManager
 from simtools.SimulationCreator.LocalSimulationCreator import LocalSimulationCreator
-from simtools.SimulationRunner.LocalRunner import LocalSimulationRunner
 from simtools.Utilities.General import is_running
 
 from COMPS.Data.Simulation import SimulationState
@@ -37,11 +34,12 @@ class LocalExperimentManager(BaseExperimentManager):
             if hasattr(experiment, 'simulations'):
                 for sim in experiment.simulations:
                     if sim.status not in [SimulationState.Failed, SimulationState.Succeeded, SimulationState.Canceled]:
-                        if sim.id not in self.unfinished_simulations:
-                            self.unfinished_simulations[sim.id] = sim
+                        self.unfinished_simulations[sim.id] = sim
+                    else:
+                        self.unfinished_simulations.pop(sim.id, None)
 
     def __init__(self, experiment, config_builder):
-        self.local_queue = None
+        self.supervisor = None
         self.simulations_commissioned = 0
         self.unfinished_simulations = {}
         self._experiment = None
@@ -53,23 +51,19 @@ class LocalExperimentManager(BaseExperimentManager):
         """
          Commissions all simulations that need to (and can be) commissioned.
 
-        :param states: a multiprocessing.Queue for simulations to use to update their status.
-        
+        The simulations are started by the supervisor shared by all the local experiments of the Overseer.
+
         :return: The number of simulations commissioned.
         """
         to_commission = self.needs_commissioning()
         commissioned = []
         for simulation in to_commission:
-            if self.local_queue.full():
-                break
-            else:
-                logger.debug("Commissioning simulation: %s, its status was: %s" % (simulation.id, simulation.status.name))
-                t1 = Process(target=LocalSimulationRunner,
-                             args=(simulation, self.experiment, self.local_queue))
-                t1.daemon = True
-                t1.start()
-                self.local_queue.put('run 1')
-                commissioned.append(simulation)
+            if simulation.status == SimulationState.Created and self.supervisor.full():
+                continue
+            logger.debug("Commissioning simulation: %s, its status was: %s" % (simulation.id, simulation.status.name))
+            self.supervisor.submit(simulation, self.experiment)
+            commissioned.append(simulation)
+        self.supervisor.flush()
         return len(commissioned)
 
     def needs_commissioning(self):
@@ -81,7 +75,10 @@ class LocalExperimentManager(BaseExperimentManager):
         # get the latest status information for all potentially unfinished simulations first
         if not len(self.unfinished_simulations) == 0:
             logger.debug("There are %d unfinished_simulation_ids to check." % len(self.unfinished_simulations))
-            for sim in self.unfinished_simulations.values():
+            for sim in list(self.unfinished_simulations.values()):
+                if sim.id in self.supervisor:
+                    # Already followed by the supervisor
+                    continue
                 if sim.status == SimulationState.Created or\
                         (sim.status == SimulationState.Running and not is_running(sim.pid, name_part=self.experiment.exe_name)):
                     logger.debug("Detected sim potentially in need of commissioning. sim id: %s sim status: %s sim pid: %s is_running? %s" %
@@ -20,18 +20,23 @@ class SimulationMonitor:
     def query(self):
         logger.debug("Query the DB Monitor for Experiment %s" % self.exp_id)
         states, msgs = {}, {}
-        experiment = DataStore.get_experiment(self.exp_id)
-
-        if not experiment or not experiment.simulations:
-            return states,msgs
-
-        for sim in experiment.simulations:
-            states[sim.id] = sim.status if sim.status else SimulationState.CommissionRequested
-            msgs[sim.id] = sim.message if sim.message else ""
+        for sim_id, status, message in DataStore.get_simulations_status(self.exp_id):
+            states[sim_id] = status if status else SimulationState.CommissionRequested
+            msgs[sim_id] = message if message else ""
         logger.debug("States returned")
         logger.debug(Counter(states.values()))
         return states, msgs
 
+    def query_counts(self):
+        """
+        Number of simulations by SimulationState, counted by the DB.
+        """
+        logger.debug("Query the DB Monitor counts for Experiment %s" % self.exp_id)
+        counts = DataStore.get_simulations_status_counts(self.exp_id)
+        if None in counts:
+            counts[SimulationState.CommissionRequested] += counts.pop(None)
+        return counts
+
 
 class CompsSimulationMonitor(SimulationMonitor):
     """
@@ -69,3 +74,6 @@ class CompsSimulationMonitor(SimulationMonitor):
         logger.debug(json.dumps(Counter([st.name for st in states.values()]), indent=3))
 
         return states, msgs
+
+    def query_counts(self):
+        return Counter(self.query()[0].values())
@@ -1,4 +1,3 @@
-import multiprocessing
 import os
 import sys
 # Add the tools to the path
@@ -7,7 +6,6 @@ from multiprocessing import Manager
 dir_path = os.path.dirname(os.path.realpath(__file__))
 sys.path.append(os.path.abspath(os.path.join(dir_path,'..')))
 import threading
-import time
 import traceback
 from collections import OrderedDict
 from datetime import datetime
@@ -15,6 +13,7 @@ from datetime import datetime
 from simtools.DataAccess.DataStore import DataStore
 from simtools.ExperimentManager.ExperimentManagerFactory import ExperimentManagerFactory
 from simtools.SetupParser import SetupParser
+from simtools.SimulationRunner.LocalRunner import LocalSimulationSupervisor
 from simtools.Utilities.General import init_logging
 
 logger = init_logging('Overseer')
@@ -39,8 +38,9 @@ if __name__ == "__main__":
     SetupParser.init() # default block
     max_local_sims = int(SetupParser.get('max_local_sims'))
 
-    # Create the queue
-    local_queue = multiprocessing.Queue(max_local_sims)
+    # Create the supervisor running the local simulations
+    supervisor = LocalSimulationSupervisor(max_local_sims)
+    supervisor.install_signal_handler()
 
     managers = OrderedDict()
 
@@ -84,7 +84,7 @@ if __name__ == "__main__":
                     continue
 
                 if manager:
-                    if manager.location == "LOCAL": manager.local_queue = local_queue
+                    if manager.location == "LOCAL": manager.supervisor = supervisor
                     managers[experiment.id] = manager
 
             else:
@@ -118,7 +118,8 @@ if __name__ == "__main__":
         # Do not use len() to not block anything
         if not managers: break
 
-        time.sleep(10)
+        # Wait for the next pass, which comes early if local simulations are done and new ones can be commissioned
+        supervisor.run(10)
         count += 1
 
 logger.debug('No more work to do, Overseer pid: %d exiting...' % os.getpid())
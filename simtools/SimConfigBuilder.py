@@ -14,6 +14,16 @@ class SimConfigBuilder(metaclass=ABCMeta):
     A class for building, modifying, and writing
     required configuration files for a simulation
     """
+    # Attributes only read when writing the files: the simulations created from a BuilderTemplate
+    # with parameter-only mods share them with the base builder instead of copying them.
+    shared_attributes = ()
+
+    # Serialized content of the shared attributes, filled by file_writer and reused between the simulations
+    # sharing them. None when the builder owns all its attributes.
+    serialized_sections = None
+
+    # Files different for each simulation, written directly instead of going through the ContentStore
+    unique_files = ('config.json',)
 
     def __init__(self, config=None, **kwargs):
         self.config = config or {}
@@ -63,12 +73,21 @@ class SimConfigBuilder(metaclass=ABCMeta):
     def get_commandline(self):
         return CommandlineGenerator('executable', [], {})
 
-    def dump_files(self, working_directory):
+    def dump_files(self, working_directory, content_store=None):
+        """
+        Write the simulation files in the working directory.
+        :param working_directory: The simulation directory
+        :param content_store: Optional ContentStore. If given, the files shared between simulations are written once
+        in the store and linked in the working directory.
+        """
         if not os.path.exists(working_directory):
             os.makedirs(working_directory)
 
         def write_file(name, content):
             filename = os.path.join(working_directory, '%s' % name)
+            if content_store and name not in self.unique_files:
+                content_store.write(filename, content)
+                return
             with open(filename, 'w') as f:
                 f.write(content)
 
@@ -87,6 +106,20 @@ class SimConfigBuilder(metaclass=ABCMeta):
     def file_writer(self, write_fn):
         pass
 
+    def serialize_section(self, key, serialize):
+        """
+        Serialize a shared section only once for all the simulations sharing it.
+        :param key: Identifies the section in serialized_sections
+        :param serialize: Function returning the serialized content
+        :return: The serialized content
+        """
+        if self.serialized_sections is None:
+            return serialize()
+
+        if key not in self.serialized_sections:
+            self.serialized_sections[key] = serialize()
+        return self.serialized_sections[key]
+
     @property
     def experiment_files(self):
         return self.assets.experiment_files
@@ -1,9 +1,9 @@
-import pickle
 from abc import abstractmethod, ABCMeta
 from multiprocessing import Process
 
 from simtools.DataAccess.DataStore import DataStore
 from simtools.SetupParser import SetupParser
+from simtools.SimulationCreator.BuilderTemplate import BuilderTemplate
 
 
 class BaseSimulationCreator(Process):
@@ -35,12 +35,15 @@ class BaseSimulationCreator(Process):
     def process(self):
         self.pre_creation()
 
+        # Freeze the base builder once, the builder of each simulation is created from it
+        template = BuilderTemplate(self.config_builder)
+
         for batch in iter(self.work_queue.get, None):
             if not batch:
                 break
 
             for mod_fn_list in batch:
-                cb = pickle.loads(pickle.dumps(self.config_builder, protocol=pickle.HIGHEST_PROTOCOL))
+                cb = template.new_builder(mod_fn_list)
 
                 # modify next simulation according to experiment builder
                 # also retrieve the returned metadata
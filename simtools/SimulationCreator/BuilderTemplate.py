@@ -0,0 +1,53 @@
+import copy
+import pickle
+
+from simtools.SimConfigBuilder import SimConfigBuilder
+
+# Mods only changing the config parameters
+PARAMETER_MODS = (SimConfigBuilder.set_param, SimConfigBuilder.update_params)
+
+
+class BuilderTemplate:
+    """
+    Frozen copy of the base config builder from which the builder of each simulation is created.
+
+    The base builder is pickled once instead of once per simulation.
+    When all the mods of a simulation only set parameters (the typical sweep), the new builder is a copy of the base
+    without its `shared_attributes` (campaign, reports, overlays...) which are shared with the base instead.
+    Those sections are identical for all these simulations so they are serialized only once and the same content is
+    written for each simulation.
+    Simulations with other mods get a full copy of the base builder.
+    """
+
+    def __init__(self, config_builder):
+        self.config_builder = config_builder
+        self.frozen = pickle.dumps(config_builder, protocol=pickle.HIGHEST_PROTOCOL)
+
+        # Copy of the base builder without the shared attributes
+        self.shared = {name: getattr(config_builder, name) for name in config_builder.shared_attributes}
+        light = copy.copy(config_builder)
+        for name in self.shared:
+            setattr(light, name, None)
+        self.frozen_light = pickle.dumps(light, protocol=pickle.HIGHEST_PROTOCOL)
+
+        self.serialized_sections = {}
+
+    @staticmethod
+    def only_sets_parameters(mod_fn_list) -> bool:
+        # Compare the wrapped functions: a user function or an override named set_param may change anything
+        return all(getattr(func, 'func', None) in PARAMETER_MODS for func in mod_fn_list)
+
+    def new_builder(self, mod_fn_list):
+        """
+        Create the builder for a new simulation.
+        :param mod_fn_list: The mods that will be applied to the builder
+        :return: A builder that can be modified by the mods without changing the base builder
+        """
+        if not self.shared or not self.only_sets_parameters(mod_fn_list):
+            return pickle.loads(self.frozen)
+
+        cb = pickle.loads(self.frozen_light)
+        for name, value in self.shared.items():
+            setattr(cb, name, value)
+        cb.serialized_sections = self.serialized_sections
+        return cb
@@ -3,6 +3,7 @@ import random
 import string
 
 from simtools.SimulationCreator.BaseSimulationCreator import BaseSimulationCreator
+from simtools.Utilities.ContentStore import ContentStore
 
 
 class LocalSim:
@@ -36,10 +37,11 @@ class LocalSimulationCreator(BaseSimulationCreator):
         pass
 
     def pre_creation(self):
-        pass
+        # Identical files are written once for the experiment and linked in the simulation directories
+        self.content_store = ContentStore.for_experiment(self.experiment)
 
     def add_files_to_simulation(self, s, cb):
-       cb.dump_files(s.sim_dir)
+        cb.dump_files(s.sim_dir, content_store=self.content_store)
 
     def set_tags_to_simulation(self,s, tags, cb):
         s.tags = tags
\ No newline at end of file
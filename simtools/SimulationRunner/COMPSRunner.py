@@ -54,13 +54,14 @@ class COMPSSimulationRunner(BaseSimulationRunner):
 
             # Only update the simulations that changed since last check
             # We are also including simulations that were not present (in case we add some later)
-            DataStore.batch_simulations_update(list({"sid": key, "status":states[key].name} for key in states if (key in last_states and last_states[key] != states[key]) or key not in last_states))
+            DataStore.queue_simulations_update(list({"sid": key, "status":states[key].name} for key in states if (key in last_states and last_states[key] != states[key]) or key not in last_states))
 
             # Store the last state
             last_states = states
 
             if CompsExperimentManager.status_finished(states):
                 logger.debug('Stop monitoring for experiment %s because all simulations finished' % self.experiment.id)
+                DataStore.flush_simulations_updates()
                 break
 
             time.sleep(self.MONITOR_SLEEP)
@@ -1,113 +1,202 @@
 import os
+import select
 import shlex
+import signal
 import subprocess
 import time
 
 from simtools.DataAccess.DataStore import DataStore
 from simtools.SimulationRunner.BaseSimulationRunner import BaseSimulationRunner
-from simtools.Utilities.General import init_logging, is_running
+from simtools.Utilities.General import init_logging
 logger = init_logging("LocalRunner")
 from COMPS.Data.Simulation import SimulationState
 
+POLL_SLEEP = 1  # seconds, when the platform cannot notify the end of a child (no SIGCHLD)
 
-class LocalSimulationRunner(BaseSimulationRunner):
+
+class StatusTail:
     """
-    Run one simulation.
+    Follow the status.txt file of a simulation, only reading what was appended since the previous read.
     """
-    def __init__(self, simulation, experiment, thread_queue):
-        super(LocalSimulationRunner, self).__init__(experiment)
-        self.queue = thread_queue # used to limit the number of concurrently running simulations
+    def __init__(self, status_path):
+        self.status_path = status_path
+        self.offset = 0
+        self.partial = b''  # Last line, not terminated yet
+        self.last_line = b''
+
+    def read(self):
+        """
+        Returns the last line of the status file.
+        "" if the file doesnt exist or is empty
+        :return:
+        """
+        try:
+            with open(self.status_path, 'rb') as status_file:
+                if os.fstat(status_file.fileno()).st_size < self.offset:
+                    # The file was truncated, start over
+                    self.offset, self.partial, self.last_line = 0, b'', b''
+                status_file.seek(self.offset)
+                data = status_file.read()
+        except FileNotFoundError:
+            data = b''
+
+        if data:
+            self.offset += len(data)
+            lines = (self.partial + data).split(b'\n')
+            self.partial = lines.pop()
+            if lines:
+                self.last_line = lines[-1]
+
+        line = self.partial or self.last_line
+        return line.decode('utf-8', errors='replace').rstrip('\r')
+
+
+class SupervisedSimulation:
+    def __init__(self, simulation, experiment, process):
         self.simulation = simulation
-        self.sim_dir = self.simulation.get_path()
+        self.experiment = experiment
+        self.process = process
+        self.sim_dir = simulation.get_path()
+        self.status = StatusTail(os.path.join(self.sim_dir, 'status.txt'))
+        self.message = ""
 
-        if self.check_state() == SimulationState.Created:
-            self.run()
-        else:
-            self.queue.get()
-            if self.simulation.status not in (SimulationState.Failed, SimulationState.Succeeded, SimulationState.Canceled):
-                self.monitor()
 
-    def run(self):
+class LocalSimulationSupervisor(BaseSimulationRunner):
+    """
+    Run the local simulations of all the experiments from the Overseer process.
+
+    The simulations are children of the supervisor: the ones done are reaped with a non-blocking waitpid as soon as
+    SIGCHLD wakes the supervisor up, the status.txt files are followed incrementally and all the changes are written
+    to the DB in one batch.
+    """
+    def __init__(self, max_local_sims):
+        super(LocalSimulationSupervisor, self).__init__(None)
+        self.max_local_sims = max_local_sims
+        self.running = {}  # simulation id -> SupervisedSimulation
+        self.updates = {}  # simulation id -> fields to update in the DB
+        self.wakeup_fds = None
+
+    def __contains__(self, sim_id):
+        return sim_id in self.running
+
+    def full(self):
+        return len(self.running) >= self.max_local_sims
+
+    def install_signal_handler(self):
+        """
+        Wake the supervisor up when a child terminates. Needs to be called from the main thread.
+        """
+        if not hasattr(signal, 'SIGCHLD'):
+            return
+
+        self.wakeup_fds = os.pipe()
+        for fd in self.wakeup_fds:
+            os.set_blocking(fd, False)
+
+        def notify(signum, frame):
+            try:
+                os.write(self.wakeup_fds[1], b'\0')
+            except BlockingIOError:
+                pass  # A wake up is already pending
+
+        signal.signal(signal.SIGCHLD, notify)
+
+    def submit(self, simulation, experiment):
+        """
+        Start a simulation. A simulation not in the Created state is not running anymore and only gets its final status.
+        """
+        if simulation.status != SimulationState.Created:
+            self.finish(SupervisedSimulation(simulation, experiment, None))
+            return
+
+        sim_dir = simulation.get_path()
         try:
-            with open(os.path.join(self.sim_dir, "StdOut.txt"), "w") as out, open(os.path.join(self.sim_dir, "StdErr.txt"), "w") as err:
+            with open(os.path.join(sim_dir, "StdOut.txt"), "w") as out, open(os.path.join(sim_dir, "StdErr.txt"), "w") as err:
                 # On windows we want to pass the command to popen as a string
                 # On Unix, we want to pass it as a sequence
                 # See: https://docs.python.org/2/library/subprocess.html#subprocess.Popen
                 if os.name == "nt":
-                    command = self.experiment.command_line
+                    command = experiment.command_line
                 else:
-                    command = shlex.split(self.experiment.command_line)
+                    command = shlex.split(experiment.command_line)
 
                 # Launch the command
-                p = subprocess.Popen(command, cwd=self.sim_dir, shell=False, stdout=out, stderr=err)
-
-                # We are now running
-                self.simulation.pid = p.pid
-                self.simulation.status = SimulationState.Running
-                self.update_status()
-
-            self.monitor()
+                process = subprocess.Popen(command, cwd=sim_dir, shell=False, stdout=out, stderr=err)
         except Exception as e:
             print("Error encountered while running the simulation.")
             print(e)
-        finally:
-            # Allow another different thread to run now that this one is done.
-            self.queue.get()
+            self.update(simulation.id, status=SimulationState.Failed, message=str(e), pid=None)
+            return
+
+        # We are now running
+        self.running[simulation.id] = SupervisedSimulation(simulation, experiment, process)
+        self.update(simulation.id, status=SimulationState.Running, message="", pid=process.pid)
 
     def monitor(self):
         """
-        Monitors the simulation process and update its status.
+        Reap the simulations done and follow the status of the running ones.
+        :return: The number of simulations done
         """
-        sim_pid = self.simulation.pid
-
-        while is_running(sim_pid, name_part=self.experiment.exe_name) and self.simulation.status != "Cancelled":
-            logger.debug("monitor: waiting on pid: %s" % sim_pid)
-            self.simulation.message = self.last_status_line()
-            self.update_status()
-            time.sleep(self.MONITOR_SLEEP)
-
-        logger.debug("monitor: done waiting on pid: %s" % sim_pid)
-
-        # When poll returns None, the process is done, test if succeeded or failed
-        last_message = self.last_status_line()
-        last_state = self.check_state()
-
-        if "Done" in last_message or os.path.exists(os.path.join(self.sim_dir, 'trajectories.csv')):
-            self.simulation.status = SimulationState.Succeeded
-        else:
-            # If we exited with a Canceled status, don't update to Failed
-            if last_state != SimulationState.Canceled:
-                self.simulation.status = SimulationState.Failed
-
-        # Set the final simulation state
-        logger.debug("monitor: Updating sim: %s with pid: %s to status: %s" % (self.simulation.id, sim_pid, self.simulation.status.name))
-        self.simulation.message = last_message
-        self.simulation.pid = None
-        self.update_status()
-
-    def update_status(self):
-        # For local sim, we save the object so we have the info we need
-        DataStore.save_simulation(self.simulation)
-
-    def last_status_line(self):
+        done = [sim for sim in self.running.values() if sim.process.poll() is not None]
+        for sim in done:
+            del self.running[sim.simulation.id]
+            logger.debug("monitor: pid %s exited with code %s" % (sim.process.pid, sim.process.returncode))
+            self.finish(sim)
+
+        for sim in self.running.values():
+            message = sim.status.read()
+            if message != sim.message:
+                sim.message = message
+                self.update(sim.simulation.id, message=message)
+
+        self.flush()
+        return len(done)
+
+    def run(self, timeout):
         """
-        Returns the last line of the status.txt file for the simulation.
-        None if the file doesnt exist or is empty
-        :return:
+        Supervise the simulations for up to timeout seconds, returning as soon as some of them are done.
+        :return: The number of simulations done
         """
-        status_path = os.path.join(self.sim_dir, 'status.txt')
-        msg = None
-        if os.path.exists(status_path) and os.stat(status_path).st_size != 0:
-            with open(status_path, 'r') as status_file:
-                msg = list(status_file)[-1]
-
-        return msg.strip('\n') if msg else ""
+        end = time.time() + timeout
+        while True:
+            done = self.monitor()
+            remaining = end - time.time()
+            if done or remaining <= 0:
+                return done
+
+            if self.wakeup_fds:
+                sleep = remaining if not self.running else min(remaining, self.MONITOR_SLEEP)
+                if select.select([self.wakeup_fds[0]], [], [], sleep)[0]:
+                    self._drain()
+            else:
+                time.sleep(min(remaining, POLL_SLEEP))
+
+    def _drain(self):
+        try:
+            while os.read(self.wakeup_fds[0], 4096):
+                pass
+        except BlockingIOError:
+            pass
 
-    def check_state(self):
+    def finish(self, sim):
         """
-        Update the simulation and check its state
-        Returns: state of the simulation or None
+        Set the final status of a simulation: Succeeded if its last status is "Done" or if it produced trajectories.
+        A canceled simulation stays canceled as the DB does not update the simulations in a final state.
         """
-        self.simulation = DataStore.get_simulation(self.simulation.id)
-        return self.simulation.status
+        last_message = sim.status.read()
+        if "Done" in last_message or os.path.exists(os.path.join(sim.sim_dir, 'trajectories.csv')):
+            status = SimulationState.Succeeded
+        else:
+            status = SimulationState.Failed
+
+        logger.debug("monitor: Updating sim: %s to status: %s" % (sim.simulation.id, status.name))
+        self.update(sim.simulation.id, status=status, message=last_message, pid=None)
+
+    def update(self, sim_id, **fields):
+        self.updates.setdefault(sim_id, {'sid': sim_id}).update(fields)
 
+    def flush(self):
+        # For local sims, all the changes since the last flush are saved at once
+        if self.updates:
+            DataStore.batch_simulations_update(list(self.updates.values()))
+            self.updates = {}
@@ -0,0 +1,88 @@
+import hashlib
+import os
+import shutil
+import uuid
+
+STORE_DIRECTORY = "_content"  # Name of the store directory in the experiment directory
+
+
+class ContentStore:
+    """
+    Content-addressed store of the files shared by the simulations of a local experiment.
+
+    Each distinct content is written once in the store, named by its hash, and the simulation directories receive a
+    hard link to it (or a symbolic link / copy if the file system does not support hard links).
+    The store can be shared by several processes: a content is written to a temporary file and renamed atomically.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(self.directory, exist_ok=True)
+
+        # Experiment files already in the store: (path, size, mtime) -> store path
+        self.stored_files = {}
+
+    @classmethod
+    def for_experiment(cls, experiment):
+        return cls(os.path.join(experiment.get_path(), STORE_DIRECTORY))
+
+    def _store(self, digest, write):
+        path = os.path.join(self.directory, digest)
+        if not os.path.exists(path):
+            temp_path = "{}.{}.tmp".format(path, uuid.uuid4().hex)
+            write(temp_path)
+            os.replace(temp_path, path)
+        return path
+
+    def store_content(self, content) -> str:
+        """
+        Store a text content.
+        :param content: The file content
+        :return: The path of the content in the store
+        """
+        digest = hashlib.sha1(content.encode('utf-8')).hexdigest()
+
+        def write(path):
+            with open(path, 'w') as f:
+                f.write(content)
+
+        return self._store(digest, write)
+
+    def store_file(self, source) -> str:
+        """
+        Store an existing file. Each file is only hashed once as long as it is not modified.
+        :param source: The path of the file
+        :return: The path of the content in the store
+        """
+        stat = os.stat(source)
+        key = (os.path.abspath(source), stat.st_size, stat.st_mtime)
+        if key not in self.stored_files:
+            sha1 = hashlib.sha1()
+            with open(source, 'rb') as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                    sha1.update(chunk)
+            self.stored_files[key] = self._store(sha1.hexdigest(), lambda path: shutil.copyfile(source, path))
+        return self.stored_files[key]
+
+    @staticmethod
+    def link(stored_path, destination) -> None:
+        """
+        Make a stored content available at the destination path.
+        The link is created under a temporary name then renamed: an existing destination, possibly linked to another
+        stored content, is replaced instead of being written through.
+        """
+        temp_path = "{}.{}.tmp".format(destination, uuid.uuid4().hex)
+        try:
+            os.link(stored_path, temp_path)
+        except OSError:
+            try:
+                os.symlink(stored_path, temp_path)
+            except OSError:
+                shutil.copyfile(stored_path, temp_path)
+        os.replace(temp_path, destination)
+
+    def write(self, destination, content) -> None:
+        self.link(self.store_content(content), destination)
+
+    def copy(self, source, directory) -> None:
+        self.link(self.store_file(source), os.path.join(directory, os.path.basename(source)))
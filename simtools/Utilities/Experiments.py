@@ -1,3 +1,8 @@
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from COMPS.Data.Simulation import SimulationState
+
 from simtools.DataAccess.DataStore import DataStore
 from simtools.DataAccess.Schema import Experiment, Simulation
 from simtools.SetupParser import SetupParser
@@ -6,6 +11,8 @@ from simtools.Utilities.Encoding import cast_number
 from simtools.Utilities.General import init_logging, utc_to_local
 
 max_exp_name_len = 255
+SYNC_WORKERS = 8  # Experiments retrieved concurrently from COMPS by a sync
+SYNC_MARK_FORMAT = '%Y-%m-%d %H:%M:%S'
 
 logger = init_logging('Utils')
 
@@ -213,4 +220,136 @@ def COMPS_experiment_to_local_db(exp_id, endpoint, verbose=False, save_new_exper
     # Save it to the DB
     if save_new_experiment: DataStore.save_experiment(experiment, verbose=verbose)
 
-    return experiment
\ No newline at end of file
+    return experiment
+
+
+def COMPS_experiment_changes(exp_id, endpoint, local_status=None, mark=None, verbose=False):
+    """
+    Retrieve what changed in COMPS for an experiment since the last sync. Only COMPS is accessed, the changes are saved
+    later (see DataStore.save_sync_changes), so several experiments can be retrieved concurrently.
+    Only the id/state/date of the simulations is retrieved, the tags are retrieved for the new simulations only: the ones
+    created from the sync mark of the experiment.
+    :param exp_id: The experiment id
+    :param endpoint: The COMPS endpoint
+    :param local_status: {simulation id: SimulationState} of the simulations in the local DB, None if the experiment is
+     not in the local DB
+    :param mark: Creation date of the last simulation retrieved by the previous sync (SYNC_MARK_FORMAT, UTC)
+    :param verbose:
+    :return: None if nothing changed, else a dict with:
+        - exp_id: The experiment id
+        - experiment: The new experiment, None if it was already in the local DB
+        - simulations: The new simulations
+        - status: {simulation id: SimulationState} for the simulations whose state changed
+        - mark: The new sync mark
+    """
+    exp_id = str(exp_id)
+
+    # Do not bother with finished experiments
+    if local_status is not None and all(status in (SimulationState.Succeeded, SimulationState.Failed,
+                                                   SimulationState.Canceled) for status in local_status.values()):
+        if verbose:
+            print("Experiment ('%s') already exists in local db." % exp_id)
+        return None
+
+    from COMPS.Data import QueryCriteria
+    try:
+        query_criteria = QueryCriteria().select_children('tags') if local_status is None else None
+        exp_comps = get_experiment_by_id(exp_id, query_criteria) or get_experiments_by_name(exp_id)[-1]
+    except:
+        if verbose:
+            print("The experiment ('%s') doesn't exist in COMPS." % exp_id)
+        return None
+
+    experiment = None
+    if local_status is None:
+        local_status = {}
+        experiment = DataStore.create_experiment(exp_id=str(exp_comps.id),
+                                                 suite_id=str(exp_comps.suite_id) if exp_comps.suite_id else None,
+                                                 exp_name=exp_comps.name,
+                                                 tags=exp_comps.tags,
+                                                 date_created=utc_to_local(exp_comps.date_created).replace(tzinfo=None),
+                                                 location='HPC',
+                                                 selected_block='HPC',
+                                                 endpoint=endpoint)
+
+    # Get the state of the simulations, without their tags
+    sims = exp_comps.get_simulations(QueryCriteria().select(['id', 'state', 'date_created']))
+    if len(sims) == 0:
+        if verbose:
+            print("Skip empty experiment ('%s')." % exp_id)
+        return None
+
+    status = {str(sim.id): sim.state for sim in sims
+              if str(sim.id) in local_status and sim.state != local_status[str(sim.id)]}
+    new_ids = {str(sim.id) for sim in sims} - set(local_status)
+
+    # Get the new simulations with their tags
+    new_sims = []
+    if new_ids:
+        query_criteria = QueryCriteria().select(['id', 'state', 'date_created']).select_children('tags')
+        if mark:
+            new_sims = [sim for sim in exp_comps.get_simulations(query_criteria.where(['date_created>=%s' % mark]))
+                        if str(sim.id) in new_ids]
+        if len(new_sims) < len(new_ids):
+            # No mark or simulations created before the mark
+            query_criteria = QueryCriteria().select(['id', 'state', 'date_created']).select_children('tags')
+            new_sims = [sim for sim in exp_comps.get_simulations(query_criteria) if str(sim.id) in new_ids]
+
+    if not new_sims and not status:
+        if verbose:
+            print("Skip experiment ('%s') since it did not change since the last sync." % exp_id)
+        return None
+
+    simulations = [DataStore.create_simulation(id=str(sim.id),
+                                               experiment_id=str(exp_comps.id),
+                                               status=sim.state,  # this is already a SimulationState object
+                                               tags={tag: cast_number(val) for tag, val in sim.tags.items()},
+                                               date_created=utc_to_local(sim.date_created).replace(tzinfo=None))
+                   for sim in new_sims]
+
+    return {'exp_id': str(exp_comps.id),
+            'experiment': experiment,
+            'simulations': simulations,
+            'status': status,
+            'mark': max(sim.date_created for sim in sims).strftime(SYNC_MARK_FORMAT)}
+
+
+def COMPS_sync_experiments(exp_ids, endpoint, verbose=False, workers=SYNC_WORKERS):
+    """
+    Bring the given COMPS experiments up to date in the local DB.
+    The experiments are retrieved concurrently from COMPS and all the changes are saved in one transaction.
+    :param exp_ids: The ids of the experiments
+    :param endpoint: The COMPS endpoint
+    :param verbose:
+    :param workers: Number of experiments retrieved at the same time
+    :return: The list of changes saved (see COMPS_experiment_changes)
+    """
+    COMPS_login(endpoint)
+    exp_ids = list(OrderedDict.fromkeys(str(exp_id) for exp_id in exp_ids))
+    sync_state = DataStore.get_experiments_sync_state(exp_ids)
+
+    changes = []
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(COMPS_experiment_changes, exp_id, endpoint, *sync_state.get(exp_id, (None, None)),
+                                   verbose=verbose)
+                   for exp_id in exp_ids]
+        for exp_id, future in zip(exp_ids, futures):
+            try:
+                change = future.result()
+            except Exception as e:
+                logger.error("Could not sync experiment %s: %s" % (exp_id, e))
+                continue
+            if change:
+                changes.append(change)
+
+    # An experiment retrieved by name may already be in the local DB under its id
+    renamed = {change['exp_id'] for change in changes if change['experiment'] and change['exp_id'] not in sync_state}
+    if renamed:
+        renamed_state = DataStore.get_experiments_sync_state(list(renamed))
+        changes = [COMPS_experiment_changes(change['exp_id'], endpoint, *renamed_state[change['exp_id']], verbose=verbose)
+                   if change['exp_id'] in renamed_state else change for change in changes]
+        changes = list(OrderedDict((change['exp_id'], change) for change in changes if change).values())
+
+    if changes:
+        DataStore.save_sync_changes(changes)
+    return changes
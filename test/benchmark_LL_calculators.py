@@ -0,0 +1,58 @@
+"""
+Micro-benchmark of the per-bin likelihood functions against their batch versions.
+Scores a batch of samples against one reference with bin counts typical of the calibration sites.
+
+Usage: python benchmark_LL_calculators.py [n_samples]
+"""
+import sys
+import timeit
+
+import numpy as np
+
+from calibtool import LL_calculators as LL
+
+N_SAMPLES = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+REPEAT = 5
+
+rng = np.random.RandomState(0)
+
+
+def counts(*shape):
+    return rng.randint(0, 100, size=shape).astype(float)
+
+
+# Age bins x density bins for the dirichlet multinomial, age bins for the others
+age_bins, cat_bins, bins = 8, 10, 50
+raw_2d, sim_2d = counts(age_bins, cat_bins), counts(N_SAMPLES, age_bins, cat_bins) + 1
+raw_nobs, sim_nobs = counts(bins) + 100, counts(bins) + 100
+raw_1d, sim_1d = counts(bins) + 1, counts(N_SAMPLES, bins)
+
+cases = [
+    ("dirichlet_multinomial",
+     lambda: [LL.dirichlet_multinomial(raw_2d, s) for s in sim_2d],
+     lambda: LL.dirichlet_multinomial_batch(raw_2d, sim_2d)),
+    ("dirichlet_single",
+     lambda: [LL.dirichlet_single(raw_1d, s) for s in sim_1d],
+     lambda: LL.dirichlet_single_batch(raw_1d, sim_1d)),
+    ("beta_binomial",
+     lambda: [LL.beta_binomial(raw_nobs, sim_nobs, raw_1d, s) for s in sim_1d],
+     lambda: LL.beta_binomial_batch(raw_nobs, sim_nobs, raw_1d, sim_1d)),
+    ("gamma_poisson",
+     lambda: [LL.gamma_poisson(raw_nobs, sim_nobs, raw_1d, s) for s in sim_1d],
+     lambda: LL.gamma_poisson_batch(raw_nobs, sim_nobs, raw_1d, sim_1d)),
+    ("euclidean_distance",
+     lambda: [LL.euclidean_distance(raw_1d, s) for s in sim_1d],
+     lambda: LL.euclidean_distance_batch(raw_1d, sim_1d)),
+    ("weighted_squares",
+     lambda: [LL.weighted_squares(raw_1d, s) for s in sim_1d],
+     lambda: LL.weighted_squares_batch(raw_1d, sim_1d)),
+]
+
+if __name__ == "__main__":
+    print("{} samples - best of {} runs".format(N_SAMPLES, REPEAT))
+    print("{:<25}{:>12}{:>12}{:>10}".format("Function", "Loop (ms)", "Batch (ms)", "Speedup"))
+    for name, loop, batch in cases:
+        np.testing.assert_allclose(batch(), loop(), rtol=1e-10)
+        loop_time = min(timeit.repeat(loop, number=1, repeat=REPEAT)) * 1000
+        batch_time = min(timeit.repeat(batch, number=1, repeat=REPEAT)) * 1000
+        print("{:<25}{:>12.2f}{:>12.3f}{:>9.0f}x".format(name, loop_time, batch_time, loop_time / batch_time))
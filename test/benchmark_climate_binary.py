@@ -0,0 +1,68 @@
+"""
+Benchmark of reading the series of all the nodes of a daily climate binary (10k nodes by default).
+
+- Per node: extract_data_from_climate_bin_for_node as previously implemented (metadata parsed and values unpacked
+  one by one for each node), measured on 200 nodes and extrapolated.
+- ClimateBinary: node_series for each node, then the whole node x time block at once.
+
+Usage: python benchmark_climate_binary.py [nodes]
+"""
+import json
+import os
+import struct
+import sys
+import tempfile
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from dtk.tools.climate.BinaryFilesHelpers import ClimateBinary
+
+NODES = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+TSTEPS = 365
+MEASURED_NODES = 200
+
+
+def extract_per_node(node_id, binary_file):
+    meta = json.load(open(binary_file + '.json', 'rb'))
+    offsets = meta['NodeOffsets']
+    offsets_nodes = OrderedDict()
+    for i in range(0, len(offsets), 16):
+        offsets_nodes[int(offsets[i:i + 8], 16)] = int(offsets[i + 8:i + 16], 16)
+
+    series = []
+    with open(binary_file, 'rb') as bin_file:
+        bin_file.seek(offsets_nodes[node_id])
+        for _ in range(meta['Metadata']['DatavalueCount']):
+            series.append(struct.unpack('f', bin_file.read(4))[0])
+    return series
+
+
+def timed(fn, *args):
+    start = time.time()
+    fn(*args)
+    return time.time() - start
+
+
+if __name__ == "__main__":
+    node_ids = np.arange(1, NODES + 1)
+    with tempfile.TemporaryDirectory() as directory:
+        binary_file = os.path.join(directory, 'rainfall.bin')
+        np.random.RandomState(0).uniform(0, 20, (NODES, TSTEPS)).astype('f').tofile(binary_file)
+        offsets = "".join("%08x%08x" % (n, i * TSTEPS * 4) for i, n in enumerate(node_ids))
+        with open(binary_file + '.json', 'w') as f:
+            json.dump({"Metadata": {"DatavalueCount": TSTEPS, "NodeCount": NODES}, "NodeOffsets": offsets}, f)
+
+        per_node = timed(lambda: [extract_per_node(n, binary_file) for n in node_ids[:MEASURED_NODES]])
+
+        start = time.time()
+        climate = ClimateBinary(binary_file)
+        series = [climate.node_series(n) for n in node_ids]
+        all_series = time.time() - start
+        block = timed(lambda: ClimateBinary(binary_file).nodes_series().sum())
+
+        print("{:>8}{:>22}{:>18}{:>12}".format("Nodes", "Per node (est.)", "node_series", "Block"))
+        print("{:>8}{:>21.1f}s{:>17.2f}s{:>11.2f}s".format(NODES, per_node * NODES / MEASURED_NODES, all_series,
+                                                         block))
+        del climate, series
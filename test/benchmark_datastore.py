@@ -0,0 +1,84 @@
+"""
+Benchmark of the simulation status writes of concurrent runners on a temporary DB.
+
+Each thread plays the monitor of a slice of the simulations and saves every change of them (Running, a few progress
+messages, Succeeded):
+- Rollback journal: one transaction per update, default SQLite journal without connection pool
+- WAL: one transaction per update, WAL mode with pooled connections
+- WAL + writer: the updates go through the SimulationWriter which saves them in one transaction per tick
+
+The lock wait is the total time the runner threads spent in the DB calls.
+
+Usage: python benchmark_datastore.py [simulations] [threads]
+"""
+import os
+import sys
+import tempfile
+import threading
+import time
+
+from COMPS.Data.Simulation import SimulationState
+
+from simtools.DataAccess import Base, Session, create_sqlite_engine
+from simtools.DataAccess.Schema import Simulation
+from simtools.DataAccess.SimulationDataStore import SimulationDataStore, SimulationWriter
+
+SIMULATIONS = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+THREADS = int(sys.argv[2]) if len(sys.argv) > 2 else 32
+MESSAGES = 3
+
+
+def updates(sim_id):
+    yield {'sid': sim_id, 'status': SimulationState.Running, 'pid': 1000}
+    for step in range(MESSAGES):
+        yield {'sid': sim_id, 'message': '%d of %d steps complete.' % (step + 1, MESSAGES)}
+    yield {'sid': sim_id, 'status': SimulationState.Succeeded, 'message': 'Done', 'pid': None}
+
+
+def run(directory, name, wal, writer=None):
+    engine = create_sqlite_engine(os.path.join(directory, '%s.sqlite' % name.replace(' ', '_')), wal=wal)
+    Session.configure(bind=engine)
+    Base.metadata.create_all(engine)
+    sim_ids = ['sim_%05d' % i for i in range(SIMULATIONS)]
+    SimulationDataStore.bulk_insert_simulations([Simulation(id=sim_id, status_s='Created') for sim_id in sim_ids])
+
+    save = writer.put if writer else SimulationDataStore.batch_simulations_update
+    waits = [0] * THREADS
+
+    def monitor(thread_index):
+        for sim_id in sim_ids[thread_index::THREADS]:
+            for update in updates(sim_id):
+                start = time.time()
+                save([update])
+                waits[thread_index] += time.time() - start
+
+    start = time.time()
+    threads = [threading.Thread(target=monitor, args=(i,)) for i in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if writer:
+        writer.close()
+    elapsed = time.time() - start
+
+    session = Session()
+    succeeded = session.query(Simulation).filter(Simulation.status_s == SimulationState.Succeeded.name).count()
+    session.close()
+    engine.dispose()
+    assert succeeded == SIMULATIONS, "%d simulations saved as Succeeded" % succeeded
+
+    transactions = writer.transactions if writer else SIMULATIONS * (MESSAGES + 2)
+    return elapsed, sum(waits), transactions
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as directory:
+        results = [('Rollback journal', run(directory, 'Rollback journal', wal=False)),
+                   ('WAL', run(directory, 'WAL', wal=True)),
+                   ('WAL + writer', run(directory, 'WAL + writer', wal=True, writer=SimulationWriter()))]
+
+    print("\n%d simulations, %d updates from %d threads" % (SIMULATIONS, SIMULATIONS * (MESSAGES + 2), THREADS))
+    print("{:<20}{:>10}{:>14}{:>14}".format("Mode", "Time", "Lock wait", "Transactions"))
+    for name, (elapsed, wait, transactions) in results:
+        print("{:<20}{:>9.1f}s{:>13.1f}s{:>14}".format(name, elapsed, wait, transactions))
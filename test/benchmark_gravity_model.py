@@ -0,0 +1,64 @@
+"""
+Benchmark of the StaticGravityModelRatesGenerator migration computation at 1k/5k/20k nodes.
+
+- Pairwise loop: the former implementation (geopy distance + scalar probability per pair), measured on 100 nodes and
+  extrapolated as it is quadratic.
+- All pairs: vectorized computation of the complete rates dictionary (skipped at 20k nodes: 400M links).
+- Nearest: rates to the 30 nearest nodes only, using the spatial index.
+
+Usage: python benchmark_gravity_model.py [sizes...]
+"""
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+from geopy.distance import distance
+
+from dtk.tools.migration.StaticGravityModelRatesGenerator import StaticGravityModelRatesGenerator
+
+SIZES = [int(s) for s in sys.argv[1:]] or [1000, 5000, 20000]
+MAX_ALL_PAIRS = 5000
+NEIGHBORS = 30
+GRAVITY_PARAMS = np.array([7.50395776e-06, 9.65648371e-01, 9.65648371e-01, -1.10305489e+00])
+
+
+def random_nodes(n, seed=0):
+    # Nodes spread over a country-sized area
+    rng = np.random.RandomState(seed)
+    return pd.DataFrame({'lat': rng.uniform(-5, 5, n), 'long': rng.uniform(25, 35, n), 'grid_id': np.arange(n),
+                         'node_id': np.arange(1, n + 1, dtype=float), 'pop': rng.randint(100, 10000, n)})
+
+
+def pairwise_loop(generator, df):
+    migr = {}
+    for _, r1 in df.iterrows():
+        migr[r1['node_id']] = {}
+        for _, r2 in df.iterrows():
+            if r2['node_id'] != r1['node_id']:
+                d = distance((r1['lat'], r1['long']), (r2['lat'], r2['long'])).km
+                migr[r1['node_id']][r2['node_id']] = generator.compute_migration_probability(r1['pop'], r2['pop'], d)
+    return migr
+
+
+def timed(fn, *args):
+    start = time.time()
+    fn(*args)
+    return time.time() - start
+
+
+if __name__ == "__main__":
+    with tempfile.NamedTemporaryFile(suffix='.json') as demographics:
+        all_pairs = StaticGravityModelRatesGenerator(demographics.name, GRAVITY_PARAMS)
+        nearest = StaticGravityModelRatesGenerator(demographics.name, GRAVITY_PARAMS, max_neighbors=NEIGHBORS)
+
+        loop_time = timed(pairwise_loop, all_pairs, random_nodes(100))
+
+        print("{:>8}{:>22}{:>16}{:>16}".format("Nodes", "Pairwise loop (est.)", "All pairs", "Nearest %d" % NEIGHBORS))
+        for n in SIZES:
+            df = random_nodes(n)
+            estimate = loop_time * (n / 100) ** 2
+            all_pairs_time = "{:.1f}s".format(timed(all_pairs.compute_migration, df)) if n <= MAX_ALL_PAIRS else "-"
+            nearest_time = timed(nearest.compute_migration, df)
+            print("{:>8}{:>21.0f}s{:>16}{:>15.1f}s".format(n, estimate, all_pairs_time, nearest_time))
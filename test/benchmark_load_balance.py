@@ -0,0 +1,55 @@
+"""
+Benchmark of the load balancers: time and quality (population of the largest partition over the average).
+
+- KMeans: KMeansLoadBalancer with its default parameters except max_equal_clusters_iterations (MAX_KMEANS_RETRIES)
+- Hilbert: HilbertLoadBalancer
+
+Usage: python benchmark_load_balance.py [nodes] [cores]
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from dtk.tools.loadbalance.HilbertLoadBalancer import HilbertLoadBalancer
+from dtk.tools.loadbalance.KMeansLoadBalancer import KMeansLoadBalancer
+
+NODES = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+CORES = int(sys.argv[2]) if len(sys.argv) > 2 else 512
+MAX_KMEANS_RETRIES = 3
+
+
+def random_demographics(path, n, seed=0):
+    # Clustered nodes with heavy-tailed populations
+    rng = np.random.RandomState(seed)
+    centers = rng.uniform((-10, 25), (0, 35), (50, 2))
+    points = centers[rng.randint(0, 50, n)] + rng.normal(0, 0.5, (n, 2))
+    nodes = [{'NodeID': i + 1, 'NodeAttributes': {'Latitude': lat, 'Longitude': lon, 'InitialPopulation': pop}}
+             for i, ((lat, lon), pop) in enumerate(zip(points.tolist(), rng.lognormal(7, 1.2, n).round().tolist()))]
+    with open(path, 'w') as f:
+        json.dump({'Metadata': {'NodeCount': n}, 'Defaults': {'NodeAttributes': {}}, 'Nodes': nodes}, f)
+
+
+def run(balancer):
+    start = time.time()
+    result = balancer.balance_load()
+    result['lb_fig'].close()
+    return time.time() - start, result['max_over_avg']
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'demographics.json')
+        random_demographics(path, NODES)
+
+        results = [('KMeans (%d tries)' % MAX_KMEANS_RETRIES,
+                    run(KMeansLoadBalancer(path, CORES, 50, MAX_KMEANS_RETRIES - 1, 1.6))),
+                   ('Hilbert', run(HilbertLoadBalancer(path, CORES)))]
+
+        print("\n%d nodes on %d cores" % (NODES, CORES))
+        print("{:<20}{:>10}{:>14}".format("Balancer", "Time", "Max/avg load"))
+        for name, (seconds, max_over_avg) in results:
+            print("{:<20}{:>9.1f}s{:>14.3f}".format(name, seconds, max_over_avg))
@@ -0,0 +1,57 @@
+"""
+Benchmark of the MigrationFile binary generation for 100k nodes with 30 destinations each.
+
+- Struct loop: the former implementation (struct.pack per node and string concatenation of the offsets).
+- Matrix: generate_file from the {source: {destination: rate}} dictionary.
+- Arrays: generate_file from a MigrationFile created with from_arrays, without building the dictionary.
+
+Usage: python benchmark_migration_file.py [nodes]
+"""
+import os
+import sys
+import tempfile
+import time
+from struct import pack
+
+import numpy as np
+
+from dtk.tools.migration.MigrationFile import MigrationFile
+
+NODES = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+DESTINATIONS = 30
+
+
+def struct_loop(matrix, path):
+    offset, offset_str = 0, ""
+    with open(path, 'wb') as f:
+        for nodeid, destinations in matrix.items():
+            f.write(pack('L' * len(destinations), *destinations.keys()))
+            f.write(pack('d' * len(destinations), *destinations.values()))
+            offset_str = "%s%s%s" % (offset_str, "{0:08X}".format(nodeid), "{0:08X}".format(offset))
+            offset += 12 * len(destinations)
+    return offset_str
+
+
+def timed(fn, *args):
+    start = time.time()
+    fn(*args)
+    return time.time() - start
+
+
+if __name__ == "__main__":
+    rng = np.random.RandomState(0)
+    sources = np.repeat(np.arange(1, NODES + 1), DESTINATIONS)
+    destinations = (sources + rng.randint(1, NODES, len(sources))) % NODES + 1
+    rates = rng.uniform(0, 1e-3, len(sources))
+    matrix = {}
+    for s, d, r in zip(sources.tolist(), destinations.tolist(), rates.tolist()):
+        matrix.setdefault(s, {})[d] = r
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'migration.bin')
+        print("{:>8}{:>16}{:>12}{:>12}".format("Nodes", "Struct loop", "Matrix", "Arrays"))
+        print("{:>8}{:>15.1f}s{:>11.1f}s{:>11.1f}s".format(
+            NODES,
+            timed(struct_loop, matrix, path),
+            timed(MigrationFile(1, matrix).generate_file, path),
+            timed(MigrationFile.from_arrays(1, sources, destinations, rates).generate_file, path)))
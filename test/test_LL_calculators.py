@@ -0,0 +1,68 @@
+import unittest
+
+import numpy as np
+
+from calibtool import LL_calculators as LL
+
+
+class TestVectorizedLLCalculators(unittest.TestCase):
+    """
+    The batch functions must return, for each sample, the value of the per-bin implementation.
+    """
+    n_samples = 12
+
+    def setUp(self):
+        self.rng = np.random.RandomState(42)
+
+    def counts(self, *shape):
+        return self.rng.randint(0, 50, size=shape).astype(float)
+
+    def assert_batch_equal(self, batch, single, sim_data, *args, **kwargs):
+        expected = [single(*(args + (sample,)), **kwargs) for sample in sim_data]
+        np.testing.assert_allclose(batch(*(args + (sim_data,)), **kwargs), expected, rtol=1e-10)
+
+    def test_dirichlet_multinomial(self):
+        raw_data = self.counts(6, 5)
+        sim_data = self.counts(self.n_samples, 6, 5) + 1
+        self.assert_batch_equal(LL.dirichlet_multinomial_batch, LL.dirichlet_multinomial, sim_data, raw_data)
+
+    def test_dirichlet_single(self):
+        raw_data = self.counts(8)
+        sim_data = self.counts(self.n_samples, 8)
+        self.assert_batch_equal(LL.dirichlet_single_batch, LL.dirichlet_single, sim_data, raw_data)
+
+    def test_beta_binomial(self):
+        raw_nobs, sim_nobs = self.counts(10) + 50, self.counts(10) + 50
+        raw_data = self.counts(10)
+        sim_data = self.counts(self.n_samples, 10)
+        for return_mean in (True, False):
+            expected = [LL.beta_binomial(raw_nobs, sim_nobs, raw_data, s, return_mean) for s in sim_data]
+            np.testing.assert_allclose(LL.beta_binomial_batch(raw_nobs, sim_nobs, raw_data, sim_data, return_mean),
+                                       expected, rtol=1e-10)
+
+    def test_gamma_poisson(self):
+        # Include bins without observations to exercise the skipped log terms
+        raw_nobs, sim_nobs = self.counts(10), self.counts(10)
+        raw_nobs[:2] = 0
+        sim_nobs[1:3] = 0
+        raw_data = self.counts(10)
+        sim_data = self.counts(self.n_samples, 10)
+        expected = [LL.gamma_poisson(raw_nobs, sim_nobs, raw_data, s) for s in sim_data]
+        np.testing.assert_allclose(LL.gamma_poisson_batch(raw_nobs, sim_nobs, raw_data, sim_data), expected,
+                                   rtol=1e-10)
+
+    def test_distances(self):
+        raw_data = self.counts(20) + 1
+        sim_data = self.counts(self.n_samples, 20)
+        self.assert_batch_equal(LL.euclidean_distance_batch, LL.euclidean_distance, sim_data, raw_data)
+        self.assert_batch_equal(LL.weighted_squares_batch, LL.weighted_squares, sim_data, raw_data)
+
+    def test_single_sample(self):
+        raw_data = self.counts(8)
+        sim_data = self.counts(8)
+        self.assertAlmostEqual(float(LL.dirichlet_single_batch(raw_data, sim_data)),
+                               LL.dirichlet_single(raw_data, sim_data))
+
+
+if __name__ == '__main__':
+    unittest.main()
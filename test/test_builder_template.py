@@ -0,0 +1,148 @@
+import copy
+import json
+import unittest
+
+from dtk.interventions.outbreakindividual import recurring_outbreak
+from dtk.utils.core.DTKConfigBuilder import DTKConfigBuilder
+from dtk.utils.reports.CustomReport import add_node_demographics_report
+from simtools.ModBuilder import ModFn
+from simtools.SetupParser import SetupParser
+from simtools.SimConfigBuilder import SimConfigBuilder
+from simtools.SimulationCreator.BuilderTemplate import BuilderTemplate
+
+
+class CampaignBuilder(SimConfigBuilder):
+    shared_attributes = ('campaign',)
+
+    def __init__(self):
+        super().__init__(config={'Run_Number': 0, 'x_Temporary_Larval_Habitat': 1})
+        self.campaign = {'Events': [{'Start_Day': day} for day in range(100)]}
+
+    def get_commandline(self):
+        pass
+
+    def get_input_file_paths(self):
+        return []
+
+    def get_dll_paths_for_asset_manager(self):
+        return []
+
+    def dump_campaign(self):
+        return json.dumps(self.campaign, sort_keys=True, indent=3)
+
+    def file_writer(self, write_fn):
+        write_fn('campaign.json', self.serialize_section('campaign', self.dump_campaign))
+        write_fn('config.json', json.dumps(self.config, sort_keys=True, indent=3))
+
+
+def add_event(cb, day):
+    cb.campaign['Events'].append({'Start_Day': day})
+    return {'day': day}
+
+
+def set_param(cb, param, value):
+    cb.campaign['Events'].append({'Start_Day': value})
+    return {param: value}
+
+
+class TestBuilderTemplate(unittest.TestCase):
+    def setUp(self):
+        self.base = CampaignBuilder()
+        self.template = BuilderTemplate(self.base)
+
+    def create(self, mods):
+        cb = self.template.new_builder(mods)
+        for func in mods:
+            func(cb)
+        return cb, cb.dump_files_to_string()
+
+    def test_parameter_mods_share_sections(self):
+        files = []
+        for run_number in range(3):
+            cb, sim_files = self.create([ModFn(SimConfigBuilder.set_param, 'Run_Number', run_number),
+                                         ModFn(SimConfigBuilder.update_params, {'x_Temporary_Larval_Habitat': 2})])
+            self.assertIs(cb.campaign, self.base.campaign)
+            self.assertEqual(json.loads(sim_files['config.json'])['Run_Number'], run_number)
+            files.append(sim_files)
+
+        # The campaign was serialized once and the same content written for each simulation
+        self.assertEqual(sum(json.loads(f['campaign.json']) == self.base.campaign for f in files), 3)
+        self.assertIs(files[0]['campaign.json'], files[2]['campaign.json'])
+        self.assertEqual(self.base.get_param('Run_Number'), 0)
+        self.assertEqual(self.base.get_param('x_Temporary_Larval_Habitat'), 1)
+
+    def test_other_mods_get_full_copy(self):
+        cb, sim_files = self.create([ModFn(SimConfigBuilder.set_param, 'Run_Number', 1), ModFn(add_event, 200)])
+        self.assertIsNot(cb.campaign, self.base.campaign)
+        self.assertIsNone(cb.serialized_sections)
+        self.assertEqual(len(json.loads(sim_files['campaign.json'])['Events']), 101)
+        self.assertEqual(len(self.base.campaign['Events']), 100)
+
+        # A later parameter sweep is not affected by the modified campaign
+        _, sim_files = self.create([ModFn(SimConfigBuilder.set_param, 'Run_Number', 2)])
+        self.assertEqual(len(json.loads(sim_files['campaign.json'])['Events']), 100)
+
+    def test_function_named_set_param_gets_full_copy(self):
+        cb, sim_files = self.create([ModFn(set_param, 'Start_Day', 200)])
+        self.assertIsNot(cb.campaign, self.base.campaign)
+        self.assertEqual(len(json.loads(sim_files['campaign.json'])['Events']), 101)
+        self.assertEqual(len(self.base.campaign['Events']), 100)
+
+    def test_same_files_as_full_copy(self):
+        mods = [ModFn(SimConfigBuilder.set_param, 'Run_Number', 5)]
+        _, shared_files = self.create(mods)
+
+        full_copy = BuilderTemplate(self.base).new_builder([ModFn(add_event, 0)])
+        for func in mods:
+            func(full_copy)
+        self.assertEqual(full_copy.dump_files_to_string(), shared_files)
+
+
+class TestDTKConfigBuilderTemplate(unittest.TestCase):
+    shared_files = ('campaign.json', 'custom_reports.json', 'overlay.json', 'input.json')
+
+    def setUp(self):
+        SetupParser.init()
+        self.base = DTKConfigBuilder.from_defaults('VECTOR_SIM')
+        recurring_outbreak(self.base, start_day=10, repetitions=5, tsteps_btwn=30)
+        add_node_demographics_report(self.base, age_bins=[5, 15, 125])
+        self.base.add_demog_overlay('overlay.json', {'Defaults': {'IndividualAttributes': {'AgeDistributionFlag': 3}}})
+        self.base.add_input_file('input.json', {'Values': [1.5, 2.5]})
+        self.template = BuilderTemplate(self.base)
+
+    def tearDown(self):
+        SetupParser._uninit()
+
+    @staticmethod
+    def apply(cb, mods):
+        for func in mods:
+            func(cb)
+        return cb.dump_files_to_string()
+
+    def test_same_files_as_full_copy(self):
+        files = []
+        for run_number in range(2):
+            mods = [ModFn(DTKConfigBuilder.set_param, 'Run_Number', run_number),
+                    ModFn(DTKConfigBuilder.set_param, 'x_Temporary_Larval_Habitat', 0.1 * (run_number + 1))]
+            cb = self.template.new_builder(mods)
+            self.assertIs(cb.campaign, self.base.campaign)
+            sim_files = self.apply(cb, mods)
+
+            # Previous behavior: every simulation serializes its own full copy of the base builder
+            self.assertEqual(sim_files, self.apply(copy.deepcopy(self.base), mods))
+            files.append(sim_files)
+
+        for filename in self.shared_files:
+            self.assertEqual(files[0][filename].encode(), files[1][filename].encode())
+            self.assertIs(files[0][filename], files[1][filename])
+
+        configs = [json.loads(f['config.json'])['parameters'] for f in files]
+        self.assertNotEqual(files[0]['config.json'], files[1]['config.json'])
+        self.assertEqual([c['Run_Number'] for c in configs], [0, 1])
+        self.assertEqual([c['x_Temporary_Larval_Habitat'] for c in configs], [0.1, 0.2])
+        self.assertEqual(configs[1]['Demographics_Filenames'].count('overlay.json'), 1)
+        self.assertEqual(configs[1]['Custom_Reports_Filename'], 'custom_reports.json')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from simtools.Utilities.ContentStore import ContentStore
+
+
+class TestContentStore(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.store = ContentStore(os.path.join(self.tempdir, "_content"))
+        self.sim_dirs = []
+        for i in range(3):
+            sim_dir = os.path.join(self.tempdir, "Simulation_%d" % i)
+            os.makedirs(sim_dir)
+            self.sim_dirs.append(sim_dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+
+    def test_identical_contents_stored_once(self):
+        for sim_dir in self.sim_dirs:
+            self.store.write(os.path.join(sim_dir, "campaign.json"), '{"Events": []}')
+            self.store.write(os.path.join(sim_dir, "overlay.json"), '{"Nodes": [%s]}' % os.path.basename(sim_dir)[-1])
+
+        self.assertEqual(len(os.listdir(self.store.directory)), 4)
+        for sim_dir in self.sim_dirs:
+            with open(os.path.join(sim_dir, "campaign.json")) as f:
+                self.assertEqual(f.read(), '{"Events": []}')
+        with open(os.path.join(self.sim_dirs[2], "overlay.json")) as f:
+            self.assertEqual(f.read(), '{"Nodes": [2]}')
+
+    def test_files_are_linked(self):
+        for sim_dir in self.sim_dirs:
+            self.store.write(os.path.join(sim_dir, "campaign.json"), "{}")
+        stats = [os.stat(os.path.join(sim_dir, "campaign.json")) for sim_dir in self.sim_dirs]
+        self.assertEqual(len({(s.st_dev, s.st_ino) for s in stats}), 1)
+
+    def test_rewrite_linked_file(self):
+        first, second = (os.path.join(sim_dir, "config.json") for sim_dir in self.sim_dirs[:2])
+        self.store.write(first, "AAA")
+        self.store.write(second, "AAA")
+        self.store.write(first, "BBB")
+
+        for path, content in ((first, "BBB"), (second, "AAA")):
+            with open(path) as f:
+                self.assertEqual(f.read(), content)
+        # The stored content is unchanged for the next simulations
+        self.store.write(os.path.join(self.sim_dirs[2], "config.json"), "AAA")
+        with open(os.path.join(self.sim_dirs[2], "config.json")) as f:
+            self.assertEqual(f.read(), "AAA")
+        self.assertFalse(any(name.endswith(".tmp") for name in os.listdir(self.sim_dirs[0])))
+
+    def test_copy_file(self):
+        source = os.path.join(self.tempdir, "Namawala_single_node_demographics.json")
+        with open(source, "w") as f:
+            f.write("demographics")
+
+        for sim_dir in self.sim_dirs:
+            self.store.copy(source, sim_dir)
+
+        self.assertEqual(len(self.store.stored_files), 1)
+        self.assertEqual(len(os.listdir(self.store.directory)), 1)
+        with open(os.path.join(self.sim_dirs[1], os.path.basename(source))) as f:
+            self.assertEqual(f.read(), "demographics")
+
+    def test_shared_store(self):
+        # Another creator process using the same store finds the existing content
+        self.store.write(os.path.join(self.sim_dirs[0], "campaign.json"), "{}")
+        other = ContentStore(self.store.directory)
+        other.write(os.path.join(self.sim_dirs[1], "campaign.json"), "{}")
+        self.assertEqual(len(os.listdir(self.store.directory)), 1)
+        self.assertFalse(any(name.endswith(".tmp") for name in os.listdir(self.store.directory)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,128 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+from diskcache import Cache
+
+from simtools.Analysis.BaseAnalyzers import BaseAnalyzer
+from simtools.Analysis.BaseAnalyzers.InsetChartAnalyzer import InsetChartAnalyzer
+from simtools.Analysis.DataRetrievalProcess import retrieve_data_for_simulation
+from simtools.Analysis.OutputParser import SimulationOutputParser
+
+
+class FilesAnalyzer(BaseAnalyzer):
+    def __init__(self, uid, filenames, parse=True, columnar_channels=None):
+        super().__init__(uid=uid, filenames=filenames, parse=parse, columnar_channels=columnar_channels)
+        self.received = None
+
+    def select_simulation_data(self, data, simulation):
+        self.received = data
+        return sorted(data.keys())
+
+
+class MutatingAnalyzer(FilesAnalyzer):
+    """
+    Normalizes the channels of the file in place.
+    """
+    def select_simulation_data(self, data, simulation):
+        channels = data[self.filenames[0]]["Channels"]
+        channels.pop("Births")
+        channels["Infected"]["Data"][0] = -1
+        return super().select_simulation_data(data, simulation)
+
+
+class LocalExperiment:
+    location = "LOCAL"
+
+
+class LocalSimulation:
+    def __init__(self, sim_id, path):
+        self.id = sim_id
+        self.path = path
+        self.experiment = LocalExperiment()
+
+    def get_path(self):
+        return self.path
+
+
+class TestDataRetrieval(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        os.makedirs(os.path.join(self.tempdir, "output"))
+        for name in ("InsetChart.json", "BinnedReport.json"):
+            with open(os.path.join(self.tempdir, "output", name), "w") as fp:
+                json.dump({"Header": {}, "Channels": {"Infected": {"Units": "", "Data": [1, 2]},
+                                                      "Births": {"Units": "", "Data": [3, 4]}}}, fp)
+        self.simulation = LocalSimulation("sim", self.tempdir)
+        self.cache = Cache(os.path.join(self.tempdir, "cache"))
+
+    def tearDown(self):
+        self.cache.close()
+        shutil.rmtree(self.tempdir)
+
+    def test_files_parsed_once(self):
+        analyzers = [FilesAnalyzer("a", ["output/InsetChart.json"]),
+                     FilesAnalyzer("b", ["output/InsetChart.json", "output/BinnedReport.json"]),
+                     FilesAnalyzer("c", ["output/InsetChart.json"])]
+
+        with mock.patch.object(SimulationOutputParser, "parse", wraps=SimulationOutputParser.parse) as parse:
+            retrieve_data_for_simulation(self.simulation, analyzers, self.cache, None)
+
+        self.assertEqual(sorted(c[0][0] for c in parse.call_args_list),
+                         ["output/BinnedReport.json", "output/InsetChart.json"])
+        self.assertIsNot(analyzers[0].received["output/InsetChart.json"],
+                         analyzers[2].received["output/InsetChart.json"])
+        self.assertEqual(analyzers[0].received["output/InsetChart.json"],
+                         analyzers[2].received["output/InsetChart.json"])
+
+    def test_views_restricted_and_read_only(self):
+        analyzers = [FilesAnalyzer("a", ["output/InsetChart.json"]),
+                     FilesAnalyzer("b", ["output/BinnedReport.json"], parse=False)]
+        retrieve_data_for_simulation(self.simulation, analyzers, self.cache, None)
+
+        self.assertEqual(self.cache.get("sim"), {"a": ["output/InsetChart.json"], "b": ["output/BinnedReport.json"]})
+        self.assertIsInstance(analyzers[1].received["output/BinnedReport.json"], bytes)
+        with self.assertRaises(TypeError):
+            analyzers[0].received["output/BinnedReport.json"] = None
+
+    def test_channels_hint(self):
+        analyzers = [FilesAnalyzer("a", ["output/InsetChart.json"], columnar_channels=["Infected"]),
+                     FilesAnalyzer("b", ["output/InsetChart.json"], columnar_channels=["Births"]),
+                     FilesAnalyzer("c", ["output/InsetChart.json"])]
+
+        with mock.patch.object(SimulationOutputParser, "parse", wraps=SimulationOutputParser.parse) as parse:
+            retrieve_data_for_simulation(self.simulation, analyzers, self.cache, None)
+
+        # One columnar parse for the union of the hinted channels and one regular parse
+        self.assertEqual(parse.call_count, 2)
+        self.assertEqual(set(analyzers[0].received["output/InsetChart.json"]["Channels"]), {"Infected", "Births"})
+        self.assertIsInstance(analyzers[0].received["output/InsetChart.json"]["Channels"]["Infected"]["Data"],
+                              np.ndarray)
+        self.assertIsInstance(analyzers[2].received["output/InsetChart.json"]["Channels"]["Infected"]["Data"], list)
+
+    def test_channels_hint_is_opt_in(self):
+        analyzer = InsetChartAnalyzer(channels=["Infected"])
+        analyzer.filenames = ["output/InsetChart.json"]
+        retrieve_data_for_simulation(self.simulation, [analyzer], self.cache, None)
+
+        self.assertEqual(self.cache.get("sim")[analyzer.uid], {"Infected": {"Units": "", "Data": [1, 2]}})
+        self.assertIsInstance(self.cache.get("sim")[analyzer.uid]["Infected"]["Data"], list)
+
+    def test_analyzers_do_not_share_modifications(self):
+        for channels in (None, []):
+            analyzers = [MutatingAnalyzer("a", ["output/InsetChart.json"], columnar_channels=channels),
+                         FilesAnalyzer("b", ["output/InsetChart.json"], columnar_channels=channels)]
+            retrieve_data_for_simulation(self.simulation, analyzers, self.cache, None)
+
+            self.assertEqual(list(analyzers[0].received["output/InsetChart.json"]["Channels"]), ["Infected"])
+            channels = analyzers[1].received["output/InsetChart.json"]["Channels"]
+            self.assertEqual(set(channels), {"Infected", "Births"})
+            self.assertEqual(list(channels["Infected"]["Data"]), [1, 2])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import os
+import shutil
+import tempfile
+import unittest
+from collections import Counter
+
+from COMPS.Data.Simulation import SimulationState
+
+from simtools.DataAccess import Base, Session, create_sqlite_engine, engine
+from simtools.DataAccess.DataStore import DataStore
+from simtools.DataAccess.Schema import Experiment, Simulation
+from simtools.ExperimentManager.BaseExperimentManager import BaseExperimentManager
+from simtools.Monitor import SimulationMonitor
+
+
+class TestExperimentStatus(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.engine = create_sqlite_engine(os.path.join(self.tempdir, 'db.sqlite'), wal=True)
+        Session.configure(bind=self.engine)
+        Base.metadata.create_all(self.engine)
+
+        statuses = ['Succeeded'] * 5 + ['Running'] * 3 + ['Failed', None]
+        session = Session()
+        session.add(Experiment(exp_id='exp', exp_name='test', location='LOCAL'))
+        session.add(Experiment(exp_id='other', exp_name='other', location='LOCAL'))
+        for i, status in enumerate(statuses):
+            session.add(Simulation(id='sim_%d' % i, experiment_id='exp', status_s=status,
+                                   message='%d of 10 steps complete.' % i, tags={'payload': 'x' * 100000}))
+        session.add(Simulation(id='other_sim', experiment_id='other', status_s='Created'))
+        session.flush()
+        # Simulation without status
+        session.query(Simulation).filter(Simulation.id == 'sim_9').update({'status_s': None})
+        session.commit()
+        session.close()
+
+    def tearDown(self):
+        Session.configure(bind=engine)
+        self.engine.dispose()
+        shutil.rmtree(self.tempdir)
+
+    def test_simulations_status(self):
+        status = {sim_id: (state, message) for sim_id, state, message in DataStore.get_simulations_status('exp')}
+        self.assertEqual(len(status), 10)
+        self.assertEqual(status['sim_0'], (SimulationState.Succeeded, '0 of 10 steps complete.'))
+        self.assertIsNone(status['sim_9'][0])
+        self.assertEqual(DataStore.get_simulations_status('unknown'), [])
+
+    def test_simulations_status_counts(self):
+        self.assertEqual(DataStore.get_simulations_status_counts('exp'),
+                         Counter({SimulationState.Succeeded: 5, SimulationState.Running: 3,
+                                  SimulationState.Failed: 1, None: 1}))
+        self.assertEqual(DataStore.get_simulations_status_counts('other'), Counter({SimulationState.Created: 1}))
+
+    def test_monitor(self):
+        monitor = SimulationMonitor('exp')
+        states, msgs = monitor.query()
+        self.assertEqual(states['sim_9'], SimulationState.CommissionRequested)
+        self.assertEqual(msgs['sim_5'], '5 of 10 steps complete.')
+        self.assertEqual(monitor.query_counts(), Counter(states.values()))
+
+    def test_counts_finished(self):
+        self.assertFalse(BaseExperimentManager.counts_finished(DataStore.get_simulations_status_counts('exp')))
+        self.assertTrue(BaseExperimentManager.counts_finished(Counter({SimulationState.Succeeded: 2,
+                                                                       SimulationState.Canceled: 1,
+                                                                       SimulationState.Running: 0})))
+        self.assertTrue(BaseExperimentManager.counts_finished(Counter()))
+
+    def test_status_index(self):
+        with self.engine.connect() as connection:
+            plan = connection.execute("EXPLAIN QUERY PLAN SELECT status_s, count(id) FROM simulations "
+                                      "WHERE experiment_id = 'exp' GROUP BY status_s").fetchall()
+        self.assertIn('ix_simulations_experiment_status', ' '.join(str(row) for row in plan))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from diskcache import Cache
+
+from simtools.Analysis.BaseAnalyzers import BaseAnalyzer
+from simtools.Analysis.DataRetrievalProcess import retrieve_data
+
+
+class SumAnalyzer(BaseAnalyzer):
+    def __init__(self, **kwargs):
+        super().__init__(filenames=["output/InsetChart.json"], incremental=True, **kwargs)
+
+    def select_simulation_data(self, data, simulation):
+        return sum(data[self.filenames[0]]["Channels"]["Infected"]["Data"])
+
+    def reduce(self, partial, simulation, data):
+        return (partial or 0) + data
+
+    def combine(self, partials):
+        return sum(partials)
+
+    def finalize(self, all_data):
+        return all_data
+
+
+class RegularAnalyzer(BaseAnalyzer):
+    def __init__(self):
+        super().__init__(filenames=["output/InsetChart.json"])
+
+    def select_simulation_data(self, data, simulation):
+        return len(data[self.filenames[0]]["Channels"]["Infected"]["Data"])
+
+
+class LocalExperiment:
+    location = "LOCAL"
+
+
+class LocalSimulation:
+    def __init__(self, sim_id, path):
+        self.id = sim_id
+        self.path = path
+        self.experiment = LocalExperiment()
+
+    def get_path(self):
+        return self.path
+
+
+class TestIncrementalAnalysis(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.simulations = []
+        for i in range(5):
+            sim_path = os.path.join(self.tempdir, str(i))
+            os.makedirs(os.path.join(sim_path, "output"))
+            with open(os.path.join(sim_path, "output", "InsetChart.json"), "w") as fp:
+                json.dump({"Channels": {"Infected": {"Data": [i, i, i]}}}, fp)
+            self.simulations.append(LocalSimulation(str(i), sim_path))
+
+        self.cache = Cache(os.path.join(self.tempdir, "cache"))
+        self.incremental = SumAnalyzer()
+        self.regular = RegularAnalyzer()
+        retrieve_data.analyzers = [self.incremental, self.regular]
+        retrieve_data.cache = self.cache
+        retrieve_data.path_mapping = None
+        retrieve_data.output_cache = None
+
+    def tearDown(self):
+        self.cache.close()
+        shutil.rmtree(self.tempdir)
+
+    def test_batch_is_reduced_in_worker(self):
+        partials, metrics = retrieve_data(self.simulations)
+        self.assertEqual(partials, {self.incremental.uid: 30})
+        self.assertEqual(metrics.simulations, 5)
+        self.assertIsNone(metrics.exception)
+
+    def test_incremental_data_not_cached(self):
+        retrieve_data(self.simulations)
+        self.assertEqual(len(self.cache), 5)
+        for sim in self.simulations:
+            self.assertEqual(self.cache[sim.id], {self.regular.uid: 3})
+
+    def test_combine_batches(self):
+        first = retrieve_data(self.simulations[:2])[0][self.incremental.uid]
+        second = retrieve_data(self.simulations[2:])[0][self.incremental.uid]
+        self.assertEqual(self.incremental.combine([first, second]), 30)
+
+
+if __name__ == '__main__':
+    unittest.main()
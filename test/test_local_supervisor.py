@@ -0,0 +1,131 @@
+import os
+import shutil
+import signal
+import sys
+import tempfile
+import unittest
+
+from COMPS.Data.Simulation import SimulationState
+
+from simtools.SimulationRunner.LocalRunner import LocalSimulationSupervisor, StatusTail
+
+
+class FakeSimulation:
+    def __init__(self, sim_id, path, status=SimulationState.Created):
+        self.id = sim_id
+        self.path = path
+        self.status = status
+
+    def get_path(self):
+        return self.path
+
+
+class FakeExperiment:
+    def __init__(self, script):
+        self.command_line = '"%s" -c "%s"' % (sys.executable, script)
+
+
+class RecordingSupervisor(LocalSimulationSupervisor):
+    def __init__(self, max_local_sims):
+        super(RecordingSupervisor, self).__init__(max_local_sims)
+        self.saved = []
+
+    def flush(self):
+        self.saved.extend(self.updates.values())
+        self.updates = {}
+
+    def final_status(self, sim_id):
+        return [u for u in self.saved if u['sid'] == sim_id and u.get('status') != SimulationState.Running][-1]
+
+
+class TestStatusTail(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tempdir, 'status.txt')
+        self.tail = StatusTail(self.path)
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+
+    def append(self, text):
+        with open(self.path, 'a') as f:
+            f.write(text)
+
+    def test_incremental_reads(self):
+        self.assertEqual(self.tail.read(), "")
+        self.append("Beginning Simulation...\n1 of 10 steps complete.\n")
+        self.assertEqual(self.tail.read(), "1 of 10 steps complete.")
+        offset = self.tail.offset
+
+        self.append("2 of 10 ste")
+        self.assertEqual(self.tail.read(), "2 of 10 ste")
+        self.append("ps complete.\n")
+        self.assertEqual(self.tail.read(), "2 of 10 steps complete.")
+        self.assertEqual(self.tail.read(), "2 of 10 steps complete.")
+        self.assertGreater(self.tail.offset, offset)
+
+    def test_truncated_file(self):
+        self.append("1 of 10 steps complete.\n2 of 10 steps complete.\n")
+        self.tail.read()
+        with open(self.path, 'w') as f:
+            f.write("Done\n")
+        self.assertEqual(self.tail.read(), "Done")
+
+
+class TestLocalSimulationSupervisor(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.supervisor = RecordingSupervisor(2)
+        self.supervisor.install_signal_handler()
+
+    def tearDown(self):
+        for sim in self.supervisor.running.values():
+            sim.process.kill()
+            sim.process.wait()
+        if hasattr(signal, 'SIGCHLD'):
+            signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+        shutil.rmtree(self.tempdir)
+
+    def simulation(self, sim_id, **kwargs):
+        path = os.path.join(self.tempdir, sim_id)
+        os.makedirs(path)
+        return FakeSimulation(sim_id, path, **kwargs)
+
+    def run_all(self):
+        while self.supervisor.running:
+            self.supervisor.run(10)
+
+    def test_final_states(self):
+        done = FakeExperiment("open('status.txt', 'w').write('1 of 1 steps complete.\\\\nDone\\\\n')")
+        failed = FakeExperiment("import sys; sys.exit(1)")
+        self.supervisor.submit(self.simulation('done'), done)
+        self.supervisor.submit(self.simulation('failed'), failed)
+        self.assertTrue(self.supervisor.full())
+        self.assertIn('done', self.supervisor)
+
+        self.run_all()
+        self.assertEqual(self.supervisor.final_status('done'),
+                         {'sid': 'done', 'status': SimulationState.Succeeded, 'message': 'Done', 'pid': None})
+        self.assertEqual(self.supervisor.final_status('failed')['status'], SimulationState.Failed)
+        self.assertFalse(self.supervisor.full())
+
+    def test_woken_up_by_child_exit(self):
+        self.supervisor.submit(self.simulation('quick'), FakeExperiment("pass"))
+        self.supervisor.submit(self.simulation('slow'), FakeExperiment("import time; time.sleep(30)"))
+        self.assertEqual(self.supervisor.run(20), 1)
+        self.assertNotIn('quick', self.supervisor)
+        self.assertIn('slow', self.supervisor)
+
+    def test_running_simulation_not_found(self):
+        # A simulation Running in the DB but whose process is gone only gets its final status
+        sim = self.simulation('lost', status=SimulationState.Running)
+        with open(os.path.join(sim.get_path(), 'trajectories.csv'), 'w'):
+            pass
+        self.supervisor.submit(sim, FakeExperiment("pass"))
+        self.assertNotIn('lost', self.supervisor)
+        self.supervisor.flush()
+        self.assertEqual(self.supervisor.final_status('lost')['status'], SimulationState.Succeeded)
+
+
+if __name__ == '__main__':
+    unittest.main()
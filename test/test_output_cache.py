@@ -0,0 +1,174 @@
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from COMPS.Data.Simulation import SimulationState
+from diskcache import Cache
+
+from simtools.Analysis.BaseAnalyzers import BaseAnalyzer
+from simtools.Analysis.DataRetrievalProcess import retrieve_data_for_simulation
+from simtools.Analysis.OutputCache import OutputCache, output_cache_settings
+
+
+class ChannelAnalyzer(BaseAnalyzer):
+    def __init__(self, channel="Infected"):
+        super().__init__(filenames=["output/InsetChart.json"])
+        self.channel = channel
+        self.calls = 0
+
+    def select_simulation_data(self, data, simulation):
+        self.calls += 1
+        return data[self.filenames[0]]["Channels"][self.channel]["Data"]
+
+
+class ChannelsAnalyzer(BaseAnalyzer):
+    def __init__(self):
+        super().__init__(filenames=["output/InsetChart.json"],
+                         columnar_channels={"Infected", "Births", "Statistical Population", "New Clinical Cases"})
+        self.transform = lambda x: x * 2
+        self.options = {"years": frozenset(range(10)), "name": "test"}
+
+
+class LocalExperiment:
+    location = "LOCAL"
+
+
+class LocalSimulation:
+    def __init__(self, sim_id, path, status=SimulationState.Succeeded):
+        self.id = sim_id
+        self.path = path
+        self.status = status
+        self.experiment = LocalExperiment()
+
+    def get_path(self):
+        return self.path
+
+
+class TestOutputCache(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        sim_path = os.path.join(self.tempdir, "sim")
+        os.makedirs(os.path.join(sim_path, "output"))
+        self.inset_path = os.path.join(sim_path, "output", "InsetChart.json")
+        with open(self.inset_path, "w") as fp:
+            json.dump({"Channels": {"Infected": {"Data": [1, 2]}, "Births": {"Data": [3, 4]}}}, fp)
+
+        self.simulation = LocalSimulation("sim", sim_path)
+        self.cache = Cache(os.path.join(self.tempdir, "cache"))
+        self.output_cache = OutputCache(os.path.join(self.tempdir, "output_cache"))
+
+    def tearDown(self):
+        self.cache.close()
+        self.output_cache.close()
+        shutil.rmtree(self.tempdir)
+
+    def analyze(self, analyzer, simulation=None):
+        self.output_cache.register_analyzers([analyzer])
+        retrieve_data_for_simulation(simulation or self.simulation, [analyzer], self.cache, None, self.output_cache)
+        return self.cache.get((simulation or self.simulation).id)[analyzer.uid]
+
+    def test_selected_data_reused(self):
+        self.assertEqual(self.analyze(ChannelAnalyzer()), [1, 2])
+
+        # The file is gone, the selected data has to come from the persistent cache
+        os.remove(self.inset_path)
+        analyzer = ChannelAnalyzer()
+        self.assertEqual(self.analyze(analyzer), [1, 2])
+        self.assertEqual(analyzer.calls, 0)
+
+    def test_new_version_reuses_file(self):
+        self.analyze(ChannelAnalyzer())
+        os.remove(self.inset_path)
+
+        # Different parameters -> different version -> the raw file is parsed again from the persistent cache
+        analyzer = ChannelAnalyzer(channel="Births")
+        self.assertEqual(self.analyze(analyzer), [3, 4])
+        self.assertEqual(analyzer.calls, 1)
+
+    def test_unfinished_simulation_not_persisted(self):
+        simulation = LocalSimulation("running", self.simulation.path, status=SimulationState.Running)
+        self.analyze(ChannelAnalyzer(), simulation)
+        self.assertIsNone(self.output_cache.get_file("running", "output/InsetChart.json"))
+
+
+class TestAnalyzerVersion(unittest.TestCase):
+    def version_in_subprocess(self, hash_seed):
+        code = "from test.test_output_cache import ChannelsAnalyzer; from simtools.Analysis.OutputCache import " \
+               "OutputCache; print(OutputCache.analyzer_version(ChannelsAnalyzer()))"
+        env = dict(os.environ, PYTHONHASHSEED=str(hash_seed),
+                   PYTHONPATH=os.pathsep.join(filter(None, [os.getcwd()] + sys.path)))
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        return subprocess.check_output([sys.executable, "-c", code], env=env, cwd=root).decode().strip()
+
+    def test_stable_across_processes(self):
+        version = OutputCache.analyzer_version(ChannelsAnalyzer())
+        self.assertEqual(self.version_in_subprocess(1), version)
+        self.assertEqual(self.version_in_subprocess(2), version)
+
+    def test_parameters_change_version(self):
+        analyzer = ChannelsAnalyzer()
+        version = OutputCache.analyzer_version(analyzer)
+        analyzer.columnar_channels.add("Adult Vectors")
+        self.assertNotEqual(OutputCache.analyzer_version(analyzer), version)
+
+    def test_functions_change_version(self):
+        analyzer = ChannelsAnalyzer()
+        version = OutputCache.analyzer_version(analyzer)
+        analyzer.transform = lambda x: x * 3
+        self.assertNotEqual(OutputCache.analyzer_version(analyzer), version)
+
+        # Same code, different closure values
+        def scale(factor):
+            return lambda x: x * factor
+        analyzer.transform = scale(2)
+        version = OutputCache.analyzer_version(analyzer)
+        analyzer.transform = scale(3)
+        self.assertNotEqual(OutputCache.analyzer_version(analyzer), version)
+        analyzer.transform = scale(2)
+        self.assertEqual(OutputCache.analyzer_version(analyzer), version)
+
+    def test_unidentified_attribute_not_cached(self):
+        analyzer = ChannelAnalyzer()
+        analyzer.lock = object()
+        self.assertIsNone(OutputCache.analyzer_version(analyzer))
+
+        with tempfile.TemporaryDirectory() as directory:
+            output_cache = OutputCache(directory)
+            output_cache.register_analyzers([analyzer])
+            output_cache.set_selected_data("sim", analyzer, [1, 2])
+            self.assertIsNone(output_cache.get_selected_data("sim", analyzer))
+
+            analyzer.cache_version = 1
+            output_cache.register_analyzers([analyzer])
+            output_cache.set_selected_data("sim", analyzer, [1, 2])
+            self.assertEqual(output_cache.get_selected_data("sim", analyzer), [1, 2])
+            output_cache.close()
+
+    def test_cache_version(self):
+        analyzer = ChannelAnalyzer()
+        analyzer.cache_version = 1
+        version = OutputCache.analyzer_version(analyzer)
+        self.assertNotEqual(version, OutputCache.analyzer_version(ChannelAnalyzer()))
+        # With an explicit version, only the version identifies the selected data
+        analyzer.channel = "Births"
+        self.assertEqual(OutputCache.analyzer_version(analyzer), version)
+        analyzer.cache_version = 2
+        self.assertNotEqual(OutputCache.analyzer_version(analyzer), version)
+
+    def test_default_settings(self):
+        os.environ["DTK_TOOLS_OUTPUT_CACHE"] = os.path.join("~", "analyzers_cache")
+        os.environ["DTK_TOOLS_OUTPUT_CACHE_SIZE"] = "0.5"
+        try:
+            self.assertEqual(output_cache_settings(),
+                             (os.path.join(os.path.expanduser("~"), "analyzers_cache"), 2 ** 29))
+        finally:
+            del os.environ["DTK_TOOLS_OUTPUT_CACHE"]
+            del os.environ["DTK_TOOLS_OUTPUT_CACHE_SIZE"]
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+import json
+import unittest
+
+import numpy as np
+
+from simtools.Analysis.OutputParser import SimulationOutputParser
+
+
+class TestChannelsJsonParser(unittest.TestCase):
+    def setUp(self):
+        self.inset_chart = {
+            "Header": {"DateTime": "Mon Jan 01 00:00:00 2018", "Channels": 4, "Timesteps": 5},
+            "Channels": {
+                "Infected": {"Units": "Infected [fraction]", "Data": [0.1, 2, -3e-05, 4, 5]},
+                "Births": {"Units": "", "Data": [1, 2, 3, 4, 5]},
+                "Daily EIR": {"Units": "", "Data": [[1, 2], [3, 4]]},
+                "Empty": {"Units": "", "Data": []}
+            }
+        }
+        self.content = json.dumps(self.inset_chart, indent=4).encode()
+
+    def test_all_channels(self):
+        parsed = SimulationOutputParser.parse("output/InsetChart.json", self.content, channels=[])
+        self.assertEqual(parsed["Header"], self.inset_chart["Header"])
+        self.assertEqual(set(parsed["Channels"]), set(self.inset_chart["Channels"]))
+        for name, channel in self.inset_chart["Channels"].items():
+            self.assertEqual(parsed["Channels"][name]["Units"], channel["Units"])
+            self.assertIsInstance(parsed["Channels"][name]["Data"], np.ndarray)
+            np.testing.assert_array_equal(parsed["Channels"][name]["Data"], np.asarray(channel["Data"], dtype=float))
+
+    def test_selected_channels(self):
+        parsed = SimulationOutputParser.parse("output/InsetChart.json", self.content, channels=["Births", "Daily EIR"])
+        self.assertEqual(set(parsed["Channels"]), {"Births", "Daily EIR"})
+        self.assertEqual(parsed["Channels"]["Daily EIR"]["Data"].shape, (2, 2))
+
+    def test_fallback(self):
+        # Non numeric data cannot be scanned as floats, the regular decoder is used instead
+        content = self.content.replace(b"0.1", b'"n/a"')
+        parsed = SimulationOutputParser.parse("output/InsetChart.json", content, channels=["Infected", "Births"])
+        self.assertEqual(parsed["Channels"]["Infected"]["Data"][0], "n/a")
+        np.testing.assert_array_equal(parsed["Channels"]["Births"]["Data"], [1, 2, 3, 4, 5])
+        self.assertEqual(SimulationOutputParser.parse("output/list.json", b"[1, 2]", channels=[]), [1, 2])
+
+    def test_regular_parsing(self):
+        parsed = SimulationOutputParser.parse("output/InsetChart.json", self.content)
+        self.assertEqual(parsed, self.inset_chart)
+
+
+if __name__ == '__main__':
+    unittest.main()
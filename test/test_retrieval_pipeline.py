@@ -0,0 +1,127 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from multiprocessing import TimeoutError
+from multiprocessing.pool import Pool
+
+from diskcache import Cache
+
+from simtools.Analysis.AnalysisMetrics import AnalysisMetrics
+from simtools.Analysis.AnalyzeManager import pool_worker_initializer
+from simtools.Analysis.BaseAnalyzers import BaseAnalyzer
+from simtools.Analysis.DataRetrievalProcess import process_data
+from simtools.Analysis.RetrievalPipeline import RetrievalPipeline
+
+
+class SumAnalyzer(BaseAnalyzer):
+    def __init__(self):
+        super().__init__(filenames=["output/InsetChart.json"], incremental=True)
+
+    def select_simulation_data(self, data, simulation):
+        return sum(data[self.filenames[0]]["Channels"]["Infected"]["Data"])
+
+    def reduce(self, partial, simulation, data):
+        return (partial or 0) + data
+
+    def combine(self, partials):
+        return sum(partials)
+
+
+class HPCExperiment:
+    location = "HPC"
+
+
+class HPCSimulation:
+    def __init__(self, sim_id):
+        self.id = sim_id
+        self.experiment = HPCExperiment()
+
+
+class StandInServer:
+    """
+    Local stand-in for COMPS serving the InsetChart.json of each simulation with some latency.
+    """
+    def __init__(self, latency=0.05):
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.active = 0
+        self.max_active = 0
+
+    def retrieve(self, simulation, filenames, path_mapping):
+        with self.lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        time.sleep(self.latency)
+        with self.lock:
+            self.active -= 1
+        content = json.dumps({"Channels": {"Infected": {"Data": [int(simulation.id)]}}}).encode()
+        return {filename: content for filename in filenames}
+
+
+class TestRetrievalPipeline(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.cache = Cache(os.path.join(self.tempdir, "cache"))
+        self.analyzer = SumAnalyzer()
+        self.pool = Pool(2, initializer=pool_worker_initializer,
+                         initargs=(process_data, [self.analyzer], self.cache, None, None))
+
+    def tearDown(self):
+        self.pool.terminate()
+        self.cache.close()
+        shutil.rmtree(self.tempdir)
+
+    def run_pipeline(self, pipeline, simulations):
+        results = pipeline.start(simulations)
+        total = 0
+        metrics = AnalysisMetrics()
+        while True:
+            try:
+                partials, sim_metrics = results.next(timeout=1)
+            except StopIteration:
+                return total, metrics
+            except TimeoutError:
+                continue
+            total += partials.get(self.analyzer.uid, 0)
+            metrics.merge(sim_metrics)
+
+    def test_all_simulations_processed(self):
+        server = StandInServer()
+        pipeline = RetrievalPipeline(self.pool, [self.analyzer], self.cache, max_downloads=8,
+                                     retrieve_function=server.retrieve)
+        simulations = [HPCSimulation(str(i)) for i in range(40)]
+
+        total, metrics = self.run_pipeline(pipeline, simulations)
+        self.assertEqual(total, sum(range(40)))
+        self.assertEqual(len(self.cache), 40)
+        self.assertEqual(metrics.simulations, 40)
+        self.assertGreater(metrics.bytes, 0)
+        self.assertGreater(metrics.times["download"], 0)
+        # The downloads were concurrent
+        self.assertGreater(server.max_active, 2)
+        self.assertLessEqual(server.max_active, 8)
+
+    def test_queue_is_bounded(self):
+        server = StandInServer(latency=0)
+        pipeline = RetrievalPipeline(self.pool, [self.analyzer], self.cache, max_downloads=4, queue_size=3,
+                                     retrieve_function=server.retrieve)
+        total, _ = self.run_pipeline(pipeline, [HPCSimulation(str(i)) for i in range(20)])
+        self.assertEqual(total, sum(range(20)))
+        self.assertLessEqual(server.max_active, 3)
+
+    def test_retrieval_error(self):
+        def failing_retrieve(simulation, filenames, path_mapping):
+            raise ConnectionError("Server unavailable")
+
+        pipeline = RetrievalPipeline(self.pool, [self.analyzer], self.cache, retrieve_function=failing_retrieve)
+        _, metrics = self.run_pipeline(pipeline, [HPCSimulation("1")])
+        self.assertIn("data retrieval", metrics.exception)
+        self.assertEqual(metrics.simulations, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
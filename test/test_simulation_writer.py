@@ -0,0 +1,88 @@
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import unittest
+
+from COMPS.Data.Simulation import SimulationState
+
+from simtools.DataAccess import Base, Session, create_sqlite_engine, engine
+from simtools.DataAccess.Schema import Simulation
+from simtools.DataAccess.SimulationDataStore import SimulationDataStore, SimulationWriter
+
+
+class TestSimulationWriter(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.engine = create_sqlite_engine(os.path.join(self.tempdir, 'db.sqlite'), wal=True)
+        Session.configure(bind=self.engine)
+        Base.metadata.create_all(self.engine)
+        SimulationDataStore.bulk_insert_simulations([Simulation(id='sim_%d' % i, status_s='Created') for i in range(100)])
+
+    def tearDown(self):
+        Session.configure(bind=engine)
+        self.engine.dispose()
+        shutil.rmtree(self.tempdir)
+
+    def simulations(self):
+        session = Session()
+        simulations = {s.id: (s.status, s.message, s.pid) for s in session.query(Simulation)}
+        session.close()
+        return simulations
+
+    def test_wal_mode(self):
+        with self.engine.connect() as connection:
+            self.assertEqual(connection.execute('PRAGMA journal_mode').scalar(), 'wal')
+
+    def test_wal_mode_opt_in(self):
+        def wal_mode(**env):
+            environ = {k: v for k, v in os.environ.items() if k != 'DTK_TOOLS_DB_WAL'}
+            environ.update(env, PYTHONPATH=os.pathsep.join(sys.path))
+            return subprocess.check_output([sys.executable, '-c', 'from simtools.DataAccess import WAL_MODE; '
+                                                                  'print(WAL_MODE)'], env=environ).decode().strip()
+        self.assertEqual(wal_mode(), 'False')
+        self.assertEqual(wal_mode(DTK_TOOLS_DB_WAL='1'), 'True')
+
+    def test_updates_coalesced(self):
+        writer = SimulationWriter(tick=60)
+        writer.put([{'sid': 'sim_0', 'status': SimulationState.Running, 'pid': 12}])
+        writer.put([{'sid': 'sim_0', 'message': '1 of 2 steps complete.'}, {'sid': 'sim_1', 'message': 'Beginning'}])
+        writer.put([{'sid': 'sim_0', 'status': SimulationState.Succeeded, 'pid': None}])
+        self.assertEqual(self.simulations()['sim_0'], (SimulationState.Created, None, None))
+
+        writer.close()
+        self.assertEqual(writer.transactions, 1)
+        simulations = self.simulations()
+        self.assertEqual(simulations['sim_0'], (SimulationState.Succeeded, '1 of 2 steps complete.', None))
+        self.assertEqual(simulations['sim_1'], (SimulationState.Created, 'Beginning', None))
+
+    def test_final_state_kept(self):
+        writer = SimulationWriter(tick=60)
+        writer.put([{'sid': 'sim_2', 'status': SimulationState.Canceled}])
+        writer.flush()
+        writer.put([{'sid': 'sim_2', 'status': SimulationState.Failed}])
+        writer.close()
+        self.assertEqual(self.simulations()['sim_2'][0], SimulationState.Canceled)
+
+    def test_concurrent_updates(self):
+        writer = SimulationWriter(tick=0.01)
+
+        def monitor(sim_ids):
+            for sim_id in sim_ids:
+                writer.put([{'sid': sim_id, 'status': SimulationState.Running}])
+                writer.put([{'sid': sim_id, 'status': SimulationState.Succeeded, 'message': 'Done'}])
+
+        threads = [threading.Thread(target=monitor, args=(['sim_%d' % i for i in range(t, 100, 8)],)) for t in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        writer.close()
+
+        self.assertTrue(all(s == (SimulationState.Succeeded, 'Done', None) for s in self.simulations().values()))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,132 @@
+import os
+import shutil
+import struct
+import tempfile
+import unittest
+from io import BytesIO
+
+import numpy as np
+from diskcache import Cache
+
+from dtk.tools.output.SpatialOutput import SpatialOutput
+from simtools.Analysis.BaseAnalyzers import BaseAnalyzer
+from simtools.Analysis.DataRetrievalProcess import retrieve_data_for_simulation
+from simtools.Analysis.OutputParser import SimulationOutputParser
+
+
+def spatial_bytes(nodeids, data, filtered=False, start=0, interval=1):
+    n_tstep, n_nodes = data.shape
+    content = struct.pack('ii', n_nodes, n_tstep)
+    if filtered:
+        content += struct.pack('ff', start, interval)
+    content += struct.pack('%dI' % n_nodes, *nodeids)
+    content += struct.pack('%df' % data.size, *data.ravel())
+    return content
+
+
+class NodesAnalyzer(BaseAnalyzer):
+    def __init__(self, uid, node_ids=None):
+        super().__init__(uid=uid, filenames=["output/SpatialReport_Population.bin"], node_ids=node_ids)
+
+    def select_simulation_data(self, data, simulation):
+        return data[self.filenames[0]]
+
+
+class LocalExperiment:
+    location = "LOCAL"
+
+
+class LocalSimulation:
+    def __init__(self, sim_id, path):
+        self.id = sim_id
+        self.path = path
+        self.experiment = LocalExperiment()
+
+    def get_path(self):
+        return self.path
+
+
+class TestSpatialOutput(unittest.TestCase):
+    def setUp(self):
+        self.nodeids = [340461476, 340461477, 12, 7]
+        self.data = np.arange(20 * len(self.nodeids), dtype=np.float32).reshape(20, len(self.nodeids)) / 3
+        self.tempdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+
+    def test_from_bytes(self):
+        so = SpatialOutput.from_bytes(spatial_bytes(self.nodeids, self.data))
+        self.assertEqual(so.n_nodes, 4)
+        self.assertEqual(so.n_tstep, 20)
+        np.testing.assert_array_equal(so.nodeids, self.nodeids)
+        np.testing.assert_array_equal(so.data, self.data)
+
+        # Writable float64 copies by default
+        self.assertEqual(so.data.dtype, np.float64)
+        so.data[0] *= 2
+        np.testing.assert_array_equal(so.data[0], self.data[0] * 2)
+
+    def test_from_bytes_no_copy(self):
+        content = bytearray(spatial_bytes(self.nodeids, self.data))
+        so = SpatialOutput.from_bytes(content, copy=False)
+        self.assertEqual(so.data.dtype, np.float32)
+        self.assertIs(so.data.base.base.obj, content)
+        np.testing.assert_array_equal(so.data, self.data)
+
+    def test_filtered(self):
+        so = SpatialOutput.from_bytes(spatial_bytes(self.nodeids, self.data, True, 365, 30), filtered=True)
+        self.assertEqual((so.start, so.interval), (365, 30))
+        np.testing.assert_array_equal(so.data, self.data)
+        self.assertEqual(so.to_dict(tstep_start=2)['start'], 425)
+
+    def test_select(self):
+        so = SpatialOutput.from_bytes(spatial_bytes(self.nodeids, self.data))
+        np.testing.assert_array_equal(so.select([7, 340461476], 5, 10), self.data[5:10][:, [3, 0]])
+        np.testing.assert_array_equal(so.node_series(12), self.data[:, 2])
+        with self.assertRaises(KeyError):
+            so.select([8])
+
+    def test_from_file(self):
+        path = os.path.join(self.tempdir, "SpatialReport_Population.bin")
+        with open(path, 'wb') as fp:
+            fp.write(spatial_bytes(self.nodeids, self.data))
+        so = SpatialOutput.from_file(path, copy=False)
+        self.assertIsInstance(so.data.base, np.memmap)
+        np.testing.assert_array_equal(so.select([12]), self.data[:, [2]])
+        with self.assertRaises(ValueError):
+            so.data[0] = 0
+        del so
+
+        so = SpatialOutput.from_file(path)
+        self.assertNotIsInstance(so.data.base, np.memmap)
+        np.testing.assert_array_equal(so.data, self.data)
+
+    def test_parser_node_subset(self):
+        parsed = SimulationOutputParser.parse("output/SpatialReport_Population.bin",
+                                              spatial_bytes(self.nodeids, self.data), node_ids=[12])
+        self.assertEqual(parsed['n_nodes'], 1)
+        np.testing.assert_array_equal(parsed['nodeids'], [12])
+        np.testing.assert_array_equal(parsed['data'], self.data[:, [2]])
+        self.assertEqual(parsed['data'].dtype, np.float64)
+
+    def test_analyzers_node_ids(self):
+        os.makedirs(os.path.join(self.tempdir, "output"))
+        with open(os.path.join(self.tempdir, "output", "SpatialReport_Population.bin"), 'wb') as fp:
+            fp.write(spatial_bytes(self.nodeids, self.data))
+        simulation = LocalSimulation("sim", self.tempdir)
+        cache = Cache(os.path.join(self.tempdir, "cache"))
+        try:
+            retrieve_data_for_simulation(simulation, [NodesAnalyzer("a", [12]), NodesAnalyzer("b", [7])], cache, None)
+            np.testing.assert_array_equal(cache.get("sim")["a"]["nodeids"], [7, 12])
+            np.testing.assert_array_equal(cache.get("sim")["a"]["data"], self.data[:, [3, 2]])
+
+            # One analyzer needing all the nodes
+            retrieve_data_for_simulation(simulation, [NodesAnalyzer("a", [12]), NodesAnalyzer("b")], cache, None)
+            self.assertEqual(cache.get("sim")["a"]["n_nodes"], 4)
+        finally:
+            cache.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
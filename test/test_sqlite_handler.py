@@ -0,0 +1,108 @@
+import logging
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+from simtools.DataAccess import Base_logs, Session_logs, create_sqlite_engine, engine_logs
+from simtools.DBLogging.Schema import LogRecord
+from simtools.DBLogging.SQLiteHandler import SQLiteHandler
+
+
+class BlockedHandler(SQLiteHandler):
+    """
+    Handler whose writer waits for the test to release it.
+    """
+    def __init__(self, *args, **kwargs):
+        super(BlockedHandler, self).__init__(*args, **kwargs)
+        self.released = threading.Event()
+        self.batches = []
+
+    def write(self, records):
+        self.released.wait()
+        self.batches.append(len(records))
+        super(BlockedHandler, self).write(records)
+
+
+class TestSQLiteHandler(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.engine = create_sqlite_engine(os.path.join(self.tempdir, 'logs.sqlite'), wal=True)
+        Session_logs.configure(bind=self.engine)
+        Base_logs.metadata.create_all(self.engine)
+        self.logger = logging.getLogger('TestSQLiteHandler')
+        self.logger.propagate = False
+        self.logger.setLevel(logging.DEBUG)
+
+    def tearDown(self):
+        for handler in list(self.logger.handlers):
+            self.logger.removeHandler(handler)
+        Session_logs.configure(bind=engine_logs)
+        self.engine.dispose()
+        shutil.rmtree(self.tempdir)
+
+    def records(self):
+        session = Session_logs()
+        records = [(r.log_level_name, r.message) for r in session.query(LogRecord).order_by(LogRecord.id)]
+        session.close()
+        return records
+
+    def add_handler(self, handler):
+        self.logger.addHandler(handler)
+        return handler
+
+    def test_records_saved_in_batches(self):
+        handler = self.add_handler(BlockedHandler(batch_size=100))
+        for i in range(250):
+            self.logger.debug("message %d", i)
+        self.logger.error("failure")
+        handler.released.set()
+        handler.close()
+
+        records = self.records()
+        self.assertEqual(len(records), 251)
+        self.assertEqual(records[0], ('DEBUG', 'message %d'))
+        self.assertEqual(records[-1], ('ERROR', 'failure'))
+        self.assertLessEqual(max(handler.batches), 100)
+        self.assertLess(len(handler.batches), 251)
+
+    def test_full_queue_drops_records(self):
+        handler = self.add_handler(BlockedHandler(capacity=10))
+        for i in range(50):
+            self.logger.info("message %d", i)
+        self.assertGreaterEqual(handler.dropped, 39)
+        handler.released.set()
+        handler.close()
+
+        records = self.records()
+        self.assertEqual(records[-1][0], 'WARNING')
+        dropped = int(records[-1][1].split()[0])
+        self.assertEqual(len(records) - 1 + dropped, 50)
+
+    def test_flush(self):
+        handler = self.add_handler(SQLiteHandler(flush_interval=60))
+        self.logger.info("message")
+        handler.flush()
+        self.assertEqual(self.records(), [('INFO', 'message')])
+        handler.close()
+        self.assertFalse(handler.thread.is_alive())
+
+    @unittest.skipUnless(hasattr(os, 'fork'), "Requires fork")
+    def test_forked_process_saves_records(self):
+        handler = self.add_handler(SQLiteHandler(flush_interval=60))
+        self.logger.info("parent")
+        handler.flush()
+
+        # The child exits with os._exit, without logging.shutdown
+        child = multiprocessing.get_context('fork').Process(target=self.logger.info, args=("child",))
+        child.start()
+        child.join()
+        self.assertEqual(child.exitcode, 0)
+        self.assertEqual(self.records(), [('INFO', 'parent'), ('INFO', 'child')])
+        handler.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
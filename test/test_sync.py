@@ -0,0 +1,141 @@
+import datetime
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import pytz
+from COMPS.Data.Simulation import SimulationState
+
+from simtools.DataAccess import Base, Session, create_sqlite_engine, engine
+from simtools.DataAccess.DataStore import DataStore
+from simtools.DataAccess.ExperimentDataStore import SYNC_MARK_KEY
+from simtools.Utilities.Experiments import COMPS_sync_experiments
+
+START = datetime.datetime(2018, 5, 1, 12, 0, 0, tzinfo=pytz.utc)
+
+
+class FakeQueryCriteria:
+    def __init__(self):
+        self.children = []
+        self.filters = []
+
+    def select(self, fields):
+        return self
+
+    def select_children(self, children):
+        self.children.append(children)
+        return self
+
+    def where(self, filters):
+        self.filters.extend(filters)
+        return self
+
+
+class FakeCOMPSSimulation:
+    def __init__(self, sim_id, minutes, state=SimulationState.Running):
+        self.id = sim_id
+        self.state = state
+        self.date_created = START + datetime.timedelta(minutes=minutes)
+        self.tags = {'Run_Number': str(minutes)}
+
+
+class FakeCOMPSExperiment:
+    """
+    Stand-in of a COMPS experiment, recording the simulations retrieved with their tags.
+    """
+    def __init__(self, exp_id, simulations):
+        self.id = exp_id
+        self.name = 'experiment_%s' % exp_id
+        self.suite_id = None
+        self.tags = {}
+        self.date_created = START
+        self.simulations = simulations
+        self.tags_retrieved = []
+
+    def get_simulations(self, query_criteria):
+        simulations = self.simulations
+        for f in query_criteria.filters:
+            date = pytz.utc.localize(datetime.datetime.strptime(f.split('>=')[1], '%Y-%m-%d %H:%M:%S'))
+            simulations = [sim for sim in simulations if sim.date_created >= date]
+        if 'tags' in query_criteria.children:
+            self.tags_retrieved.extend(sim.id for sim in simulations)
+        return list(simulations)
+
+
+class TestSync(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.engine = create_sqlite_engine(os.path.join(self.tempdir, 'db.sqlite'), wal=True)
+        Session.configure(bind=self.engine)
+        Base.metadata.create_all(self.engine)
+
+        self.experiments = {str(i): FakeCOMPSExperiment(str(i), [FakeCOMPSSimulation('%d_%d' % (i, j), j)
+                                                                 for j in range(5)]) for i in range(20)}
+        self.requested = []
+        patches = [mock.patch('COMPS.Data.QueryCriteria', FakeQueryCriteria, create=True),
+                   mock.patch('simtools.Utilities.Experiments.COMPS_login'),
+                   mock.patch('simtools.Utilities.Experiments.get_experiment_by_id', self.get_experiment_by_id)]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def tearDown(self):
+        Session.configure(bind=engine)
+        self.engine.dispose()
+        shutil.rmtree(self.tempdir)
+
+    def get_experiment_by_id(self, exp_id, query_criteria=None):
+        self.requested.append(exp_id)
+        return self.experiments[exp_id]
+
+    def sync(self, exp_ids=None):
+        return COMPS_sync_experiments(exp_ids or sorted(self.experiments), 'https://comps.example.org', workers=4)
+
+    def test_new_experiments(self):
+        changes = self.sync()
+        self.assertEqual(len(changes), 20)
+        experiment = DataStore.get_experiment('7')
+        self.assertEqual(experiment.exp_name, 'experiment_7')
+        self.assertEqual(sorted(sim.id for sim in experiment.simulations), ['7_%d' % j for j in range(5)])
+        self.assertEqual(experiment.simulations[0].tags, {'Run_Number': int(experiment.simulations[0].id[-1])})
+        self.assertEqual(DataStore.get_setting(SYNC_MARK_KEY % '7').value, '2018-05-01 12:04:00')
+
+    def test_unchanged_experiments(self):
+        self.sync()
+        for experiment in self.experiments.values():
+            experiment.tags_retrieved = []
+        self.assertEqual(self.sync(), [])
+        self.assertFalse(any(experiment.tags_retrieved for experiment in self.experiments.values()))
+
+    def test_changed_simulations_only(self):
+        self.sync()
+        experiment = self.experiments['3']
+        experiment.tags_retrieved = []
+        experiment.simulations[1].state = SimulationState.Succeeded
+        experiment.simulations.append(FakeCOMPSSimulation('3_new', 10))
+
+        changes = self.sync()
+        self.assertEqual(len(changes), 1)
+        self.assertEqual(changes[0]['status'], {'3_1': SimulationState.Succeeded})
+        # Only the simulations created from the mark are retrieved with their tags
+        self.assertEqual(experiment.tags_retrieved, ['3_4', '3_new'])
+
+        status = dict((sim_id, state) for sim_id, state, _ in DataStore.get_simulations_status('3'))
+        self.assertEqual(status['3_1'], SimulationState.Succeeded)
+        self.assertEqual(status['3_new'], SimulationState.Running)
+        self.assertEqual(DataStore.get_setting(SYNC_MARK_KEY % '3').value, '2018-05-01 12:10:00')
+
+    def test_finished_experiments_skipped(self):
+        for sim in self.experiments['5'].simulations:
+            sim.state = SimulationState.Succeeded
+        self.sync()
+        self.requested = []
+        self.sync()
+        self.assertNotIn('5', self.requested)
+        self.assertIn('6', self.requested)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+import gc
+import os
+import struct
+import tempfile
+import unittest
+
+import numpy as np
+
+from dtk.tools.climate.BinaryFilesHelpers import ClimateBinary, extract_data_from_climate_bin_for_node, \
+    open_climate_binaries
+from dtk.tools.climate.ClimateFileCreator import ClimateFileCreator
+from dtk.tools.climate.WeatherNode import WeatherNode
+
+
+class ClimateBinaryTests(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        rng = np.random.RandomState(0)
+        self.nodes = []
+        for node_id in (340461479, 12353654, 1001, 7):
+            node = WeatherNode(forced_id=node_id)
+            node.rainfall = rng.uniform(0, 20, 365).tolist()
+            node.air_temperature = rng.uniform(-5, 35, 365).tolist()
+            self.nodes.append(node)
+        # Nodes with the same series share their data in the file
+        self.nodes[3].air_temperature = self.nodes[1].air_temperature
+
+        ClimateFileCreator(self.nodes, 'test', 'daily', '2008').generate_climate_files(self.tempdir.name)
+        self.rainfall = ClimateBinary(os.path.join(self.tempdir.name, 'test_rainfall_daily.bin'))
+        self.temperature = ClimateBinary(os.path.join(self.tempdir.name, 'test_air_temperature_daily.bin'))
+
+    def tearDown(self):
+        self.rainfall.close()
+        self.temperature.close()
+        self.tempdir.cleanup()
+
+    @staticmethod
+    def mapped(binary_file):
+        gc.collect()
+        return [o for o in gc.get_objects() if isinstance(o, np.memmap) and o.filename == os.path.abspath(binary_file)]
+
+    def expected(self, data_set, node):
+        values = getattr(node, data_set)
+        return struct.unpack('f' * len(values), struct.pack('f' * len(values), *values))
+
+    def test_node_series(self):
+        self.assertEqual(len(self.rainfall), 4)
+        self.assertEqual(self.rainfall.tsteps, 365)
+        for node in self.nodes:
+            series = self.temperature.node_series(node.id)
+            self.assertEqual(series.dtype, np.float32)
+            self.assertEqual(tuple(series.tolist()), self.expected('air_temperature', node))
+        self.assertIn(1001, self.rainfall)
+        with self.assertRaises(KeyError):
+            self.rainfall.node_series(42)
+
+    def test_nodes_series(self):
+        block = self.rainfall.nodes_series()
+        self.assertEqual(block.shape, (4, 365))
+        # Contiguous series are a view on the file
+        self.assertIs(np.shares_memory(block, self.rainfall.data), True)
+        self.assertEqual(tuple(block[2].tolist()), self.expected('rainfall', self.nodes[2]))
+
+        block = self.temperature.nodes_series([7, 340461479])
+        self.assertEqual(tuple(block[0].tolist()), self.expected('air_temperature', self.nodes[1]))
+        self.assertEqual(tuple(block[1].tolist()), self.expected('air_temperature', self.nodes[0]))
+
+    def test_extract_data_for_node(self):
+        binary_file = self.rainfall.binary_file
+        self.rainfall.close()
+        series = extract_data_from_climate_bin_for_node(self.nodes[2], binary_file)
+        self.assertEqual(tuple(series), self.expected('rainfall', self.nodes[2]))
+        # The file is not kept mapped and can be generated again
+        self.assertEqual(self.mapped(binary_file), [])
+        self.nodes[2].rainfall = [1.5] * 365
+        ClimateFileCreator(self.nodes, 'test', 'daily', '2008').generate_climate_files(self.tempdir.name)
+        self.assertEqual(extract_data_from_climate_bin_for_node(self.nodes[2], binary_file), [1.5] * 365)
+
+    def test_open_climate_binaries(self):
+        binary_file = self.temperature.binary_file
+        self.temperature.close()
+        with open_climate_binaries() as climate_binaries:
+            for node in self.nodes:
+                expected = self.expected('air_temperature', node)
+                node.data_from_files(air_temperature=binary_file, climate_binaries=climate_binaries)
+                self.assertEqual(tuple(node.air_temperature), expected)
+            self.assertEqual(len(climate_binaries), 1)
+            self.assertEqual(len(self.mapped(binary_file)), 1)
+        self.assertEqual(self.mapped(binary_file), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+import itertools
+import json
+import os
+import struct
+import tempfile
+import unittest
+from collections import OrderedDict
+
+import numpy as np
+
+from dtk.tools.climate.ClimateFileCreator import ClimateFileCreator
+from dtk.tools.climate.WeatherNode import WeatherNode
+
+
+def reference_files(nodes, data_set):
+    # Offsets and content written by the original tuple-keyed implementation
+    data = OrderedDict()
+    offset, offset_string = 0, ""
+    for node in nodes:
+        key = tuple(getattr(node, data_set))
+        if key not in data:
+            data[key] = offset
+            offset += len(key) * 4
+        offset_string = "%s%08x%08x" % (offset_string, node.id, data[key])
+    values = list(itertools.chain.from_iterable(data))
+    return offset_string, len(data), struct.pack('f' * len(values), *values)
+
+
+class ClimateFileCreatorTests(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        rng = np.random.RandomState(1)
+        shared = rng.uniform(0, 100, 365).tolist()
+        self.nodes = []
+        for node_id in range(1, 21):
+            node = WeatherNode(forced_id=node_id * 1000003)
+            node.rainfall = rng.uniform(0, 20, 365).tolist()
+            node.air_temperature = [float(round(t)) for t in rng.uniform(20, 23, 365)]
+            node.humidity = shared if node_id % 3 else rng.uniform(0, 100, 365).tolist()
+            self.nodes.append(node)
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def read(self, data_set):
+        path = os.path.join(self.tempdir.name, 'test_%s_daily.bin' % data_set)
+        with open(path + '.json') as f:
+            meta = json.load(f)
+        with open(path, 'rb') as f:
+            return meta['NodeOffsets'], meta['Metadata']['NodeCount'], f.read(), meta['Metadata']
+
+    def test_files_unchanged(self):
+        self.nodes[5].rainfall = self.nodes[2].rainfall
+        ClimateFileCreator(self.nodes, 'test', 'daily', '2008').generate_climate_files(self.tempdir.name)
+
+        for data_set in ('air_temperature', 'land_temperature', 'humidity', 'rainfall'):
+            offsets, node_count, content, metadata = self.read(data_set)
+            self.assertEqual((offsets, node_count, content), reference_files(self.nodes, data_set))
+            self.assertEqual(metadata['NumberDTKNodes'], 20)
+
+        self.assertEqual(self.read('rainfall')[1], 19)
+        self.assertEqual(self.read('humidity')[1], 7)
+        # Nodes without land temperature share an empty series
+        self.assertEqual(self.read('land_temperature')[3]['DatavalueCount'], 0)
+
+    def test_different_lengths(self):
+        self.nodes[3].rainfall = self.nodes[3].rainfall[:100]
+        with self.assertRaises(ValueError):
+            ClimateFileCreator(self.nodes, 'test', 'daily', '2008').generate_climate_files(self.tempdir.name)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,125 @@
+import collections
+import json
+import os
+import tempfile
+import unittest
+
+from dtk.tools.demographics import compiledemog
+from dtk.tools.demographics.compiledemog import CompileDemographics, CompileDemographicsFiles, DemographicsCompiler
+
+
+def reference_compilation(infilename):
+    # Output of the original implementation loading the whole file
+    stringdict = collections.OrderedDict([])
+    nextstring = ['aa']
+
+    def compress(datachunk):
+        newdatachunk = collections.OrderedDict([])
+        for key, value in datachunk.items():
+            if key not in stringdict:
+                stringdict[key] = nextstring[0]
+                nextstring[0] = compiledemog.GetNextString(nextstring[0])
+            if type(value) is collections.OrderedDict:
+                newdatachunk[stringdict[key]] = compress(value)
+            elif type(value) is list:
+                newdatachunk[stringdict[key]] = [compress(x) if type(x) is collections.OrderedDict else x
+                                                 for x in value]
+            else:
+                newdatachunk[stringdict[key]] = value
+        return newdatachunk
+
+    with open(infilename) as f:
+        fulljson = json.load(f, object_pairs_hook=compiledemog.OrderedJsonLoad)
+
+    compiledjson = collections.OrderedDict([('Metadata', fulljson['Metadata'])])
+    newnodes, offsets, offset = [], [], 0
+    for node in sorted(fulljson['Nodes'], key=lambda k: k['NodeID']):
+        newnode = compress(node)
+        newnodes.append(newnode)
+        offsets.append(offset)
+        offset += len(json.dumps(newnode, separators=(',', ':'))) + 1
+    compiledjson['StringTable'] = stringdict
+    if 'Defaults' in fulljson:
+        compiledjson['Defaults'] = compress(fulljson['Defaults'])
+    compiledjson['NodeOffsets'] = ''
+    compiledjson['Nodes'] = []
+    startoffset = len(json.dumps(compiledjson, separators=(',', ':'))) - 2 + (16 * len(newnodes))
+    compiledjson['NodeOffsets'] = ''.join('%0.8X' % node[stringdict['NodeID']] + '%0.8X' % (o + startoffset)
+                                          for node, o in zip(newnodes, offsets))
+    compiledjson['Nodes'] = newnodes
+    return json.dumps(compiledjson, separators=(',', ':'))
+
+
+class CompileDemographicsTests(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def demographics_file(self, name, node_ids, extra_key='Airport'):
+        demographics = {
+            "Metadata": {"IdReference": "Test", "NodeCount": len(node_ids), "Author": "Søren"},
+            "Defaults": {"IndividualAttributes": {"AgeDistributionFlag": 3, "AgeDistribution1": 0.000118},
+                         "NodeAttributes": {"Urban": 0}},
+            "Nodes": [{"NodeID": node_id,
+                       "NodeAttributes": {"Latitude": -17.05 + node_id / 1e3, "Longitude": 27.6,
+                                          "InitialPopulation": node_id * 10, extra_key: node_id % 2,
+                                          "Name": "Nœud %d" % node_id},
+                       "IndividualAttributes": {"PrevalenceDistribution": [0.1, 0.2, {"Nested": 1e-7}]}}
+                      for node_id in node_ids]
+        }
+        path = os.path.join(self.tempdir.name, name)
+        with open(path, 'w') as f:
+            json.dump(demographics, f, indent=4)
+        return path
+
+    def read_compiled(self, path):
+        with open(compiledemog.CompiledFileName(path)) as f:
+            return f.read()
+
+    def test_same_output(self):
+        path = self.demographics_file('demographics.json', [5, 3, 340461479, 1, 4, 2])
+        expected = reference_compilation(path)
+        # Small chunks to decode values over several reads
+        DemographicsCompiler(chunk_size=7).compile(path, compiledemog.CompiledFileName(path))
+        self.assertEqual(self.read_compiled(path), expected)
+
+        CompileDemographics(path, forceoverwrite=True)
+        compiled = self.read_compiled(path)
+        self.assertEqual(compiled, expected)
+
+        # The offsets point to the nodes
+        compiled_json = json.loads(compiled)
+        offsets = compiled_json['NodeOffsets']
+        node_id_key = compiled_json['StringTable']['NodeID']
+        for i in range(0, len(offsets), 16):
+            node, _ = json.JSONDecoder().raw_decode(compiled, int(offsets[i + 8:i + 16], 16))
+            self.assertEqual(node[node_id_key], int(offsets[i:i + 8], 16))
+
+    def test_independent_compilations(self):
+        first = self.demographics_file('first.json', [1, 2], extra_key='Seaport')
+        second = self.demographics_file('second.json', [3, 4])
+        CompileDemographics(first, forceoverwrite=True)
+        CompileDemographics(second, forceoverwrite=True)
+        # The StringTable of the second file does not contain the keys of the first one
+        self.assertNotIn('Seaport', json.loads(self.read_compiled(second))['StringTable'])
+        self.assertEqual(self.read_compiled(second), reference_compilation(second))
+
+    def test_compile_files_in_pool(self):
+        paths = [self.demographics_file('demographics_%d.json' % i, list(range(i, 10 * i, i))) for i in range(1, 4)]
+        compiled = CompileDemographicsFiles(paths, processes=2)
+        self.assertEqual(compiled, [compiledemog.CompiledFileName(path) for path in paths])
+        for path in paths:
+            self.assertEqual(self.read_compiled(path), reference_compilation(path))
+
+    def test_invalid_file(self):
+        path = os.path.join(self.tempdir.name, 'invalid.json')
+        with open(path, 'w') as f:
+            f.write('{"Metadata": {}, "Nodes": [{"NodeID": 1}')
+        with self.assertRaises(ValueError):
+            DemographicsCompiler().compile(path, compiledemog.CompiledFileName(path))
+
+
+if __name__ == '__main__':
+    unittest.main()
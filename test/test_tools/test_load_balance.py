@@ -0,0 +1,75 @@
+import json
+import os
+import struct
+import tempfile
+import unittest
+
+import numpy as np
+
+from dtk.tools.loadbalance.HilbertLoadBalancer import HilbertLoadBalancer, hilbert_index
+from dtk.tools.loadbalance.LoadBalanceGenerator import LoadBalanceGenerator
+
+
+class LoadBalanceTests(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        rng = np.random.RandomState(0)
+        self.nnodes = 2000
+        self.pops = rng.lognormal(7, 1, self.nnodes).round()
+        self.pops[5] = 0
+        nodes = [{'NodeID': int(i + 1),
+                  'NodeAttributes': {'Latitude': float(lat), 'Longitude': float(lon), 'InitialPopulation': pop}}
+                 for i, (lat, lon, pop) in enumerate(zip(rng.uniform(-10, 0, self.nnodes),
+                                                         rng.uniform(25, 35, self.nnodes), self.pops))]
+        # A node using the default population
+        del nodes[-1]['NodeAttributes']['InitialPopulation']
+        self.pops[-1] = 1000
+
+        self.demographics_file = os.path.join(self.tempdir.name, 'demographics.json')
+        with open(self.demographics_file, 'w') as f:
+            json.dump({'Metadata': {'NodeCount': self.nnodes},
+                       'Defaults': {'NodeAttributes': {'InitialPopulation': 1000}}, 'Nodes': nodes}, f)
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def test_hilbert_curve(self):
+        x, y = np.meshgrid(np.arange(16), np.arange(16))
+        x, y = x.ravel(), y.ravel()
+        d = hilbert_index(x, y, order=4)
+        self.assertEqual(sorted(d), list(range(256)))
+        # Consecutive cells along the curve are adjacent
+        order = np.argsort(d)
+        self.assertTrue(np.all(np.abs(np.diff(x[order])) + np.abs(np.diff(y[order])) == 1))
+
+    def test_balanced_partitions(self):
+        result = HilbertLoadBalancer(self.demographics_file, nclusters=16).balance_load()
+        self.assertEqual(result['num_nodes'], self.nnodes)
+        self.assertEqual(sorted(result['node_ids']), list(range(1, self.nnodes + 1)))
+
+        cum_loads = np.array(result['cum_loads'])
+        self.assertTrue(np.all(np.diff(cum_loads) >= 0) and 0 <= cum_loads[0] and cum_loads[-1] < 1)
+
+        # Loads of the partitions
+        node_pops = self.pops[np.array(result['node_ids']) - 1]
+        ranks = np.minimum((cum_loads * 16).astype(int), 15)
+        loads = np.bincount(ranks, weights=node_pops)
+        self.assertAlmostEqual(result['max_over_avg'], 16 * loads.max() / loads.sum())
+        self.assertLess(result['max_over_avg'], 1.1)
+        result['lb_fig'].close()
+
+    def test_generator(self):
+        generator = LoadBalanceGenerator(8, self.demographics_file, 'hilbert')
+        generator.generate_load_balance()
+        self.assertLess(generator.load_balance_max_over_avg, 1.1)
+
+        path = os.path.join(self.tempdir.name, 'loadbalance.bin')
+        generator.save_load_balance_binary_file(path)
+        with open(path, 'rb') as f:
+            self.assertEqual(struct.unpack('I', f.read(4))[0], self.nnodes)
+            self.assertEqual(list(np.fromfile(f, dtype=np.uint32, count=self.nnodes)), generator.load_balance_nodes_list)
+        generator.load_balance_fig.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+import json
+import os
+import tempfile
+import unittest
+from struct import pack
+from unittest import mock
+
+import numpy as np
+
+from dtk.tools.migration.MigrationFile import MigrationFile, MigrationRates, MigrationTypes
+
+
+def reference_file(matrix, route=None, max_destinations=100):
+    # Content written by the original struct.pack loop
+    content, offset_str, offset = b"", "", 0
+    for nodeid, destinations in matrix.items():
+        if route is not None:
+            destinations = dict(list(destinations.items())[:max_destinations])
+        content += pack('L' * len(destinations), *destinations.keys())
+        content += pack('d' * len(destinations), *destinations.values())
+        offset_str += "{0:08X}{1:08X}".format(nodeid, offset)
+        offset += 12 * len(destinations)
+    return content, offset_str
+
+
+class MigrationFileTests(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.bin_path = os.path.join(self.tempdir.name, 'migration.bin')
+
+        rng = np.random.RandomState(0)
+        self.matrix = {}
+        for source in range(1, 51):
+            destinations = rng.choice(np.arange(1, 201), size=rng.randint(1, 120), replace=False)
+            rates = rng.random_sample(len(destinations))
+            self.matrix[source] = {int(d): float(r) for d, r in zip(destinations, rates)}
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def read_output(self):
+        with open(self.bin_path, 'rb') as f:
+            content = f.read()
+        with open(self.bin_path + '.json') as f:
+            headers = json.load(f)
+        return content, headers
+
+    def test_same_bytes_as_struct(self):
+        expected_content, expected_offsets = reference_file(self.matrix)
+        MigrationFile(1, self.matrix).generate_file(self.bin_path)
+        content, headers = self.read_output()
+        self.assertEqual(content, expected_content)
+        self.assertEqual(headers['NodeOffsets'], expected_offsets)
+        self.assertEqual(headers['Metadata']['NodeCount'], 50)
+        self.assertEqual(headers['Metadata']['DatavalueCount'], 0)
+
+    def test_route_trims_destinations(self):
+        expected_content, expected_offsets = reference_file(self.matrix, MigrationTypes.local)
+        MigrationFile(1, self.matrix).generate_file(self.bin_path, route=MigrationTypes.local)
+        content, headers = self.read_output()
+        self.assertEqual(content, expected_content)
+        self.assertEqual(headers['NodeOffsets'], expected_offsets)
+        self.assertEqual(headers['Metadata']['DatavalueCount'], 100)
+
+    def test_from_arrays(self):
+        rows = [(s, d, r) for s, dests in self.matrix.items() for d, r in dests.items()]
+        # The rows of the sources do not need to be contiguous
+        rows = rows[1::2] + rows[::2]
+        sources, destinations, rates = map(np.array, zip(*rows))
+
+        migration_file = MigrationFile.from_arrays(1, sources, destinations, rates)
+        self.assertIsInstance(migration_file.matrix, MigrationRates)
+        migration_file.generate_file(self.bin_path)
+        content, headers = self.read_output()
+
+        expected = {}
+        for s, d, r in rows:
+            expected.setdefault(s, {})[d] = r
+        self.assertEqual((content, headers['NodeOffsets']), reference_file(expected))
+        self.assertEqual(migration_file.matrix.to_matrix(), expected)
+
+    def test_written_by_chunks(self):
+        expected = reference_file(self.matrix, MigrationTypes.local)
+        with mock.patch('dtk.tools.migration.MigrationFile.WRITE_CHUNK_DESTINATIONS', 150):
+            MigrationFile(1, self.matrix).generate_file(self.bin_path, route=MigrationTypes.local)
+        content, headers = self.read_output()
+        self.assertEqual((content, headers['NodeOffsets']), expected)
+
+    def test_filler_nodes(self):
+        dests = {2: 0.1}
+        MigrationFile.get_filler_nodes(1, dests, 3, [1, 2, 3, 4, 5])
+        self.assertEqual(dests, {2: 0.1, 3: 0, 4: 0})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,11 +1,19 @@
+import itertools
+import json
 import os
 import tempfile
 import unittest
+from unittest.mock import patch
 
+import networkx as nx
 import numpy as np
+from geopy.distance import distance
 
 from dtk.tools.climate.WeatherNode import WeatherNode
 from dtk.tools.demographics.DemographicsFile import DemographicsFile
+from dtk.tools.migration.GeoGraphGenerator import GeoGraphGenerator
+from dtk.tools.migration import GraphGenerator as graph_generator_module
+from dtk.tools.migration.GraphGenerator import bounded_shortest_path_lengths
 from dtk.tools.migration.GravityModelRatesGenerator import GravityModelRatesGenerator
 from dtk.tools.migration.MigrationGenerator import MigrationGenerator, MigrationTypes
 from dtk.tools.migration.StaticGravityModelRatesGenerator import StaticGravityModelRatesGenerator
@@ -69,3 +77,87 @@ class MigrationGeneratorTests(unittest.TestCase):
             self.assertTrue(migration_file_name.replace('.bin', '.json'))
             # Check that the human readable form exists
             self.assertTrue(migration_file_name.replace('.bin', '.txt'))
+
+    def test_static_gravity_rates_match_pairwise_computation(self):
+        static_gravity_params = np.array([7.50395776e-06, 9.65648371e-01, 9.65648371e-01, -1.10305489e+00])
+        link_rates_model = StaticGravityModelRatesGenerator(demographics_file, static_gravity_params,
+                                                            exclude_nodes=[3])
+        df = link_rates_model.load_demographics_file(demographics_file)
+        migr, p_sum = link_rates_model.compute_migration(df, return_prob_sums=True)
+
+        # Reference: one geopy distance and scalar probability per pair
+        for i, (_, r1) in enumerate(df.iterrows()):
+            expected = {}
+            for _, r2 in df.iterrows():
+                if r2['node_id'] == r1['node_id']:
+                    continue
+                if r1['node_id'] == 3 or r2['node_id'] == 3:
+                    expected[r2['node_id']] = 0.0
+                    continue
+                d = distance((r1['lat'], r1['long']), (r2['lat'], r2['long'])).km
+                expected[r2['node_id']] = link_rates_model.compute_migration_probability(r1['pop'], r2['pop'], d)
+
+            self.assertListEqual(list(migr[r1['node_id']]), list(expected))
+            np.testing.assert_allclose(list(migr[r1['node_id']].values()), list(expected.values()), rtol=1e-9)
+            self.assertAlmostEqual(p_sum[i], sum(expected.values()))
+
+    def test_static_gravity_rates_neighbors_cutoff(self):
+        static_gravity_params = np.array([7.50395776e-06, 9.65648371e-01, 9.65648371e-01, -1.10305489e+00])
+        all_pairs = StaticGravityModelRatesGenerator(demographics_file, static_gravity_params)
+        df = all_pairs.load_demographics_file(demographics_file)
+        migr = all_pairs.compute_migration(df)
+        distances = {n1: {n2: distance((r1['lat'], r1['long']), (r2['lat'], r2['long'])).km
+                          for n2, r2 in zip(df['node_id'], df.to_dict('records')) if n2 != n1}
+                     for n1, r1 in zip(df['node_id'], df.to_dict('records'))}
+
+        nearest = StaticGravityModelRatesGenerator(demographics_file, static_gravity_params, max_neighbors=3)
+        for node_id, rates in nearest.compute_migration(df).items():
+            # The grid has nodes at the same distance, compare the distances of the neighbors
+            np.testing.assert_allclose(sorted(distances[node_id][n] for n in rates),
+                                       sorted(distances[node_id].values())[:3])
+            for destination, rate in rates.items():
+                self.assertAlmostEqual(rate, migr[node_id][destination])
+
+        # Halfway between two distinct distances to avoid nodes exactly at the limit
+        all_distances = np.unique(np.round([d for node in distances.values() for d in node.values()], 6))
+        max_distance = all_distances[len(all_distances) // 2: len(all_distances) // 2 + 2].mean()
+        radius = StaticGravityModelRatesGenerator(demographics_file, static_gravity_params, max_distance=max_distance)
+        for node_id, rates in radius.compute_migration(df).items():
+            self.assertSetEqual(set(rates), {n for n, d in distances[node_id].items() if d < max_distance})
+
+    def get_geo_graph_generator(self, path, migration_radius):
+        network_file = os.path.join(path, 'network.json')
+        with open(network_file, 'w') as f:
+            json.dump({}, f)
+        return GeoGraphGenerator(network_file, demographics_file, migration_radius=migration_radius)
+
+    def test_geo_graph_radius_edges(self):
+        with tempfile.TemporaryDirectory() as path:
+            generator = self.get_geo_graph_generator(path, migration_radius=2)
+            graph = generator.generate_graph()
+
+            expected = set()
+            for n1, n2 in itertools.combinations(graph.nodes(), 2):
+                d = generator.get_haversine_distance(*graph.position[n1], *graph.position[n2])
+                if d < 2:
+                    expected.add(frozenset((n1, n2)))
+                    self.assertAlmostEqual(graph[n1][n2]['weight'], d)
+
+            self.assertGreater(len(expected), 0)
+            self.assertSetEqual({frozenset(edge) for edge in graph.edges()}, expected)
+
+    def test_bounded_shortest_paths(self):
+        with tempfile.TemporaryDirectory() as path:
+            generator = self.get_geo_graph_generator(path, migration_radius=2)
+            generator.generate_graph()
+            all_paths = dict(nx.shortest_path_length(generator.graph, weight='weight'))
+
+            # Small tasks to distribute the 28 nodes between the processes
+            for processes in (1, 2):
+                with patch.object(graph_generator_module, 'SOURCES_PER_TASK', 5):
+                    bounded = dict(bounded_shortest_path_lengths(generator.graph, 3, processes))
+                for src, lengths in all_paths.items():
+                    expected = {dest: length for dest, length in lengths.items() if length <= 3}
+                    self.assertEqual(bounded[src].keys(), expected.keys())
+                    for dest, length in expected.items():
+                        self.assertAlmostEqual(bounded[src][dest], length)
@@ -0,0 +1,67 @@
+import os
+import tempfile
+import unittest
+
+from dtk.tools.output.serialized_file_mc_to_sc import merge_serialized_files, rank_filenames
+from dtk.tools.serialization import dtkFileTools as dft
+from dtk.tools.serialization.dtkFileSupport import SerialObject
+
+version4_file = os.path.join(os.path.dirname(dft.__file__), 'test-data', 'version4.dtk')
+
+
+class SerializedFileMergeTests(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.nodes = list(dft.read(version4_file).nodes)
+
+        # Three ranks with different SuidGenerators, compressions and versions
+        self.filename_format = os.path.join(self.tempdir.name, 'state-00365-%03d.dtk')
+        ranks = [(dft.DtkFileV4, dft.LZ4, self.nodes[:2], 1001),
+                 (dft.DtkFileV4, dft.SNAPPY, self.nodes[2:3], 5003),
+                 (dft.DtkFileV3, dft.LZ4, self.nodes[3:], 2002)]
+        for core_idx, (file_class, engine, nodes, next_suid) in enumerate(ranks):
+            rank = file_class(dft.DtkHeader({'author': 'rank%d' % core_idx, 'bytecount': 0, 'chunkcount': 0,
+                                             'chunksizes': [], 'compressed': True, 'engine': engine,
+                                             'version': 4}))
+            rank.objects.append(SerialObject({
+                'Run_Number': 7, 'nodes': [],
+                'individualHumanSuidGenerator': {'next_suid': {'id': next_suid}, 'rank': core_idx, 'numtasks': 3},
+                'infectionSuidGenerator': {'next_suid': {'id': 10 - core_idx}, 'rank': core_idx, 'numtasks': 3}}))
+            for node in nodes:
+                rank.objects.append(node)
+            dft.write(rank, self.filename_format % core_idx)
+        self.output = os.path.join(self.tempdir.name, 'merged.dtk')
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def test_merge(self):
+        filenames = rank_filenames(self.filename_format)
+        self.assertEqual(len(filenames), 3)
+        self.assertEqual(merge_serialized_files(filenames, self.output), 4)
+
+        merged = dft.read(self.output)
+        self.assertEqual(merged.version, 4)
+        self.assertEqual(merged.compression, dft.LZ4)
+        self.assertEqual(merged.author, 'rank0')
+        self.assertEqual(merged.simulation.Run_Number, 7)
+        self.assertEqual(merged.simulation.individualHumanSuidGenerator.next_suid.id, 5003)
+        self.assertEqual(merged.simulation.individualHumanSuidGenerator.numtasks, 1)
+        self.assertEqual(merged.simulation.infectionSuidGenerator.next_suid.id, 10)
+        self.assertEqual(list(merged.nodes), self.nodes)
+
+        # The chunks of ranks with the same compression are copied as they are
+        rank0 = dft.read(filenames[0])
+        self.assertEqual(merged.chunks[1], rank0.chunks[1])
+
+    def test_start_index_and_cores(self):
+        filenames = rank_filenames(self.filename_format, start_index=1, cores=2)
+        self.assertEqual(filenames, [self.filename_format % 1, self.filename_format % 2])
+        self.assertEqual(merge_serialized_files(filenames, self.output), 2)
+        merged = dft.read(self.output)
+        self.assertEqual(merged.compression, dft.SNAPPY)
+        self.assertEqual(list(merged.nodes), self.nodes[2:])
+
+
+if __name__ == '__main__':
+    unittest.main()